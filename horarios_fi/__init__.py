@@ -0,0 +1,14 @@
+"""
+Código del generador de horarios que no depende de Streamlit
+(se puede importar, probar y medir sin levantar la app).
+
+- horario: intervalos de clase y máscaras de ocupación.
+- ssa, parser_ssa, cliente_http, snapshot: descarga y lectura de la programación del SSA.
+- materias: catálogo y materias ya descargadas (compartidos por todas las sesiones) y Refrescar Cupos.
+- tracker: caché de las consultas a IngenieriaTracker.
+- puntaje: traslapes y score de una combinación (suelta o por lotes con numpy).
+- espacio: combinaciones válidas guardadas para volver a ordenar sin enumerar.
+- busqueda: top-k exacto (branch and bound, secuencial o en procesos) y heurístico.
+- ics, imagen: exportación a calendario y cuadrícula / imagen del horario.
+- tiempo_importacion, benchmark: mediciones del arranque y de la búsqueda.
+"""
@@ -0,0 +1,530 @@
+"""
+Benchmark de la generación de horarios (sin Streamlit ni red).
+
+    python -m horarios_fi.benchmark                               # suite "rapida"
+    python -m horarios_fi.benchmark --suite completa --limite 60
+    python -m horarios_fi.benchmark --fixture mis_materias.json
+    python -m horarios_fi.benchmark --snapshot horarios.sqlite --claves 1120,1601,1730,32
+    python -m horarios_fi.benchmark --guardar base.json
+    python -m horarios_fi.benchmark --comparar base.json          # sale con 1 si algo empeoró
+
+Cargas de trabajo:
+- sintéticas: N materias x G grupos (SUITES), con grupos "densos" (todos entre 7:00 y 16:00
+  de lunes a viernes, muchos traslapes) o "dispersos" (7:00 a 22:00 con sábados), con y sin
+  actividades personales. Siempre las mismas para la misma --semilla.
+- fixtures: un JSON con la lista de materias en el formato de la app
+  ([{"materia", "obligatoria", "grupos": [...]}]; --exportar escribe las sintéticas así),
+  o claves de un snapshot de horarios_fi.snapshot.
+
+Variantes (VARIANTES):
+- referencia: el ciclo original, itertools.product + es_horario_valido + calcular_score +
+  calcular_penalizacion_por_dia + heap. Solo si el espacio no pasa de --max-referencia.
+- bnb: buscar_mejores_horarios. paralelo: buscar_mejores_horarios_paralelo.
+- espacio: EspacioCombinaciones.construir + mejores (si las válidas caben en memoria).
+- heuristica: buscar_heuristica con --limite-heuristica segundos.
+
+Por variante se reporta el tiempo (el mejor de --repeticiones), cuándo apareció el top-k final
+(con reportes parciales cada --intervalo segundos), combinaciones del espacio cubiertas por
+segundo, memoria pico (en una corrida aparte, ver memoria_pico), qué fracción del espacio llegó a
+evaluarse como hoja, las podas por traslape y por cota (fracción de nodos) y si el top coincide
+con el exacto.
+"""
+import argparse
+import gc
+import heapq
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+from horarios_fi import busqueda
+from horarios_fi.espacio import EspacioCombinaciones
+from horarios_fi.horario import construir_mascara, extraer_intervalos
+from horarios_fi.puntaje import (
+    calcular_penalizacion_por_dia, calcular_score, es_horario_valido, grupo_no_inscribir
+)
+
+# (materias, grupos por materia); cada tamaño se corre denso/disperso y con/sin actividades
+SUITES = {
+    "rapida": [(4, 5), (6, 10), (8, 8)],
+    "completa": [(4, 5), (4, 40), (6, 10), (6, 20), (8, 8), (8, 15), (10, 5), (10, 10), (10, 40)],
+}
+
+VARIANTES = ("referencia", "bnb", "espacio", "heuristica", "paralelo")
+VARIANTES_DEFAULT = ("referencia", "bnb", "espacio", "heuristica")
+
+# Los defaults de la interfaz
+PESOS_DEFAULT = {
+    "huecos": 50,
+    "profes": 70,
+    "tipo_turno": "Mañana (Temprano)",
+    "peso_turno": 30,
+    "carga": 80,
+}
+CONFIG_DIAS_DEFAULT = {
+    dia: {"modo": "Normal", "preferencia": "Mixto", "max_bloques": 10, "evitar": False}
+    for dia in ("Lun", "Mar", "Mie", "Jue", "Vie", "Sab")
+}
+W_DIAS_DEFAULT = 35
+
+PATRONES_DENSOS = (("Lun", "Mie", "Vie"), ("Mar", "Jue"), ("Lun", "Mie"), ("Mar", "Jue", "Vie"))
+PATRONES_DISPERSOS = PATRONES_DENSOS + (("Vie",), ("Sab",), ("Lun",), ("Jue",))
+
+# Comida diaria y trabajo dos mañanas: lo que la gente suele bloquear
+ACTIVIDADES_PERSONALES = (
+    ("Comida", "14:00 a 15:00", ("Lun", "Mar", "Mie", "Jue", "Vie")),
+    ("Trabajo", "09:00 a 11:00", ("Mar", "Jue")),
+)
+
+# Tiempos por debajo de esto son ruido para --comparar
+MIN_SEGUNDOS_COMPARABLES = 0.05
+
+
+def _hhmm(minutos):
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def _grupo(nombre_materia, gpo, horario, dias, profesor, calificacion, vacantes=10):
+    intervalos = extraer_intervalos(horario, list(dias))
+    return {
+        "gpo": str(gpo),
+        "profesor": profesor,
+        "profesor_raw": profesor,
+        "modalidad": None,
+        "salon": "SIN",
+        "horario": horario,
+        "dias": ", ".join(dias),
+        "intervalos": intervalos,
+        "mascara": construir_mascara(intervalos),
+        "calificacion": calificacion,
+        "materia_nombre": nombre_materia,
+        "vacantes": vacantes,
+        "activo": True,
+        "api_consultado": False,
+        "sugerencia_api": None,
+        "api_num_resenas": None,
+        "api_nombre_match": None,
+    }
+
+
+def materias_sinteticas(n_materias, n_grupos, densa=False, actividades=False, semilla=0):
+    """Materias en el formato de st.session_state.materias_db; mismas para los mismos argumentos."""
+    rng = random.Random(f"{semilla}-{n_materias}-{n_grupos}-{densa}-{actividades}")
+    patrones = PATRONES_DENSOS if densa else PATRONES_DISPERSOS
+    ultima_salida = 16 * 60 if densa else 22 * 60
+
+    materias = []
+    for k in range(n_materias):
+        nombre = f"{1000 + k} - MATERIA SINTETICA {k}"
+        grupos = []
+        for gpo in range(1, n_grupos + 1):
+            duracion = rng.choice((60, 90, 120))
+            inicio = rng.randrange(7 * 60, ultima_salida - duracion + 1, 30)
+            grupos.append(_grupo(
+                nombre, gpo, f"{_hhmm(inicio)} a {_hhmm(inicio + duracion)}", rng.choice(patrones),
+                f"PROFESOR {k}-{rng.randrange(n_grupos)}", rng.choice((6, 7, 7.5, 8, 8.5, 9, 9.5, 10))
+            ))
+        materias.append({"materia": nombre, "obligatoria": True, "grupos": grupos})
+
+    if actividades:
+        for nombre, horario, dias in ACTIVIDADES_PERSONALES:
+            materias.append({
+                "materia": nombre,
+                "obligatoria": True,
+                "es_bloqueo": True,
+                "grupos": [_grupo(nombre, "Único", horario, dias, "Tú", 10, vacantes=999)],
+            })
+    return materias
+
+
+def cargas_sinteticas(suite="rapida", semilla=0):
+    """[(nombre, materias)] de todas las combinaciones de tamaño x densidad x actividades."""
+    cargas = []
+    for n_materias, n_grupos in SUITES[suite]:
+        for densa in (False, True):
+            for actividades in (False, True):
+                nombre = f"{n_materias}x{n_grupos}-{'densa' if densa else 'dispersa'}"
+                if actividades:
+                    nombre += "-actividades"
+                cargas.append((nombre, materias_sinteticas(n_materias, n_grupos, densa, actividades, semilla)))
+    return cargas
+
+
+def cargar_fixture(ruta):
+    """(nombre, materias) de un JSON con la lista de materias; las máscaras se recalculan."""
+    materias = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    for m in materias:
+        for g in m["grupos"]:
+            g["mascara"] = construir_mascara(g.get("intervalos", []))
+    return Path(ruta).stem, materias
+
+
+def exportar_fixture(ruta, materias):
+    limpias = [dict(m, grupos=[{k: v for k, v in g.items() if k != "mascara"} for g in m["grupos"]]) for m in materias]
+    Path(ruta).write_text(json.dumps(limpias, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def cargas_de_snapshot(ruta, claves):
+    """(nombre, materias) con los grupos de las claves guardadas en un snapshot."""
+    from horarios_fi.snapshot import Snapshot
+
+    snapshot = Snapshot(ruta)
+    materias = []
+    for clave in claves:
+        grupos = snapshot.grupos(clave)
+        if grupos:
+            materias.append({"materia": grupos[0]["materia_nombre"], "obligatoria": True, "grupos": grupos})
+    return [(f"snapshot-{'-'.join(claves)}", materias)]
+
+
+def grupos_de_materias(materias):
+    """grupos_input como lo arma la app: grupos activos y, en las opcionales, la opción de no inscribirla."""
+    grupos_input = []
+    for m in materias:
+        activos = [g for g in m["grupos"] if g.get("activo", True)]
+        if not activos:
+            continue
+        if not m.get("obligatoria", True):
+            activos = activos + [grupo_no_inscribir(m["materia"])]
+        grupos_input.append(activos)
+    return grupos_input
+
+
+# --- VARIANTES ---
+# Cada una regresa (top [(score, idx o posición, combinación)], stats con las llaves que tenga)
+
+def _referencia(grupos_input, pesos, top_k, config_dias, w_dias, limite, callback_parcial):
+    top_heap = []
+    for idx, comb in enumerate(itertools.product(*grupos_input)):
+        if not es_horario_valido(comb):
+            continue
+        sc = calcular_score(comb, pesos) + calcular_penalizacion_por_dia({"materias": comb}, config_dias, w_dias=w_dias)
+        if len(top_heap) < top_k:
+            heapq.heappush(top_heap, (sc, idx, comb))
+        elif sc > top_heap[0][0]:
+            heapq.heapreplace(top_heap, (sc, idx, comb))
+    total = 1
+    for grupos in grupos_input:
+        total *= len(grupos)
+    stats = {"hojas": total, "revisadas": total, "total": total, "completa": True}
+    return sorted(top_heap, key=lambda x: (-x[0], x[1])), stats
+
+
+def _bnb(grupos_input, pesos, top_k, config_dias, w_dias, limite, callback_parcial):
+    return busqueda.buscar_mejores_horarios(
+        grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias,
+        callback_parcial=callback_parcial, limite_segundos=limite
+    )
+
+
+def _paralelo(grupos_input, pesos, top_k, config_dias, w_dias, limite, callback_parcial):
+    return busqueda.buscar_mejores_horarios_paralelo(
+        grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias,
+        callback_parcial=callback_parcial, limite_segundos=limite
+    )
+
+
+def _espacio(grupos_input, pesos, top_k, config_dias, w_dias, limite, callback_parcial):
+    espacio = EspacioCombinaciones.construir(grupos_input)
+    if espacio is None:
+        return None, None
+    return espacio.mejores(pesos, top_k, config_dias, w_dias), {"hojas": len(espacio), "completa": True}
+
+
+def _heuristica(grupos_input, pesos, top_k, config_dias, w_dias, limite, callback_parcial):
+    top, stats = busqueda.buscar_heuristica(
+        grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias,
+        limite_segundos=limite, callback_parcial=callback_parcial
+    )
+    # evaluadas cuenta repetidas (los vecindarios se enciman), no es fracción del espacio
+    return top, dict(stats, revisadas=stats["evaluadas"])
+
+
+FUNCIONES_VARIANTE = {
+    "referencia": _referencia,
+    "bnb": _bnb,
+    "paralelo": _paralelo,
+    "espacio": _espacio,
+    "heuristica": _heuristica,
+}
+
+
+@contextmanager
+def _intervalo_parcial(segundos):
+    """Reportes parciales más seguidos que en la app, para ver cuándo aparece el top final."""
+    anterior = busqueda.INTERVALO_PARCIAL
+    busqueda.INTERVALO_PARCIAL = segundos
+    try:
+        yield
+    finally:
+        busqueda.INTERVALO_PARCIAL = anterior
+
+
+def _scores(top):
+    return [round(sc, 9) for sc, _, _ in top]
+
+
+def correr_variante(variante, grupos_input, pesos, top_k, config_dias, w_dias, limite):
+    """
+    Una corrida: {"top", "stats", "tiempo", "tiempo_top"}; None si la variante no aplica.
+    tiempo_top es cuándo el top parcial ya era el final (o el tiempo total si no se vio antes).
+    """
+    funcion = FUNCIONES_VARIANTE[variante]
+    parciales = []
+    inicio = time.perf_counter()
+
+    def callback_parcial(top):
+        parciales.append((time.perf_counter() - inicio, _scores(top)))
+
+    top, stats = funcion(grupos_input, pesos, top_k, config_dias, w_dias, limite, callback_parcial)
+    tiempo = time.perf_counter() - inicio
+    if top is None:
+        return None
+
+    finales = _scores(top)
+    tiempo_top = next((t for t, scores in parciales if scores == finales), tiempo)
+    return {"top": top, "stats": stats, "tiempo": tiempo, "tiempo_top": tiempo_top}
+
+
+def _memoria_en_proceso(variante, grupos_input, pesos, top_k, config_dias, w_dias, limite):
+    # Corre en un proceso hijo hecho con fork: su RSS máximo parte del del padre,
+    # así que lo que crece es lo que usó la corrida
+    antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    FUNCIONES_VARIANTE[variante](grupos_input, pesos, top_k, config_dias, w_dias, limite, None)
+    despues = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    return (despues - antes) * (1 if sys.platform == "darwin" else 1024)
+
+
+def memoria_pico(variante, grupos_input, pesos, top_k, config_dias, w_dias, limite):
+    """
+    Bytes de memoria pico que agrega una corrida.
+    Con fork se mide el RSS máximo en un proceso hijo, que tarda lo mismo que una corrida
+    normal; sin fork se usa tracemalloc (solo memoria de Python y numpy, y mucho más lento).
+    En paralelo siempre es tracemalloc y solo del proceso principal: un hijo hecho con fork no
+    puede usar el pool de la búsqueda (sus procesos salen del forkserver del padre).
+    """
+    if variante != "paralelo" and resource is not None and "fork" in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as ejecutor:
+            return ejecutor.submit(
+                _memoria_en_proceso, variante, grupos_input, pesos, top_k, config_dias, w_dias, limite
+            ).result()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        FUNCIONES_VARIANTE[variante](grupos_input, pesos, top_k, config_dias, w_dias, limite, None)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir_carga(nombre, materias, variantes, pesos=None, top_k=10, config_dias=None, w_dias=W_DIAS_DEFAULT,
+                repeticiones=3, limite=30.0, limite_heuristica=1.0, max_referencia=200_000, memoria=True):
+    """Renglones de resultados (dicts) de cada variante sobre una carga."""
+    pesos = pesos or PESOS_DEFAULT
+    config_dias = config_dias or CONFIG_DIAS_DEFAULT
+    grupos_input = grupos_de_materias(materias)
+    total = 1
+    for grupos in grupos_input:
+        total *= len(grupos)
+
+    corridas = {}
+    for variante in variantes:
+        if variante == "referencia" and total > max_referencia:
+            continue
+        limite_variante = limite_heuristica if variante == "heuristica" else limite
+        mejor = None
+        for _ in range(max(1, repeticiones)):
+            corrida = correr_variante(variante, grupos_input, pesos, top_k, config_dias, w_dias, limite_variante)
+            if corrida is None:
+                break
+            if mejor is None or corrida["tiempo"] < mejor["tiempo"]:
+                mejor = corrida
+        if mejor is None:
+            continue
+        if memoria:
+            mejor["memoria"] = memoria_pico(variante, grupos_input, pesos, top_k, config_dias, w_dias, limite_variante)
+        corridas[variante] = mejor
+
+    # El top exacto: el de la referencia o el de cualquier variante exacta que haya terminado
+    exacto = None
+    for variante in ("referencia", "bnb", "espacio", "paralelo"):
+        corrida = corridas.get(variante)
+        if corrida is not None and corrida["stats"].get("completa"):
+            exacto = _scores(corrida["top"])
+            break
+
+    renglones = []
+    for variante, corrida in corridas.items():
+        stats = corrida["stats"]
+        nodos = stats.get("nodos")
+        revisadas = stats.get("revisadas", total if stats.get("completa") else 0)
+        renglones.append({
+            "carga": nombre,
+            "variante": variante,
+            "materias": len(grupos_input),
+            "combinaciones": total,
+            "tiempo": corrida["tiempo"],
+            "tiempo_top": corrida["tiempo_top"],
+            "comb_por_s": revisadas / corrida["tiempo"] if corrida["tiempo"] > 0 else None,
+            "memoria": corrida.get("memoria"),
+            "hojas": stats["hojas"] / total if total and "hojas" in stats else None,
+            "podas_traslape": stats["podas_traslape"] / nodos if nodos else None,
+            "podas_cota": stats["podas_cota"] / nodos if nodos else None,
+            "completa": bool(stats.get("completa")),
+            "igual": None if exacto is None else _scores(corrida["top"]) == exacto,
+            "mejor_score": corrida["top"][0][0] if corrida["top"] else None,
+        })
+    return renglones
+
+
+def _formato(valor, tipo):
+    if valor is None:
+        return "-"
+    if tipo == "s":
+        return f"{valor:.3f} s"
+    if tipo == "n":
+        return f"{valor:,.0f}"
+    if tipo == "mb":
+        return f"{valor / 2 ** 20:.1f} MB"
+    if tipo == "%":
+        return f"{100 * valor:.1f}%"
+    if tipo == "b":
+        return "sí" if valor else "NO"
+    return str(valor)
+
+
+COLUMNAS = (
+    ("variante", "variante", None, 11),
+    ("tiempo", "tiempo", "s", 10),
+    ("top-k a", "tiempo_top", "s", 10),
+    ("comb/s", "comb_por_s", "n", 15),
+    ("memoria", "memoria", "mb", 9),
+    ("hojas", "hojas", "%", 8),
+    ("p. traslape", "podas_traslape", "%", 12),
+    ("p. cota", "podas_cota", "%", 8),
+    ("completa", "completa", "b", 9),
+    ("igual", "igual", "b", 6),
+)
+
+
+def imprimir_carga(renglones):
+    if not renglones:
+        return
+    primero = renglones[0]
+    print(f"\n{primero['carga']}  ({primero['materias']} materias, {primero['combinaciones']:,} combinaciones)")
+    print("  " + "".join(titulo.rjust(ancho) if i else titulo.ljust(ancho)
+                         for i, (titulo, _, _, ancho) in enumerate(COLUMNAS)))
+    for r in renglones:
+        print("  " + "".join(_formato(r[llave], tipo).rjust(ancho) if i else _formato(r[llave], tipo).ljust(ancho)
+                             for i, (_, llave, tipo, ancho) in enumerate(COLUMNAS)))
+
+
+def comparar(renglones, base, tolerancia):
+    """Mensajes de regresión contra una corrida guardada con --guardar."""
+    previos = {(r["carga"], r["variante"]): r for r in base}
+    problemas = []
+    for r in renglones:
+        if r["igual"] is False and r["completa"]:
+            problemas.append(f"{r['carga']} / {r['variante']}: el top no coincide con el exacto")
+        previo = previos.get((r["carga"], r["variante"]))
+        if previo is None or max(r["tiempo"], previo["tiempo"]) < MIN_SEGUNDOS_COMPARABLES:
+            continue
+        if r["tiempo"] > previo["tiempo"] * (1 + tolerancia):
+            problemas.append(
+                f"{r['carga']} / {r['variante']}: {previo['tiempo']:.3f} s -> {r['tiempo']:.3f} s "
+                f"(+{100 * (r['tiempo'] / previo['tiempo'] - 1):.0f}%)"
+            )
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de horarios.")
+    parser.add_argument("--suite", default="rapida", choices=sorted(SUITES), help="cargas sintéticas (default rapida)")
+    parser.add_argument("--sin-sinteticas", action="store_true", help="solo las cargas de --fixture / --snapshot")
+    parser.add_argument("--fixture", action="append", default=[], help="JSON con la lista de materias (se puede repetir)")
+    parser.add_argument("--snapshot", help="snapshot de horarios_fi.snapshot del que tomar --claves")
+    parser.add_argument("--claves", help="claves del snapshot, separadas por comas")
+    parser.add_argument("--variantes", default=",".join(VARIANTES_DEFAULT),
+                        help=f"separadas por comas, de: {', '.join(VARIANTES)}")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeticiones", type=int, default=3, help="se reporta la más rápida (default 3)")
+    parser.add_argument("--limite", type=float, default=30.0, help="segundos máximos por búsqueda exacta")
+    parser.add_argument("--limite-heuristica", type=float, default=1.0)
+    parser.add_argument("--max-referencia", type=int, default=200_000,
+                        help="la referencia solo corre con espacios de hasta este tamaño")
+    parser.add_argument("--intervalo", type=float, default=0.02, help="segundos entre reportes parciales")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir memoria (ahorra una corrida)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--exportar", help="carpeta donde guardar las cargas sintéticas como fixtures JSON")
+    parser.add_argument("--guardar", help="guardar los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de --guardar contra el que buscar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="para --comparar (default 0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    variantes = [v.strip() for v in args.variantes.split(",") if v.strip()]
+    desconocidas = [v for v in variantes if v not in FUNCIONES_VARIANTE]
+    if desconocidas:
+        parser.error(f"variantes desconocidas: {', '.join(desconocidas)}")
+
+    cargas = [] if args.sin_sinteticas else cargas_sinteticas(args.suite, args.semilla)
+    if args.exportar:
+        Path(args.exportar).mkdir(parents=True, exist_ok=True)
+        for nombre, materias in cargas:
+            exportar_fixture(Path(args.exportar) / f"{nombre}.json", materias)
+    cargas += [cargar_fixture(ruta) for ruta in args.fixture]
+    if args.snapshot:
+        if not args.claves:
+            parser.error("--snapshot necesita --claves")
+        cargas += cargas_de_snapshot(args.snapshot, [c.strip() for c in args.claves.split(",") if c.strip()])
+    if not cargas:
+        parser.error("no hay cargas que medir")
+
+    renglones = []
+    with _intervalo_parcial(args.intervalo):
+        # Una corrida chica antes de medir: la primera paga cargar numpy y armar tablas
+        medir_carga("calentamiento", materias_sinteticas(3, 3), variantes, top_k=args.top_k,
+                    repeticiones=1, limite=args.limite, limite_heuristica=0.05, memoria=False)
+        for nombre, materias in cargas:
+            de_carga = medir_carga(
+                nombre, materias, variantes, top_k=args.top_k, repeticiones=args.repeticiones,
+                limite=args.limite, limite_heuristica=args.limite_heuristica,
+                max_referencia=args.max_referencia, memoria=not args.sin_memoria
+            )
+            imprimir_carga(de_carga)
+            renglones += de_carga
+
+    if args.guardar:
+        Path(args.guardar).write_text(json.dumps(renglones, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    problemas = [
+        f"{r['carga']} / {r['variante']}: el top no coincide con el exacto"
+        for r in renglones if r["igual"] is False and r["completa"]
+    ]
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        problemas = comparar(renglones, base, args.tolerancia)
+    if problemas:
+        print("\nRegresiones:", file=sys.stderr)
+        for problema in problemas:
+            print(f"  {problema}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
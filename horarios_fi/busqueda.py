@@ -0,0 +1,744 @@
+"""
+Búsqueda del top-k de combinaciones.
+
+- buscar_mejores_horarios: branch and bound exacto (mismo resultado que revisar todo).
+- buscar_mejores_horarios_paralelo: la misma búsqueda repartida entre procesos.
+- buscar_heuristica: búsqueda en haz + vecindarios para espacios enormes (anytime).
+- iterar_mejores_horarios: corre todo en un hilo y va entregando resultados parciales.
+"""
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from horarios_fi.espacio import _enumerar_con_choques, matriz_choques
+from horarios_fi.horario import DIAS_SEMANA
+from horarios_fi.perezoso import ModuloPerezoso
+from horarios_fi.puntaje import (
+    calcular_penalizacion_por_dia, calcular_score, construir_tabla_features, conteos_por_dia,
+    cota_penalizacion_por_dia, es_combinacion_valida, penalizacion_lote, precalcular_conflictos,
+    puntuar_lote
+)
+
+np = ModuloPerezoso("numpy")
+
+registro = logging.getLogger(__name__)
+
+
+# --- BÚSQUEDA DEL TOP-K (BRANCH AND BOUND) ---
+# Hojas que se juntan antes de puntuarlas de golpe con puntuar_lote
+TAMANO_LOTE = 4096
+
+
+# Margen para que errores de redondeo en la cota nunca poden una rama que sí mejoraba el heap
+EPS_COTA = 1e-6
+
+
+# Cada cuántos segundos la búsqueda reporta progreso y lo mejor que lleva
+INTERVALO_PARCIAL = 0.5
+# Nodos entre dos consultas al reloj (time.monotonic por nodo se nota)
+NODOS_POR_CHEQUEO = 1024
+# Tiempo máximo de búsqueda por defecto en la interfaz (0 = sin límite)
+LIMITE_BUSQUEDA_SEGUNDOS = 60
+
+
+class _BusquedaDetenida(Exception):
+    """Se acabó el tiempo o pidieron cancelar: la búsqueda regresa lo que lleva."""
+
+
+def _resumen_grupo(g):
+    """Lo que usa la cota de un grupo: (inicio, fin, minutos) por día, extremos y si es regular."""
+    por_dia = {}
+    inicios = []
+    fines = []
+    # "No inscribir" (N/A) sin intervalos no aporta nada y la cota lo contempla;
+    # un N/A con intervalos no cuadra con calcular_score
+    regular = g.get('gpo') != "N/A" or not g.get('intervalos')
+
+    for s in g.get('intervalos', []):
+        inicio, fin = s['inicio'], s['fin']
+        inicios.append(inicio)
+        fines.append(fin)
+        if fin <= inicio:
+            regular = False
+        if s['dia'] not in DIAS_SEMANA:
+            continue
+        if s['dia'] in por_dia:
+            ini_d, fin_d, dur_d = por_dia[s['dia']]
+            # Dos intervalos del mismo grupo en el mismo día: solo es regular si no se enciman
+            if inicio < fin_d and fin > ini_d:
+                regular = False
+            por_dia[s['dia']] = (min(ini_d, inicio), max(fin_d, fin), dur_d + (fin - inicio))
+        else:
+            por_dia[s['dia']] = (inicio, fin, fin - inicio)
+
+    return {
+        "por_dia": por_dia,
+        "primer_inicio": min(inicios) if inicios else None,
+        "ultima_salida": max(fines) if fines else None,
+        "regular": regular,
+    }
+
+
+def _preparar_cota(grupos_input, pesos, config_dias, w_dias):
+    """
+    Regresa (usar_cota, cota, resumenes, bloques_grupo). cota(k, ...) acota el score de lo que
+    complete una parcial de las materias 0..k-1; solo es válida si usar_cota.
+    """
+    n = len(grupos_input)
+    resumenes = [[_resumen_grupo(g) for g in grupos] for grupos in grupos_input]
+
+    # La cota solo es válida con pesos no negativos y grupos regulares
+    usar_cota = (
+        all(pesos[k] >= 0 for k in ("huecos", "profes", "peso_turno", "carga"))
+        and all(r["regular"] for rs in resumenes for r in rs)
+    )
+
+    # Bloques de 30 min por día de cada grupo, para la cota de la penalización por día
+    bloques_grupo = [[conteos_por_dia(g)[0] for g in grupos] for grupos in grupos_input]
+
+    # Cotas de lo que falta por asignar (materias k..n-1)
+    rem_bloques_min = [[0] * len(DIAS_SEMANA) for _ in range(n + 1)]
+    rem_bloques_max = [[0] * len(DIAS_SEMANA) for _ in range(n + 1)]
+    rem_dur = [[0] * len(DIAS_SEMANA) for _ in range(n + 1)]
+    rem_calif = [0] * (n + 1)       # materias sin N/A: mejor calificación de cada una
+    rem_obligatorias = [0] * (n + 1)
+    rem_opcionales = [[] for _ in range(n + 1)]   # mejor calificación de cada opcional, de mayor a menor
+    rem_fin = [None] * (n + 1)      # la última salida será al menos esto
+    rem_inicio = [None] * (n + 1)   # el primer inicio será a lo más esto
+    techo_inicio = 0
+    for k in range(n - 1, -1, -1):
+        for d, dia in enumerate(DIAS_SEMANA):
+            rem_dur[k][d] = rem_dur[k + 1][d] + max(r["por_dia"].get(dia, (0, 0, 0))[2] for r in resumenes[k])
+            rem_bloques_min[k][d] = rem_bloques_min[k + 1][d] + min(b[d] for b in bloques_grupo[k])
+            rem_bloques_max[k][d] = rem_bloques_max[k + 1][d] + max(b[d] for b in bloques_grupo[k])
+        reales_k = [g['calificacion'] for g in grupos_input[k] if g['gpo'] != "N/A"]
+        if len(reales_k) == len(grupos_input[k]):
+            rem_calif[k] = rem_calif[k + 1] + max(reales_k)
+            rem_obligatorias[k] = rem_obligatorias[k + 1] + 1
+            rem_opcionales[k] = rem_opcionales[k + 1]
+        else:
+            rem_calif[k] = rem_calif[k + 1]
+            rem_obligatorias[k] = rem_obligatorias[k + 1]
+            rem_opcionales[k] = rem_opcionales[k + 1]
+            if reales_k:
+                rem_opcionales[k] = sorted(rem_opcionales[k + 1] + [max(reales_k)], reverse=True)
+
+        # Un grupo sin intervalos no obliga nada, así que esa materia no aporta cota
+        salidas = [r["ultima_salida"] for r in resumenes[k]]
+        candidatas = [x for x in (None if None in salidas else min(salidas), rem_fin[k + 1]) if x is not None]
+        rem_fin[k] = max(candidatas) if candidatas else None
+
+        entradas = [r["primer_inicio"] for r in resumenes[k]]
+        candidatas = [x for x in (None if None in entradas else max(entradas), rem_inicio[k + 1]) if x is not None]
+        rem_inicio[k] = min(candidatas) if candidatas else None
+
+        techo_inicio = max([techo_inicio] + [e for e in entradas if e is not None])
+
+    def cota(k, por_dia, suma_calif, primer, ultima, bloques, reales=0):
+        # Cota superior del score de cualquier combinación que complete la parcial (materias 0..k-1)
+        huecos = 0
+        for d, dia in enumerate(DIAS_SEMANA):
+            if dia in por_dia:
+                ini_d, fin_d, dur_d = por_dia[dia]
+                huecos += max(0, (fin_d - ini_d - dur_d) - rem_dur[k][d])
+        score = -(huecos / 60) * pesos['huecos']
+
+        # Promedio de calificaciones + carga, según cuántas opcionales pendientes se inscriban
+        # (si se inscriben j, lo mejor es que sean las j de mejor calificación)
+        base_reales = reales + rem_obligatorias[k]
+        suma = suma_calif + rem_calif[k]
+        mejor_carga = None
+        for j in range(len(rem_opcionales[k]) + 1):
+            if j:
+                suma += rem_opcionales[k][j - 1]
+            if base_reales + j == 0:
+                continue
+            valor = (suma / (base_reales + j)) * pesos['profes'] + (base_reales + j) * pesos['carga']
+            mejor_carga = valor if mejor_carga is None else max(mejor_carga, valor)
+        score += mejor_carga if mejor_carga is not None else 0
+
+        if pesos['tipo_turno'] == "Mañana (Temprano)":
+            candidatas = [x for x in (ultima, rem_fin[k]) if x is not None]
+            score += ((1440 - (max(candidatas) if candidatas else 0)) / 60) * pesos['peso_turno']
+        elif pesos['tipo_turno'] == "Tarde / Noche":
+            candidatas = [x for x in (primer, rem_inicio[k]) if x is not None]
+            score += ((min(candidatas) if candidatas else techo_inicio) / 60) * pesos['peso_turno']
+
+        penalizacion = cota_penalizacion_por_dia(
+            [b + r for b, r in zip(bloques, rem_bloques_min[k])],
+            [b + r for b, r in zip(bloques, rem_bloques_max[k])],
+            config_dias,
+            w_dias
+        )
+        score += penalizacion
+        if base_reales == 0:
+            # Todas pueden quedar sin inscribir: calcular_score da -1000
+            score = max(score, -1000 + penalizacion)
+        return score
+
+
+    return usar_cota, cota, resumenes, bloques_grupo
+
+
+def buscar_mejores_horarios(grupos_input, pesos, top_k=10, config_dias=None, w_dias=35, callback_progreso=None, prefijo=(),
+                            callback_parcial=None, limite_segundos=None, cancelar=None):
+    """
+    Top-k de calcular_score + calcular_penalizacion_por_dia en profundidad, podando traslapes y
+    ramas que no pueden entrar al heap. Mismo resultado que recorrer itertools.product.
+    Retorna (lista de (score, idx, combinacion) ordenada, estadísticas).
+    """
+    n = len(grupos_input)
+    # Si se acaba limite_segundos o se prende cancelar, "completa" queda en False y "detenida" dice por qué
+    stats = {"nodos": 0, "hojas": 0, "podas_traslape": 0, "podas_cota": 0, "completa": True, "detenida": None}
+    if n == 0:
+        return [], stats
+    hasta = None if limite_segundos is None else time.monotonic() + limite_segundos
+
+    # strides[k] = combinaciones bajo un nodo de profundidad k (idx igual al de itertools.product)
+    strides = [1] * n
+    for k in range(n - 2, -1, -1):
+        strides[k] = strides[k + 1] * len(grupos_input[k + 1])
+    total = strides[0] * len(grupos_input[0])
+
+    ids, conflictos = precalcular_conflictos(grupos_input)
+
+    # Bitset con todos los grupos de cada materia, para detectar materias que ya no caben
+    mascara_materia = [sum(1 << i for i in ids_k) for ids_k in ids]
+
+    usar_cota, cota, resumenes, bloques_grupo = _preparar_cota(grupos_input, pesos, config_dias, w_dias)
+    if usar_cota:
+        stats["cota_superior"] = cota(0, {}, 0, None, None, [0] * len(DIAS_SEMANA))
+
+    tabla = construir_tabla_features(grupos_input)
+    top_heap = []
+    elegidos = []
+    ids_elegidos = []
+    revisadas = [0]
+
+    # Hojas pendientes de puntuar; se meten al heap en orden de idx, así que el heap
+    # evoluciona igual que uno por uno (solo poda un poco menos mientras se llena el lote)
+    lote_ids = []
+    lote_hojas = []
+
+    def vaciar_lote():
+        if not lote_hojas:
+            return
+        if tabla["exacta"]:
+            scores = (
+                puntuar_lote(lote_ids, tabla, pesos) + penalizacion_lote(lote_ids, tabla, config_dias, w_dias)
+            ).tolist()
+        else:
+            scores = [
+                calcular_score(comb, pesos)
+                + calcular_penalizacion_por_dia({"materias": comb}, config_dias, w_dias=w_dias)
+                for _, comb in lote_hojas
+            ]
+        for sc, (idx, comb) in zip(scores, lote_hojas):
+            if len(top_heap) < top_k:
+                heapq.heappush(top_heap, (sc, idx, comb))
+            elif sc > top_heap[0][0]:
+                heapq.heapreplace(top_heap, (sc, idx, comb))
+        lote_ids.clear()
+        lote_hojas.clear()
+
+    reloj = {"llamadas": 0, "reporte": time.monotonic()}
+
+    def avanzar(cuantas):
+        # Combinaciones ya descartadas o evaluadas, para la barra de progreso
+        revisadas[0] += cuantas
+        reloj["llamadas"] += 1
+        if reloj["llamadas"] % NODOS_POR_CHEQUEO:
+            return
+        ahora = time.monotonic()
+        if cancelar is not None and cancelar.is_set():
+            stats["detenida"] = "cancelada"
+            raise _BusquedaDetenida()
+        if hasta is not None and ahora >= hasta:
+            stats["detenida"] = "tiempo"
+            raise _BusquedaDetenida()
+        if ahora - reloj["reporte"] >= INTERVALO_PARCIAL:
+            reloj["reporte"] = ahora
+            if callback_progreso is not None:
+                callback_progreso(min(revisadas[0] / total, 1.0))
+            if callback_parcial is not None:
+                vaciar_lote()
+                callback_parcial(sorted(top_heap, key=lambda x: (-x[0], x[1])))
+
+    def dfs(k, idx_base, bloqueados, por_dia, suma_calif, primer, ultima, bloques, reales):
+        for j, g in enumerate(grupos_input[k]):
+            if k < len(prefijo) and j != prefijo[k]:
+                continue
+            idx = idx_base + j * strides[k]
+            stats["nodos"] += 1
+
+            # Traslape con lo ya elegido, o alguna materia pendiente se queda sin grupos posibles
+            nuevos_bloqueados = bloqueados | conflictos[ids[k][j]]
+            if bloqueados >> ids[k][j] & 1 or any(
+                mascara_materia[m] & ~nuevos_bloqueados == 0 for m in range(k + 1, n)
+            ):
+                stats["podas_traslape"] += 1
+                avanzar(strides[k])
+                continue
+
+            r = resumenes[k][j]
+            nuevo_por_dia = dict(por_dia)
+            for dia, (ini_g, fin_g, dur_g) in r["por_dia"].items():
+                if dia in nuevo_por_dia:
+                    ini_d, fin_d, dur_d = nuevo_por_dia[dia]
+                    nuevo_por_dia[dia] = (min(ini_d, ini_g), max(fin_d, fin_g), dur_d + dur_g)
+                else:
+                    nuevo_por_dia[dia] = (ini_g, fin_g, dur_g)
+            nuevo_primer = primer if r["primer_inicio"] is None else (
+                r["primer_inicio"] if primer is None else min(primer, r["primer_inicio"]))
+            nueva_ultima = ultima if r["ultima_salida"] is None else (
+                r["ultima_salida"] if ultima is None else max(ultima, r["ultima_salida"]))
+            if g['gpo'] == "N/A":
+                nueva_suma, nuevos_reales = suma_calif, reales
+            else:
+                nueva_suma, nuevos_reales = suma_calif + g['calificacion'], reales + 1
+            nuevos_bloques = [b + b_g for b, b_g in zip(bloques, bloques_grupo[k][j])]
+
+            if usar_cota and len(top_heap) >= top_k:
+                if cota(k + 1, nuevo_por_dia, nueva_suma, nuevo_primer, nueva_ultima, nuevos_bloques, nuevos_reales) + EPS_COTA <= top_heap[0][0]:
+                    stats["podas_cota"] += 1
+                    avanzar(strides[k])
+                    continue
+
+            elegidos.append(g)
+            ids_elegidos.append(ids[k][j])
+            if k == n - 1:
+                stats["hojas"] += 1
+                lote_ids.append(list(ids_elegidos))
+                lote_hojas.append((idx, tuple(elegidos)))
+                if len(lote_hojas) >= TAMANO_LOTE:
+                    vaciar_lote()
+                avanzar(1)
+            else:
+                dfs(k + 1, idx, nuevos_bloqueados, nuevo_por_dia, nueva_suma, nuevo_primer, nueva_ultima, nuevos_bloques,
+                    nuevos_reales)
+            elegidos.pop()
+            ids_elegidos.pop()
+
+    try:
+        dfs(0, 0, 0, {}, 0, None, None, [0] * len(DIAS_SEMANA), 0)
+    except _BusquedaDetenida:
+        # Las hojas del lote ya se recorrieron en orden: cuentan para el resultado parcial
+        stats["completa"] = False
+    vaciar_lote()
+    stats["revisadas"] = revisadas[0]
+    stats["total"] = total
+
+    if callback_progreso is not None:
+        callback_progreso(1.0 if stats["completa"] else min(revisadas[0] / total, 1.0))
+
+    mejores = sorted(top_heap, key=lambda x: (-x[0], x[1]))
+    return mejores, stats
+
+
+# --- BÚSQUEDA EN PARALELO (VARIOS PROCESOS) ---
+# A partir de cuántas combinaciones vale la pena repartir la búsqueda entre procesos
+MIN_COMBINACIONES_PARALELO = 5_000_000
+RAMAS_POR_PROCESO = 4
+# Procesos del pool que comparten todas las búsquedas (de todos los usuarios) de este servidor
+MAX_PROCESOS_BUSQUEDA = int(os.environ.get("HORARIOS_PROCESOS", 0)) or os.cpu_count() or 1
+# Búsquedas que pueden usar el pool a la vez; si llegan más, esas se hacen en su propio hilo
+MAX_BUSQUEDAS_PARALELAS = 8
+
+
+def combinacion_desde_idx(grupos_input, idx):
+    """Inverso del idx de itertools.product(*grupos_input): regresa la combinación."""
+    elecciones = []
+    for grupos in reversed(grupos_input):
+        idx, j = divmod(idx, len(grupos))
+        elecciones.append(grupos[j])
+    return tuple(reversed(elecciones))
+
+
+# En los procesos del pool: una bandera de "detente" por búsqueda (memoria compartida con el padre)
+_banderas_ramas = None
+
+
+def _iniciar_proceso_rama(banderas):
+    global _banderas_ramas
+    _banderas_ramas = banderas
+
+
+class _BanderaRama:
+    """El cancelar de una rama (solo is_set): lee la bandera de su búsqueda."""
+
+    def __init__(self, ranura):
+        self.ranura = ranura
+
+    def is_set(self):
+        return _banderas_ramas[self.ranura] != 0
+
+
+def _buscar_en_rama(grupos_input, pesos, top_k, config_dias, w_dias, prefijo, ranura, hasta=None):
+    # Corre en el proceso hijo; regresa solo (score, idx) para no mandar los grupos de vuelta.
+    # hasta es de time.monotonic, que en el mismo equipo es el mismo reloj para todos los procesos
+    mejores, stats = buscar_mejores_horarios(
+        grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias, prefijo=prefijo,
+        limite_segundos=None if hasta is None else max(0.0, hasta - time.monotonic()),
+        cancelar=_BanderaRama(ranura)
+    )
+    return [(sc, idx) for sc, idx, _ in mejores], stats
+
+
+# Pool compartido (en el proceso de la app); se crea con la primera búsqueda en paralelo
+_pool = None
+_pool_pid = None
+_banderas = None
+_ranuras_libres = None
+_lock_pool = threading.Lock()
+
+
+def _pool_busqueda():
+    """(pool, banderas, ranuras libres) compartidos; se crean de nuevo si el pool se descartó o tras un fork."""
+    global _pool, _pool_pid, _banderas, _ranuras_libres
+    with _lock_pool:
+        if _pool is None or _pool_pid != os.getpid():
+            # Con fork, un hijo puede heredar un lock tomado por otro hilo del servidor y trabarse
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                contexto = multiprocessing.get_context("forkserver")
+                # El servidor ya trae cargado este módulo (y numpy): cada proceso nuevo no lo reimporta
+                contexto.set_forkserver_preload(["horarios_fi.busqueda", "numpy"])
+            else:
+                contexto = multiprocessing.get_context("spawn")
+            banderas = contexto.RawArray("b", MAX_BUSQUEDAS_PARALELAS)
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESOS_BUSQUEDA, mp_context=contexto,
+                                        initializer=_iniciar_proceso_rama, initargs=(banderas,))
+            _pool_pid = os.getpid()
+            _banderas = banderas
+            _ranuras_libres = queue.SimpleQueue()
+            for ranura in range(MAX_BUSQUEDAS_PARALELAS):
+                _ranuras_libres.put(ranura)
+        return _pool, _banderas, _ranuras_libres
+
+
+def _descartar_pool(pool):
+    # Un pool roto no se recupera: la siguiente búsqueda crea otro
+    global _pool
+    with _lock_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _top_desde_candidatos(grupos_input, candidatos, top_k):
+    # Mismo heap que la búsqueda secuencial: se alimenta en orden de idx
+    top_heap = []
+    for sc, idx in sorted(candidatos, key=lambda x: x[1]):
+        if len(top_heap) < top_k:
+            heapq.heappush(top_heap, (sc, idx))
+        elif sc > top_heap[0][0]:
+            heapq.heapreplace(top_heap, (sc, idx))
+
+    mejores = sorted(top_heap, key=lambda x: (-x[0], x[1]))
+    return [(sc, idx, combinacion_desde_idx(grupos_input, idx)) for sc, idx in mejores]
+
+
+def buscar_mejores_horarios_paralelo(grupos_input, pesos, top_k=10, config_dias=None, w_dias=35,
+                                     callback_progreso=None, n_procesos=None,
+                                     callback_parcial=None, limite_segundos=None, cancelar=None):
+    """
+    buscar_mejores_horarios repartida entre los procesos del pool por prefijos de grupos.
+    Sin núcleos extra, sin ranuras libres o si el pool se rompe, busca en este proceso.
+    """
+    secuencial = dict(
+        top_k=top_k, config_dias=config_dias, w_dias=w_dias, callback_progreso=callback_progreso,
+        callback_parcial=callback_parcial, limite_segundos=limite_segundos, cancelar=cancelar
+    )
+    n_procesos = min(n_procesos or MAX_PROCESOS_BUSQUEDA, MAX_PROCESOS_BUSQUEDA)
+    if n_procesos <= 1 or len(grupos_input) < 2:
+        return buscar_mejores_horarios(grupos_input, pesos, **secuencial)
+
+    hasta = None if limite_segundos is None else time.monotonic() + limite_segundos
+    try:
+        pool, banderas, ranuras_libres = _pool_busqueda()
+        ranura = ranuras_libres.get_nowait()
+    except queue.Empty:
+        return buscar_mejores_horarios(grupos_input, pesos, **secuencial)
+    except OSError:
+        registro.warning("No se pudo crear el pool de la búsqueda; se busca en este proceso", exc_info=True)
+        return buscar_mejores_horarios(grupos_input, pesos, **secuencial)
+
+    # Prefijo más corto que dé suficientes ramas para todos los procesos
+    profundidad = 1
+    n_ramas = len(grupos_input[0])
+    while n_ramas < n_procesos * RAMAS_POR_PROCESO and profundidad < len(grupos_input) - 1:
+        n_ramas *= len(grupos_input[profundidad])
+        profundidad += 1
+
+    # Los prefijos que ya traen traslape no se mandan
+    ids, conflictos = precalcular_conflictos(grupos_input[:profundidad])
+    prefijos = [
+        p for p in itertools.product(*[range(len(grupos)) for grupos in grupos_input[:profundidad]])
+        if es_combinacion_valida([ids[k][j] for k, j in enumerate(p)], conflictos)
+    ]
+
+    stats = {"nodos": 0, "hojas": 0, "podas_traslape": 0, "podas_cota": 0, "completa": True, "detenida": None}
+    candidatos = []
+    pendientes = set()
+    terminados = 0
+    pool_roto = False
+    banderas[ranura] = 0
+    try:
+        pendientes = {
+            pool.submit(_buscar_en_rama, grupos_input, pesos, top_k, config_dias, w_dias, p, ranura, hasta)
+            for p in prefijos
+        }
+        while pendientes:
+            listos, pendientes = wait(pendientes, timeout=INTERVALO_PARCIAL, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                mejores_rama, stats_rama = futuro.result()
+                candidatos.extend(mejores_rama)
+                for clave in ("nodos", "hojas", "podas_traslape", "podas_cota"):
+                    stats[clave] += stats_rama[clave]
+                if not stats_rama["completa"]:
+                    stats["completa"] = False
+                    stats["detenida"] = stats["detenida"] or stats_rama["detenida"]
+            terminados += len(listos)
+
+            if cancelar is not None and cancelar.is_set() and not banderas[ranura]:
+                stats["detenida"] = "cancelada"
+                banderas[ranura] = 1
+            if listos:
+                if callback_progreso is not None:
+                    callback_progreso(terminados / len(prefijos))
+                if callback_parcial is not None:
+                    callback_parcial(_top_desde_candidatos(grupos_input, candidatos, top_k))
+    except (BrokenProcessPool, OSError):
+        registro.warning("Se rompió el pool de la búsqueda; se sigue en este proceso", exc_info=True)
+        pool_roto = True
+    except Exception:
+        registro.exception("Falló una rama de la búsqueda en paralelo")
+        raise
+    finally:
+        # Las ramas que sigan en cola o corriendo se detienen solas; la ranura se libera cuando acaban
+        banderas[ranura] = 1
+        for futuro in pendientes:
+            futuro.cancel()
+        wait(pendientes)
+        banderas[ranura] = 0
+        ranuras_libres.put(ranura)
+
+    if pool_roto:
+        _descartar_pool(pool)
+        restante = None if hasta is None else max(0.0, hasta - time.monotonic())
+        return buscar_mejores_horarios(grupos_input, pesos, **dict(secuencial, limite_segundos=restante))
+
+    if callback_progreso is not None:
+        callback_progreso(1.0 if stats["completa"] else terminados / max(len(prefijos), 1))
+
+    return _top_desde_candidatos(grupos_input, candidatos, top_k), stats
+
+
+# --- BÚSQUEDA HEURÍSTICA PARA ESPACIOS ENORMES (ANYTIME) ---
+# A partir de cuántas combinaciones vale la pena empezar con la heurística
+MIN_COMBINACIONES_HEURISTICA = 5_000_000
+# Parte del tiempo máximo que se le da a la heurística antes del branch and bound
+FRACCION_HEURISTICA = 0.3
+# Combinaciones parciales que sobreviven en cada paso de la búsqueda en haz (semilla)
+ANCHO_HAZ = 64
+# Máximo de combinaciones que se re-enumeran en un paso de vecindario grande
+MAX_VECINDARIO = 4096
+
+
+def puntuar_filas(filas, tabla, planos, pesos, config_dias=None, w_dias=35):
+    """Score completo (con la penalización por día) de cada fila de ids; NumPy si la tabla es exacta."""
+    if tabla["exacta"]:
+        return puntuar_lote(filas, tabla, pesos) + penalizacion_lote(filas, tabla, config_dias, w_dias)
+    scores = []
+    for fila in filas.tolist():
+        comb = [planos[i] for i in fila]
+        scores.append(calcular_score(comb, pesos) + calcular_penalizacion_por_dia({"materias": comb}, config_dias, w_dias=w_dias))
+    return np.asarray(scores, dtype=np.float64)
+
+
+def buscar_heuristica(grupos_input, pesos, top_k=10, config_dias=None, w_dias=35, limite_segundos=5.0,
+                      callback_parcial=None, cancelar=None, semilla=0):
+    """
+    Top-k aproximado (haz + vecindarios grandes) hasta limite_segundos o cancelar.
+    Regresa (top como buscar_mejores_horarios, stats); stats["cota_superior"] acota todo el espacio.
+    """
+    hasta = time.monotonic() + limite_segundos
+    n = len(grupos_input)
+    stats = {"iteraciones": 0, "evaluadas": 0, "cota_superior": None, "completa": False, "detenida": "tiempo"}
+    if n == 0:
+        return [], stats
+
+    usar_cota, cota, _, _ = _preparar_cota(grupos_input, pesos, config_dias, w_dias)
+    if usar_cota:
+        stats["cota_superior"] = cota(0, {}, 0, None, None, [0] * len(DIAS_SEMANA))
+
+    ids, conflictos = precalcular_conflictos(grupos_input)
+    choque = matriz_choques(grupos_input)
+    mascara_materia = [sum(1 << i for i in ids_k) for ids_k in ids]
+    tabla = construir_tabla_features(grupos_input)
+    planos = [g for grupos in grupos_input for g in grupos]
+    rng = np.random.default_rng(semilla)
+
+    strides = [1] * n
+    for k in range(n - 2, -1, -1):
+        strides[k] = strides[k + 1] * len(grupos_input[k + 1])
+
+    # Heap de (score, -idx, fila): el peor arriba; entre empates sale el de idx mayor
+    top_heap = []
+    en_heap = set()
+
+    def registrar(filas, scores):
+        stats["evaluadas"] += len(filas)
+        if len(top_heap) >= top_k:
+            dejar = np.flatnonzero(scores >= top_heap[0][0])
+            filas, scores = filas[dejar], scores[dejar]
+        for fila, sc in zip(filas.tolist(), scores.tolist()):
+            idx = sum((i - ids[k][0]) * strides[k] for k, i in enumerate(fila))
+            if idx in en_heap:
+                continue
+            entrada = (sc, -idx, tuple(fila))
+            if len(top_heap) < top_k:
+                heapq.heappush(top_heap, entrada)
+            elif entrada[:2] > top_heap[0][:2]:
+                en_heap.discard(-heapq.heapreplace(top_heap, entrada)[1])
+            else:
+                continue
+            en_heap.add(idx)
+
+    def resultado():
+        return [
+            (sc, -menos_idx, tuple(planos[i] for i in fila))
+            for sc, menos_idx, fila in sorted(top_heap, key=lambda x: (-x[0], -x[1]))
+        ]
+
+    def detener():
+        if cancelar is not None and cancelar.is_set():
+            stats["detenida"] = "cancelada"
+            return True
+        return time.monotonic() >= hasta
+
+    # 1. Haz: materias con menos grupos primero, parciales puntuadas como si fueran el horario entero
+    orden = sorted(range(n), key=lambda k: len(ids[k]))
+    haz = [((), 0)]
+    for paso, k in enumerate(orden):
+        pendientes = orden[paso + 1:]
+        extendidas = []
+        for parcial, bloqueados in haz:
+            for i in ids[k]:
+                if bloqueados >> i & 1:
+                    continue
+                nuevos = bloqueados | conflictos[i]
+                # Alguna materia pendiente se queda sin grupos posibles
+                if any(mascara_materia[m] & ~nuevos == 0 for m in pendientes):
+                    continue
+                extendidas.append((parcial + (i,), nuevos))
+        if not extendidas or detener():
+            haz = []
+            break
+        if len(extendidas) > ANCHO_HAZ:
+            scores = puntuar_filas(np.array([p for p, _ in extendidas]), tabla, planos, pesos, config_dias, w_dias)
+            mejores = np.argsort(-scores, kind="stable")[:ANCHO_HAZ]
+            extendidas = [extendidas[j] for j in mejores.tolist()]
+        haz = extendidas
+
+    if haz:
+        # Regresar las columnas al orden de las materias
+        filas = np.empty((len(haz), n), dtype=np.int64)
+        filas[:, orden] = np.array([p for p, _ in haz])
+        registrar(filas, puntuar_filas(filas, tabla, planos, pesos, config_dias, w_dias))
+
+    # 2. Vecindarios grandes: se sueltan algunas materias de una de las mejores y se prueban todas
+    ultimo_reporte = time.monotonic()
+    while top_heap and not detener():
+        base = top_heap[int(rng.integers(len(top_heap)))][2]
+        libres = []
+        tamano = 1
+        for k in rng.permutation(n).tolist():
+            if tamano * len(ids[k]) > MAX_VECINDARIO:
+                continue
+            libres.append(k)
+            tamano *= len(ids[k])
+        ids_por_materia = [ids[k] if k in libres else [base[k]] for k in range(n)]
+        filas = _enumerar_con_choques(ids_por_materia, choque, MAX_VECINDARIO)
+        if filas is not None and len(filas):
+            registrar(filas, puntuar_filas(filas, tabla, planos, pesos, config_dias, w_dias))
+        stats["iteraciones"] += 1
+
+        if callback_parcial is not None and time.monotonic() - ultimo_reporte >= INTERVALO_PARCIAL:
+            ultimo_reporte = time.monotonic()
+            callback_parcial(resultado())
+
+    return resultado(), stats
+
+
+def juntar_tops(top_a, top_b, top_k=10):
+    """Une dos top-k (score, idx, combinación) sin repetir idx, ordenado por (-score, idx)."""
+    vistos = {}
+    for sc, idx, comb in itertools.chain(top_a, top_b):
+        vistos.setdefault(idx, (sc, idx, comb))
+    return sorted(vistos.values(), key=lambda x: (-x[0], x[1]))[:top_k]
+
+
+def iterar_mejores_horarios(grupos_input, pesos, top_k=10, config_dias=None, w_dias=35,
+                            limite_segundos=None, paralelo=False, heuristica=False):
+    """
+    Corre la búsqueda en un hilo y entrega dicts {"top", "progreso", "terminada", "stats"};
+    el último trae terminada=True. Si se deja de iterar antes, la búsqueda se cancela.
+    """
+    buscar = buscar_mejores_horarios_paralelo if paralelo else buscar_mejores_horarios
+    cola = queue.Queue()
+    cancelar = threading.Event()
+    progreso = [0.0]
+
+    def correr():
+        try:
+            top_heuristica, stats_heuristica = [], None
+            restante = limite_segundos
+            # La heurística usa una parte del tiempo; si el branch and bound no termina se juntan
+            if heuristica and limite_segundos:
+                inicio = time.monotonic()
+                top_heuristica, stats_heuristica = buscar_heuristica(
+                    grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias,
+                    limite_segundos=limite_segundos * FRACCION_HEURISTICA,
+                    callback_parcial=lambda top: cola.put(("parcial", top)), cancelar=cancelar
+                )
+                restante = max(0.0, limite_segundos - (time.monotonic() - inicio))
+                cola.put(("parcial", top_heuristica))
+
+            top, stats = buscar(
+                grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias,
+                callback_progreso=lambda p: progreso.__setitem__(0, p),
+                callback_parcial=lambda top: cola.put(("parcial", juntar_tops(top, top_heuristica, top_k))),
+                limite_segundos=restante, cancelar=cancelar
+            )
+            if stats_heuristica is not None:
+                stats["heuristica"] = stats_heuristica
+                if not stats["completa"]:
+                    top = juntar_tops(top, top_heuristica, top_k)
+                    stats.setdefault("cota_superior", stats_heuristica["cota_superior"])
+            cola.put(("fin", (top, stats)))
+        except BaseException as e:
+            cola.put(("error", e))
+
+    threading.Thread(target=correr, daemon=True).start()
+    try:
+        while True:
+            tipo, valor = cola.get()
+            # Si el consumidor se atrasó, solo importa lo más reciente
+            while tipo == "parcial" and not cola.empty():
+                tipo, valor = cola.get()
+            if tipo == "error":
+                raise valor
+            if tipo == "fin":
+                top, stats = valor
+                yield {"top": top, "progreso": progreso[0], "terminada": True, "stats": stats}
+                return
+            yield {"top": valor, "progreso": progreso[0], "terminada": False, "stats": None}
+    finally:
+        cancelar.set()
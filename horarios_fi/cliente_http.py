@@ -0,0 +1,130 @@
+"""
+Cliente HTTP compartido por toda la app (SSA de la facultad e IngenieriaTracker).
+
+- Una sola requests.Session con pool de conexiones (keep-alive, sin handshake TLS por petición).
+- Reintentos acotados con espera exponencial y jitter ante errores de red, 429 y 5xx, dentro
+  de un tiempo total por petición (con el SSA caído, una petición no tarda más que un intento).
+- GET condicional: recuerda ETag / Last-Modified de cada URL y, si el servidor responde 304,
+  regresa el cuerpo que ya tenía.
+
+No usa Streamlit: se puede probar contra un servidor HTTP local.
+"""
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from horarios_fi.perezoso import ModuloPerezoso
+
+# requests se importa al crear el primer cliente, no al arrancar la app
+requests = ModuloPerezoso("requests")
+
+# Estados que vale la pena reintentar
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+# No se empieza otro intento si quedan menos de estos segundos del tiempo total
+MIN_SEGUNDOS_INTENTO = 0.5
+
+
+class RespuestaHTTP:
+    """Lo que usa la app de una respuesta: status_code, text y json(). desde_cache = vino de un 304."""
+
+    def __init__(self, status_code, text, headers=None, desde_cache=False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.desde_cache = desde_cache
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class ClienteHTTP:
+    """
+    Se comparte entre hilos. get() tiene la misma forma que requests.get para lo que usa la app
+    y deja pasar las mismas excepciones (requests.exceptions.Timeout, ConnectionError...)
+    cuando se acaban los reintentos o el tiempo total.
+    """
+
+    def __init__(self, reintentos=2, espera_base=0.25, espera_max=2.0, conexiones=16,
+                 max_condicionales=2000, sesion=None):
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.max_condicionales = max_condicionales
+
+        self.sesion = sesion or requests.Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=conexiones)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+
+        # url -> (etag, last_modified, text) de la última respuesta 200 con validadores
+        self._condicionales = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _espera(self, intento):
+        # Jitter completo: evita que muchos clientes reintenten al mismo tiempo
+        return random.uniform(0, min(self.espera_max, self.espera_base * (2 ** intento)))
+
+    def _esperar_reintento(self, intento, hasta):
+        """Duerme antes del siguiente intento; False si ya no quedan intentos o no alcanza el tiempo."""
+        if intento >= self.reintentos:
+            return False
+        espera = self._espera(intento)
+        if time.monotonic() + espera + MIN_SEGUNDOS_INTENTO > hasta:
+            return False
+        time.sleep(espera)
+        return True
+
+    def get(self, url, timeout=5, params=None, condicional=True, limite_total=None):
+        """
+        timeout es el de cada intento; limite_total, el de todos los intentos y esperas juntos
+        (default: timeout, lo mismo que tardaba una petición sin reintentos).
+        """
+        if params:
+            url = requests.Request("GET", url, params=params).prepare().url
+
+        headers = {}
+        guardada = None
+        if condicional:
+            with self._lock:
+                guardada = self._condicionales.get(url)
+            if guardada:
+                etag, modificado, _ = guardada
+                if etag:
+                    headers["If-None-Match"] = etag
+                if modificado:
+                    headers["If-Modified-Since"] = modificado
+
+        hasta = time.monotonic() + (timeout if limite_total is None else limite_total)
+        intento = 0
+        while True:
+            restante = max(hasta - time.monotonic(), MIN_SEGUNDOS_INTENTO)
+            try:
+                response = self.sesion.get(url, timeout=min(timeout, restante), headers=headers)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not self._esperar_reintento(intento, hasta):
+                    raise
+                intento += 1
+                continue
+
+            if response.status_code in ESTADOS_REINTENTABLES and self._esperar_reintento(intento, hasta):
+                intento += 1
+                continue
+            break
+
+        if response.status_code == 304 and guardada:
+            return RespuestaHTTP(200, guardada[2], response.headers, desde_cache=True)
+
+        if response.status_code == 200 and condicional:
+            etag = response.headers.get("ETag")
+            modificado = response.headers.get("Last-Modified")
+            if etag or modificado:
+                with self._lock:
+                    self._condicionales[url] = (etag, modificado, response.text)
+                    self._condicionales.move_to_end(url)
+                    while len(self._condicionales) > self.max_condicionales:
+                        self._condicionales.popitem(last=False)
+
+        return RespuestaHTTP(response.status_code, response.text, response.headers)
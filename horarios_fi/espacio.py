@@ -0,0 +1,253 @@
+"""
+Espacio de combinaciones válidas de una sesión.
+
+Se enumera una sola vez (con la matriz de choques entre grupos) y se guarda con sus
+features; al mover pesos, calificaciones o la configuración por día solo se vuelve a
+puntuar y ordenar. Prender o apagar un grupo lo actualiza sin enumerar todo otra vez.
+"""
+import heapq
+
+from horarios_fi.perezoso import ModuloPerezoso
+from horarios_fi.puntaje import (
+    construir_tabla_features, features_lote, hay_traslape, penalizacion_features,
+    precalcular_conflictos, puntuar_features
+)
+
+np = ModuloPerezoso("numpy")
+
+
+# --- ESPACIO DE COMBINACIONES VÁLIDAS (RE-ORDENAR SIN VOLVER A ENUMERAR) ---
+# Hasta cuántas combinaciones válidas se guardan por sesión (~100 bytes cada una)
+MAX_COMBINACIONES_EN_MEMORIA = 250_000
+# Filas por pedazo al calcular las features del espacio
+PEDAZO_FEATURES = 65_536
+
+
+def firma_grupos(grupos_input):
+    """Lo que decide qué combinaciones son válidas: qué grupos están activos y sus intervalos."""
+    return tuple(
+        tuple(
+            (g.get('materia_nombre'), g.get('gpo'), tuple((s['dia'], s['inicio'], s['fin']) for s in g.get('intervalos', [])))
+            for g in grupos
+        )
+        for grupos in grupos_input
+    )
+
+
+def matriz_choques(grupos_input):
+    """Los bitsets de precalcular_conflictos como matriz booleana (id x id)."""
+    _, conflictos = precalcular_conflictos(grupos_input)
+    n_grupos = len(conflictos)
+    choque = np.zeros((n_grupos, n_grupos), dtype=bool)
+    for a, bits in enumerate(conflictos):
+        b = 0
+        while bits:
+            if bits & 1:
+                choque[a, b] = True
+            bits >>= 1
+            b += 1
+    return choque
+
+
+def _enumerar_con_choques(ids, choque, limite):
+    """Combinaciones sin traslapes de los ids de cada materia, en orden de itertools.product; None si pasan de limite."""
+    parciales = np.asarray(ids[0], dtype=np.int32).reshape(-1, 1)
+    if len(parciales) > limite:
+        return None
+    for k in range(1, len(ids)):
+        nuevos = np.asarray(ids[k], dtype=np.int32)
+        compatibles = np.ones((len(parciales), len(nuevos)), dtype=bool)
+        for c in range(k):
+            compatibles &= ~choque[np.ix_(parciales[:, c], nuevos)]
+        # np.nonzero recorre por filas: el orden de itertools.product se conserva
+        filas, columnas = np.nonzero(compatibles)
+        if len(filas) > limite:
+            return None
+        parciales = np.column_stack((parciales[filas], nuevos[columnas]))
+    return parciales
+
+
+def _features_por_pedazos(ids, tabla):
+    # Por pedazos, para no armar de golpe los arreglos (filas x materias x días) de todo el espacio
+    partes = [features_lote(ids[i:i + PEDAZO_FEATURES], tabla) for i in range(0, len(ids), PEDAZO_FEATURES)]
+    if not partes:
+        # Sin filas, pero con las mismas llaves para poder agregarle combinaciones después
+        return features_lote(ids, tabla)
+    return {llave: np.concatenate([f[llave] for f in partes]) for llave in partes[0]}
+
+
+class EspacioCombinaciones:
+    """
+    Todas las combinaciones válidas de un conjunto de grupos activos con sus features ya reducidas.
+    Cambiar pesos o la configuración por día solo vuelve a puntuar (vectorizado) y ordenar.
+    Prender o apagar grupos (actualizar) filtra o extiende el espacio sin volver a enumerarlo.
+    """
+
+    def __init__(self, grupos_input, ids, tabla, choque=None):
+        self.planos = [g for grupos in grupos_input for g in grupos]
+        self.firma = firma_grupos(grupos_input)
+        # Calificación con la que se calcularon las features, por id
+        self.califs = [g['calificacion'] for g in self.planos]
+        self.choque = matriz_choques(grupos_input) if choque is None else choque
+        self.ids = ids
+        self.feat = _features_por_pedazos(ids, tabla)
+
+    @classmethod
+    def construir(cls, grupos_input, limite=MAX_COMBINACIONES_EN_MEMORIA):
+        """El espacio completo, o None si las combinaciones no caben o el score no sería exacto."""
+        tabla = construir_tabla_features(grupos_input)
+        if not tabla["exacta"]:
+            return None
+        ids, _ = precalcular_conflictos(grupos_input)
+        choque = matriz_choques(grupos_input)
+        filas = _enumerar_con_choques(ids, choque, limite)
+        if filas is None:
+            return None
+        return cls(grupos_input, filas, tabla, choque)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _quitar_grupos(self, quitar):
+        """Quita los ids de quitar (y las combinaciones que los usan) y renumera los demás."""
+        quedan = np.ones(len(self.planos), dtype=bool)
+        quedan[quitar] = False
+        filas = quedan[self.ids].all(axis=1)
+        nuevo_id = np.cumsum(quedan, dtype=np.int32) - 1
+
+        self.ids = nuevo_id[self.ids[filas]]
+        self.feat = {llave: valores[filas] for llave, valores in self.feat.items()}
+        self.choque = self.choque[np.ix_(quedan, quedan)]
+        quedan = quedan.tolist()
+        self.planos = [g for g, queda in zip(self.planos, quedan) if queda]
+        self.califs = [c for c, queda in zip(self.califs, quedan) if queda]
+
+    def _agregar_grupo(self, grupos_input, k, pos, limite):
+        """Mete grupos_input[k][pos] y enumera solo las combinaciones que lo usan; False si ya no cabe."""
+        grupo = grupos_input[k][pos]
+        inicios = np.cumsum([0] + [len(grupos) for grupos in grupos_input]).tolist()
+        nuevo = inicios[k] + pos
+
+        self.ids[self.ids >= nuevo] += 1
+        self.planos.insert(nuevo, grupo)
+        self.califs.insert(nuevo, grupo['calificacion'])
+
+        # Fila/columna de choques del grupo nuevo: solo contra grupos de otras materias
+        fila = np.zeros(len(self.planos), dtype=bool)
+        for m, grupos in enumerate(grupos_input):
+            if m != k:
+                for j, g in enumerate(grupos):
+                    fila[inicios[m] + j] = hay_traslape(grupo, g)
+        choque = np.insert(self.choque, nuevo, False, axis=0)
+        choque = np.insert(choque, nuevo, fila, axis=1)
+        choque[nuevo] = fila
+        self.choque = choque
+
+        ids_por_materia = [list(range(inicios[m], inicios[m + 1])) for m in range(len(grupos_input))]
+        ids_por_materia[k] = [nuevo]
+        nuevas = _enumerar_con_choques(ids_por_materia, self.choque, limite)
+        if nuevas is None or len(self.ids) + len(nuevas) > limite:
+            return False
+        if not len(nuevas):
+            return True
+
+        # Las features de las filas nuevas salen con las calificaciones guardadas, como las viejas
+        tabla = construir_tabla_features(grupos_input)
+        tabla["calif"][tabla["real"]] = np.asarray(self.califs, dtype=np.float64)[tabla["real"]]
+        feat_nuevas = _features_por_pedazos(nuevas, tabla)
+
+        todas = np.concatenate((self.ids, nuevas))
+        # Los ids crecen con la posición dentro de cada materia: ordenar por columnas da el orden de product
+        orden = np.lexsort(todas.T[::-1])
+        self.ids = todas[orden]
+        self.feat = {llave: np.concatenate((valores, feat_nuevas[llave]))[orden] for llave, valores in self.feat.items()}
+        return True
+
+    def actualizar(self, grupos_input, limite=MAX_COMBINACIONES_EN_MEMORIA):
+        """
+        Lleva el espacio a grupos_input cuando solo se prendieron o apagaron grupos de las mismas materias.
+        False si no se puede (otras materias, no cabe, grupo sin máscara): hay que construirlo de nuevo.
+        """
+        firma = firma_grupos(grupos_input)
+        if len(firma) != len(self.firma):
+            return False
+        for antes, ahora in zip(self.firma, firma):
+            if not antes or not ahora or antes[0][0] != ahora[0][0]:
+                return False
+            if len(set(antes)) != len(antes) or len(set(ahora)) != len(ahora):
+                return False
+
+        quitar = []
+        actuales = []
+        inicio = 0
+        for antes, ahora in zip(self.firma, firma):
+            en_ahora = set(ahora)
+            quitar.extend(inicio + j for j, llave in enumerate(antes) if llave not in en_ahora)
+            restantes = [llave for llave in antes if llave in en_ahora]
+            # Los que siguen deben conservar su orden para poder intercalar los nuevos
+            en_restantes = set(restantes)
+            if restantes != [llave for llave in ahora if llave in en_restantes]:
+                return False
+            actuales.append(restantes)
+            inicio += len(antes)
+
+        if quitar:
+            self._quitar_grupos(quitar)
+
+        posiciones = [{llave: pos for pos, llave in enumerate(ahora)} for ahora in firma]
+        actuales_grupos = [
+            [grupos_input[k][posiciones[k][llave]] for llave in restantes]
+            for k, restantes in enumerate(actuales)
+        ]
+        for k, ahora in enumerate(firma):
+            for pos, llave in enumerate(ahora):
+                if pos < len(actuales[k]) and actuales[k][pos] == llave:
+                    continue
+                grupo = grupos_input[k][pos]
+                if grupo['gpo'] != "N/A" and grupo.get('intervalos') and grupo.get('mascara') is None:
+                    return False
+                actuales[k].insert(pos, llave)
+                actuales_grupos[k].insert(pos, grupo)
+                if not self._agregar_grupo(actuales_grupos, k, pos, limite):
+                    return False
+
+        self.firma = firma
+        self.planos = [g for grupos in grupos_input for g in grupos]
+        return True
+
+    def sincronizar_califs(self, grupos_input):
+        """Si cambió alguna calificación, vuelve a calcular las features (las combinaciones son las mismas)."""
+        self.planos = [g for grupos in grupos_input for g in grupos]
+        califs = [g['calificacion'] for g in self.planos]
+        if califs != self.califs:
+            self.califs = califs
+            self.feat = _features_por_pedazos(self.ids, construir_tabla_features(grupos_input))
+
+    def mejores(self, pesos, top_k=10, config_dias=None, w_dias=35, grupos_input=None):
+        """
+        Igual que buscar_mejores_horarios: [(score, posición, combinación)] ordenado por (-score, posición).
+        Con grupos_input las combinaciones se arman con esos dicts.
+        """
+        if not len(self.ids):
+            return []
+        scores = puntuar_features(self.feat, pesos) + penalizacion_features(self.feat, config_dias, w_dias)
+
+        if len(scores) > top_k:
+            umbral = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            candidatos = np.flatnonzero(scores >= umbral)
+        else:
+            candidatos = np.arange(len(scores))
+
+        # Mismo heap y mismo orden que allá, para que los empates se resuelvan igual
+        top_heap = []
+        for pos, sc in zip(candidatos.tolist(), scores[candidatos].tolist()):
+            if len(top_heap) < top_k:
+                heapq.heappush(top_heap, (sc, pos))
+            elif sc > top_heap[0][0]:
+                heapq.heapreplace(top_heap, (sc, pos))
+
+        planos = self.planos if grupos_input is None else [g for grupos in grupos_input for g in grupos]
+        return [
+            (sc, pos, [planos[i] for i in self.ids[pos]])
+            for sc, pos in sorted(top_heap, key=lambda x: (-x[0], x[1]))
+        ]
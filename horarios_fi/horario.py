@@ -0,0 +1,52 @@
+"""
+Intervalos de clase y su ocupación semanal como máscara de bits.
+"""
+
+
+def hora_a_minutos(hora_str):
+    try:
+        h, m = map(int, hora_str.split(':'))
+        return h * 60 + m
+    except:
+        return 0
+
+
+def extraer_intervalos(horario_str, dias_lista):
+    try:
+        inicio_str, fin_str = horario_str.split(' a ')
+        inicio_min = hora_a_minutos(inicio_str)
+        fin_min = hora_a_minutos(fin_str)
+        return [{'dia': d.strip(), 'inicio': inicio_min, 'fin': fin_min} for d in dias_lista]
+    except:
+        return []
+
+
+# Ocupación semanal empaquetada: 6 días x 48 bloques de 30 min en un solo int
+DIAS_SEMANA = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab"]
+MINUTOS_POR_BLOQUE = 30
+BLOQUES_POR_DIA = 24 * 60 // MINUTOS_POR_BLOQUE
+DIA_LLENO = (1 << BLOQUES_POR_DIA) - 1
+
+
+def construir_mascara(intervalos):
+    """
+    Bit (dia * 48 + bloque) prendido = ese bloque de 30 min está ocupado.
+    Regresa None si algún intervalo no se puede representar exacto (horas fuera de
+    :00/:30, día desconocido, duración nula o intervalos del grupo encimados);
+    en ese caso se sigue usando la comparación por intervalos.
+    """
+    mascara = 0
+    for s in intervalos:
+        if s['dia'] not in DIAS_SEMANA:
+            return None
+        if s['inicio'] % MINUTOS_POR_BLOQUE or s['fin'] % MINUTOS_POR_BLOQUE:
+            return None
+        if not 0 <= s['inicio'] < s['fin'] <= 24 * 60:
+            return None
+
+        base = DIAS_SEMANA.index(s['dia']) * BLOQUES_POR_DIA
+        bloques = ((1 << (s['fin'] // MINUTOS_POR_BLOQUE)) - (1 << (s['inicio'] // MINUTOS_POR_BLOQUE))) << base
+        if mascara & bloques:
+            return None
+        mascara |= bloques
+    return mascara
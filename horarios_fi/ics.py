@@ -0,0 +1,89 @@
+"""
+Exportación de una opción de horario a calendario (.ics): un evento semanal por clase.
+"""
+from datetime import datetime, timedelta, timezone
+
+
+def _proxima_fecha_para_dia(dia_str):
+    """
+    Regresa una fecha (datetime.date) para el próximo día de la semana indicado.
+    No importa el semestre real: solo sirve como plantilla para el calendario.
+    """
+    mapa = {"Lun": 0, "Mar": 1, "Mie": 2, "Jue": 3, "Vie": 4, "Sab": 5}
+    if dia_str not in mapa:
+        return datetime.today().date()
+
+    hoy = datetime.today().date()
+    delta = (mapa[dia_str] - hoy.weekday()) % 7
+    if delta == 0:
+        delta = 7 
+    return hoy + timedelta(days=delta)
+
+
+def generar_ics_desde_opcion(materias_combinadas, nombre_calendario="Horario FI UNAM"):
+    """
+    Convierte una combinación (lista de grupos) en texto ICS.
+    """
+    ics = []
+    ics.append("BEGIN:VCALENDAR")
+    ics.append("VERSION:2.0")
+    ics.append("PRODID:-//FI UNAM Scheduler//Streamlit//ES")
+    ics.append("CALSCALE:GREGORIAN")
+    ics.append(f"X-WR-CALNAME:{nombre_calendario}")
+    for g in materias_combinadas:
+        if g.get("gpo") == "N/A":
+            continue
+
+        materia_nombre = g.get("materia_nombre", "Materia")
+        profesor = g.get("profesor", "")
+        modalidad = g.get("modalidad", "")
+        salon = g.get("salon", "SIN")
+        horario = g.get("horario", "")
+        dias = g.get("dias", "")
+        vacantes = g.get("vacantes", "")
+
+        if salon and str(salon).strip().upper() != "SIN":
+            summary = f"{materia_nombre} | GPO {g.get('gpo','')} | {salon}"
+        else:
+            summary = f"{materia_nombre} | GPO {g.get('gpo','')}"
+
+        desc = f"Profesor: {profesor}"
+
+        if modalidad:
+            desc += f" ({modalidad})"
+
+        if salon and str(salon).strip().upper() != "SIN":
+            desc += f"\\nSalón: {salon}"
+        else:
+            desc += f"\\nSalón: SIN / En línea"
+
+        desc += f"\\nHorario: {dias} {horario}"
+        desc += f"\\nVacantes: {vacantes}"
+
+        for s in g.get("intervalos", []):
+            dia = s.get("dia")
+            fecha = _proxima_fecha_para_dia(dia)
+
+            inicio_min = s.get("inicio", 0)
+            fin_min = s.get("fin", 0)
+
+            dtstart = datetime.combine(fecha, datetime.min.time()) + timedelta(minutes=inicio_min)
+            dtend = datetime.combine(fecha, datetime.min.time()) + timedelta(minutes=fin_min)
+
+            # Formato ICS: YYYYMMDDTHHMMSS
+            dtstart_str = dtstart.strftime("%Y%m%dT%H%M%S")
+            dtend_str = dtend.strftime("%Y%m%dT%H%M%S")
+
+            uid = f"{materia_nombre}-{g.get('gpo','')}-{dia}-{dtstart_str}@fiunam"
+
+            ics.append("BEGIN:VEVENT")
+            ics.append(f"UID:{uid}")
+            ics.append(f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
+            ics.append(f"DTSTART:{dtstart_str}")
+            ics.append(f"DTEND:{dtend_str}")
+            ics.append(f"SUMMARY:{summary}")
+            ics.append(f"DESCRIPTION:{desc}")
+            ics.append("END:VEVENT")
+
+    ics.append("END:VCALENDAR")
+    return "\n".join(ics)
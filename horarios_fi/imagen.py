@@ -0,0 +1,316 @@
+"""
+Cuadrícula de un horario (30 min x día) y su imagen.
+
+construir_cuadricula arma df_text con el texto de cada celda (índice = horas, columnas = días)
+y df_color con el estilo CSS de cada celda ("background-color: #FFCDD2; color: #000000;",
+más "border: 2px solid #ff4d4d;" en los grupos sin cupo). De ahí salen:
+- cuadricula_a_svg: SVG escrito directo, y cuadricula_a_png: PNG con Pillow (misma disposición);
+- dataframe_a_png: la tabla de matplotlib de antes (matplotlib solo se importa si se usa).
+"""
+import hashlib
+import io
+import re
+import threading
+from functools import lru_cache
+from xml.sax.saxutils import escape, quoteattr
+
+from horarios_fi.horario import DIAS_SEMANA
+from horarios_fi.perezoso import ModuloPerezoso
+
+pd = ModuloPerezoso("pandas")
+
+RE_DECLARACION = re.compile(r"\s*([\w-]+)\s*:\s*([^;]*);?")
+
+ANCHO_ETIQUETA = 60
+ANCHO_COLUMNA = 190
+ALTO_RENGLON = 26
+TAMANO_LETRA = 11
+FONDO_ENCABEZADO = "#E0E0E0"
+FONDO_VACIO = "#FFFFFF"
+COLOR_LINEA = "#9E9E9E"
+COLOR_SIN_CUPO = "#FF4D4D"
+
+# Se buscan en las carpetas de fuentes del sistema; si no hay ninguna se usa la de Pillow
+FUENTES_PNG = ("DejaVuSans.ttf", "Arial.ttf")
+FUENTES_PNG_NEGRITA = ("DejaVuSans-Bold.ttf", "Arial Bold.ttf")
+
+COLORES_MATERIAS = [
+    "#FFCDD2", "#C5CAE9", "#B2DFDB", "#FFF9C4", "#E1BEE7",
+    "#FFCCBC", "#D7CCC8", "#F0F4C3", "#B3E5FC", "#DCEDC8",
+    "#F8BBD0", "#CFD8DC"
+]
+
+
+def clave_combinacion(materias, mostrar_sin_cupo):
+    """Hash de todo lo que se dibuja de una combinación; con él se cachean la cuadrícula y la imagen."""
+    partes = [mostrar_sin_cupo]
+    for g in materias:
+        partes.append((
+            g.get('materia_nombre'), g.get('gpo'), g.get('profesor'), g.get('salon'), g.get('vacantes'),
+            tuple((s['dia'], s['inicio'], s['fin']) for s in g.get('intervalos', []))
+        ))
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+
+
+def construir_cuadricula(materias, mostrar_sin_cupo):
+    """
+    (df_text, df_color) de la cuadrícula de 30 min de una combinación.
+    Cada intervalo se convierte directo a renglones (minuto // 30 relativo al primero) y se
+    llenan listas; los DataFrames se arman una sola vez al final.
+    """
+    # Detectar rango real del horario (primera clase -> última clase + 30 min)
+    inicios = []
+    fines = []
+    for m_g in materias:
+        if m_g.get("gpo") == "N/A":
+            continue
+        for s in m_g.get("intervalos", []):
+            inicios.append(s.get("inicio", 0))
+            fines.append(s.get("fin", 0))
+
+    # fallback si algo raro pasa
+    if not inicios or not fines:
+        min_minuto = 7 * 60
+        max_minuto = 22 * 60
+    else:
+        # límites razonables para que no se rompa visualmente (+ media hora extra al final)
+        min_minuto = max(min(inicios), 7 * 60)
+        max_minuto = min(max(fines) + 30, 22 * 60)
+
+    # Renglones cada 30 min solo dentro del rango
+    primer_renglon = (min_minuto // 30) * 30
+    horas_labels = [f"{t//60:02d}:{'30' if (t%60==30) else '00'}" for t in range(primer_renglon, max_minuto + 1, 30)]
+    n_renglones = len(horas_labels)
+
+    texto = [[""] * len(DIAS_SEMANA) for _ in range(n_renglones)]
+    estilos = [[""] * len(DIAS_SEMANA) for _ in range(n_renglones)]
+    materia_color_map = {}
+    for m_g in materias:
+        if m_g['gpo'] == "N/A":
+            continue
+        nombre_mat = m_g['materia_nombre']
+        if nombre_mat not in materia_color_map:
+            materia_color_map[nombre_mat] = COLORES_MATERIAS[len(materia_color_map) % len(COLORES_MATERIAS)]
+        bg_color = materia_color_map[nombre_mat]
+        if " - " in nombre_mat:
+            partes = nombre_mat.split(' - ')
+            clave_mat = partes[0]
+            nombre_limpio = partes[1]
+        else:
+            clave_mat = ""
+            nombre_limpio = nombre_mat
+        nombre_limpio = (nombre_limpio[:20] + '..') if len(nombre_limpio) > 20 else nombre_limpio
+        profesor_corto = m_g['profesor'].split('\n')[0][:18]
+        salon = m_g.get("salon", "SIN")
+        salon = salon.strip() if salon else "SIN"
+        vacs_grupo = m_g.get("vacantes", None)
+        sin_cupo = False
+        try:
+            if vacs_grupo is not None and int(vacs_grupo) <= 0:
+                sin_cupo = True
+        except:
+            sin_cupo = False
+        tag_cupo = " ⚠️SIN CUPO" if (sin_cupo and mostrar_sin_cupo) else ""
+
+        if sin_cupo:
+            estilo = f"background-color: {bg_color}; color: #000000; border: 2px solid #ff4d4d;"
+        else:
+            estilo = f"background-color: {bg_color}; color: #000000;"
+        # Texto compacto para el header del bloque
+        if salon.upper() != "SIN":
+            header_line = f"{salon} G{m_g['gpo']} ({clave_mat}){tag_cupo}"
+        else:
+            header_line = f"G{m_g['gpo']} ({clave_mat}){tag_cupo}"
+        # Header, nombre y profesor corto (1 línea), según cuántos renglones tenga el bloque
+        lineas = [header_line, nombre_limpio, f"\"{profesor_corto}\""]
+
+        for s in m_g['intervalos']:
+            if s['dia'] not in DIAS_SEMANA:
+                continue
+            # Inicio y fin se redondean hacia abajo a la media hora, como las etiquetas
+            start_idx = (s['inicio'] // 30 * 30 - primer_renglon) // 30
+            end_idx = (s['fin'] // 30 * 30 - primer_renglon) // 30
+            if not (0 <= start_idx < n_renglones and 0 <= end_idx < n_renglones):
+                continue
+            d = DIAS_SEMANA.index(s['dia'])
+            duracion_bloques = end_idx - start_idx
+            for counter, h_idx in enumerate(range(start_idx, end_idx)):
+                estilos[h_idx][d] = estilo
+                texto[h_idx][d] = lineas[counter] if counter < min(duracion_bloques, 3) else ""
+
+    df_text = pd.DataFrame(texto, index=horas_labels, columns=DIAS_SEMANA)
+    df_color = pd.DataFrame(estilos, index=horas_labels, columns=DIAS_SEMANA)
+    return df_text, df_color
+
+
+@lru_cache(maxsize=256)
+def estilo_celda(estilo):
+    """
+    (fondo, borde_rojo) de un estilo CSS de celda. fondo es None si no trae background-color.
+    Los estilos distintos son pocos (un color por materia), así que cada uno se lee una sola vez.
+    """
+    if not isinstance(estilo, str):
+        return None, False
+    propiedades = {m.group(1).lower(): m.group(2).strip() for m in RE_DECLARACION.finditer(estilo)}
+    fondo = propiedades.get("background-color") or None
+    borde_rojo = "ff4d4d" in propiedades.get("border", "").lower()
+    return fondo, borde_rojo
+
+
+def _celdas(df_text, df_color=None):
+    """
+    (ancho, alto, celdas) de la imagen. Cada celda es (x, y, ancho, alto, fondo, borde_rojo,
+    texto, negrita); primero va el renglón de días y luego cada hora con su etiqueta.
+    """
+    columnas = [str(c) for c in df_text.columns]
+    textos = df_text.values.tolist()
+    estilos = df_color.values.tolist() if df_color is not None else None
+
+    celdas = [(0, 0, ANCHO_ETIQUETA, ALTO_RENGLON, FONDO_ENCABEZADO, False, "", True)]
+    for c, nombre in enumerate(columnas):
+        x = ANCHO_ETIQUETA + c * ANCHO_COLUMNA
+        celdas.append((x, 0, ANCHO_COLUMNA, ALTO_RENGLON, FONDO_ENCABEZADO, False, nombre, True))
+
+    for r, etiqueta in enumerate(df_text.index):
+        y = (r + 1) * ALTO_RENGLON
+        celdas.append((0, y, ANCHO_ETIQUETA, ALTO_RENGLON, FONDO_ENCABEZADO, False, str(etiqueta), True))
+        for c in range(len(columnas)):
+            fondo, borde_rojo = estilo_celda(estilos[r][c]) if estilos is not None else (None, False)
+            texto = textos[r][c]
+            texto = texto if isinstance(texto, str) else ("" if texto is None else str(texto))
+            x = ANCHO_ETIQUETA + c * ANCHO_COLUMNA
+            celdas.append((x, y, ANCHO_COLUMNA, ALTO_RENGLON, fondo or FONDO_VACIO, borde_rojo, texto, False))
+
+    ancho = ANCHO_ETIQUETA + len(columnas) * ANCHO_COLUMNA
+    alto = (len(textos) + 1) * ALTO_RENGLON
+    return ancho, alto, celdas
+
+
+def cuadricula_a_svg(df_text, df_color=None):
+    """SVG (texto) de la cuadrícula. Los bordes rojos van al final para que queden encima."""
+    ancho, alto, celdas = _celdas(df_text, df_color)
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{ancho}" height="{alto}" '
+        f'viewBox="0 0 {ancho} {alto}" font-family="DejaVu Sans, Arial, sans-serif" font-size="{TAMANO_LETRA}">'
+    ]
+    rojos = []
+    for x, y, w, h, fondo, borde_rojo, texto, negrita in celdas:
+        partes.append(
+            f'<rect x="{x}" y="{y}" width="{w}" height="{h}" '
+            f'fill={quoteattr(fondo)} stroke="{COLOR_LINEA}"/>'
+        )
+        if texto:
+            peso = ' font-weight="bold"' if negrita else ""
+            partes.append(
+                f'<text x="{x + w / 2:g}" y="{y + h / 2:g}" text-anchor="middle" '
+                f'dominant-baseline="central"{peso}>{escape(texto)}</text>'
+            )
+        if borde_rojo:
+            rojos.append((x, y, w, h))
+    for x, y, w, h in rojos:
+        partes.append(
+            f'<rect x="{x + 1}" y="{y + 1}" width="{w - 2}" height="{h - 2}" '
+            f'fill="none" stroke="{COLOR_SIN_CUPO}" stroke-width="2"/>'
+        )
+    partes.append("</svg>")
+    return "\n".join(partes)
+
+
+@lru_cache(maxsize=16)
+def _fuente(tamano, negrita):
+    from PIL import ImageFont
+
+    for nombre in (FUENTES_PNG_NEGRITA if negrita else FUENTES_PNG):
+        try:
+            return ImageFont.truetype(nombre, tamano)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size=tamano)
+    except TypeError:
+        # Pillow < 10.1: solo la fuente de mapa de bits, de tamaño fijo
+        return ImageFont.load_default()
+
+
+def cuadricula_a_png(df_text, df_color=None, escala=2):
+    """
+    PNG (bytes) de la misma cuadrícula que cuadricula_a_svg, dibujado con Pillow a escala
+    veces el tamaño del SVG. Si Pillow no está instalado se propaga ImportError.
+    """
+    from PIL import Image, ImageDraw
+
+    ancho, alto, celdas = _celdas(df_text, df_color)
+    # +1: Pillow incluye la última coordenada de cada rectángulo
+    imagen = Image.new("RGB", (ancho * escala + 1, alto * escala + 1), FONDO_VACIO)
+    dibujo = ImageDraw.Draw(imagen)
+    letras = {False: _fuente(TAMANO_LETRA * escala, False), True: _fuente(TAMANO_LETRA * escala, True)}
+
+    rojos = []
+    for x, y, w, h, fondo, borde_rojo, texto, negrita in celdas:
+        caja = (x * escala, y * escala, (x + w) * escala, (y + h) * escala)
+        dibujo.rectangle(caja, fill=fondo, outline=COLOR_LINEA, width=1)
+        if texto:
+            # El selector de variante de los emojis (⚠️) sale como cuadro en las fuentes de texto
+            dibujo.text(
+                ((x + w / 2) * escala, (y + h / 2) * escala), texto.replace("\ufe0f", ""),
+                fill="#000000", font=letras[negrita], anchor="mm"
+            )
+        if borde_rojo:
+            rojos.append(caja)
+    for caja in rojos:
+        dibujo.rectangle(caja, outline=COLOR_SIN_CUPO, width=2 * escala)
+
+    buf = io.BytesIO()
+    imagen.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# pyplot no es seguro entre hilos (la app dibuja las descargas fuera del hilo del script)
+_lock_pyplot = threading.Lock()
+
+
+def dataframe_a_png(df_text, df_color=None):
+    """
+    Exporta un DataFrame a PNG. Si df_color viene, aplica background-color por celda.
+    df_color debe contener strings tipo: "background-color: #FFCDD2; color: #000000;"
+    """
+    # matplotlib tarda en importarse y pesa en memoria: solo se carga si se usa este backend
+    import matplotlib.pyplot as plt
+
+    with _lock_pyplot:
+        fig, ax = plt.subplots(figsize=(12, 18))
+        ax.axis("off")
+
+        tabla = ax.table(
+            cellText=df_text.values,
+            rowLabels=df_text.index,
+            colLabels=df_text.columns,
+            cellLoc="center",
+            loc="center"
+        )
+
+        tabla.auto_set_font_size(False)
+        tabla.set_fontsize(8)
+        tabla.scale(1, 1.4)
+
+        # Colorear celdas si viene df_color
+        if df_color is not None:
+            for r in range(df_text.shape[0]):
+                for c in range(df_text.shape[1]):
+                    bg, borde_rojo = estilo_celda(df_color.iat[r, c])
+                    if bg:
+                        try:
+                            tabla[(r+1, c)].set_facecolor(bg)  # +1 por header row
+                        except:
+                            pass
+
+                    # borde rojo si está marcado en estilo
+                    if borde_rojo:
+                        tabla[(r+1, c)].set_linewidth(2)
+
+        # Guardar a bytes
+        buf = io.BytesIO()
+        plt.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+        plt.close(fig)
+        buf.seek(0)
+        return buf.getvalue()
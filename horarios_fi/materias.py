@@ -0,0 +1,244 @@
+"""
+Materias del SSA guardadas en el proceso de la app (compartidas por todas las sesiones):
+el catálogo de nombres, los grupos de cada materia y el diff de vacantes de Refrescar Cupos.
+"""
+import copy
+import json
+import os
+import threading
+import time
+
+from horarios_fi.perezoso import ModuloPerezoso
+
+requests = ModuloPerezoso("requests")
+
+# Datos fijos del grupo (profesor, horario, salón) vs. vacantes, que cambian todo el tiempo
+TTL_MATERIA_SEGUNDOS = int(os.environ.get("HORARIOS_TTL_MATERIA", 6 * 60 * 60))
+TTL_VACANTES_SEGUNDOS = int(os.environ.get("HORARIOS_TTL_VACANTES", 60))
+
+
+class CacheMaterias:
+    """
+    Grupos ya parseados por clave. Si volver a bajar la página falla, se sirve la entrada vieja
+    mientras tenga menos de ttl_estatico segundos. Un lock por clave: solo una sesión descarga.
+    """
+
+    def __init__(self, ttl_estatico=TTL_MATERIA_SEGUNDOS, ttl_vacantes=TTL_VACANTES_SEGUNDOS, reloj=time.monotonic):
+        self.ttl_estatico = ttl_estatico
+        self.ttl_vacantes = ttl_vacantes
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._locks_clave = {}
+        self._entradas = {}
+
+    def _lock_de(self, clave):
+        with self._lock:
+            return self._locks_clave.setdefault(clave, threading.Lock())
+
+    def _vigente(self, clave, ttl_vacantes):
+        entrada = self._entradas.get(clave)
+        if entrada and self._reloj() - entrada["t_descarga"] < ttl_vacantes:
+            return entrada
+        return None
+
+    def obtener(self, clave, descargar, ttl_vacantes=None, nombre_materia=None):
+        """Copia de los grupos de la clave; descargar(clave) solo se llama si la entrada ya no sirve."""
+        ttl_vacantes = self.ttl_vacantes if ttl_vacantes is None else ttl_vacantes
+
+        entrada = self._vigente(clave, ttl_vacantes)
+        if entrada is None:
+            with self._lock_de(clave):
+                # Otra sesión pudo haberla bajado mientras esperábamos el lock
+                entrada = self._vigente(clave, ttl_vacantes)
+                if entrada is None:
+                    try:
+                        grupos = descargar(clave)
+                    except Exception:
+                        entrada = self._vigente(clave, self.ttl_estatico)
+                        if entrada is None:
+                            raise
+                    else:
+                        if grupos is None:
+                            entrada = self._vigente(clave, self.ttl_estatico)
+                            if entrada is None:
+                                return None
+                        elif not grupos:
+                            return grupos
+                        else:
+                            entrada = {"grupos": grupos, "t_descarga": self._reloj()}
+                            self._entradas[clave] = entrada
+
+        # Las sesiones modifican sus grupos; el nombre es el de quien pide (la que bajó pudo no tener catálogo)
+        grupos = copy.deepcopy(entrada["grupos"])
+        if nombre_materia is not None:
+            for g in grupos:
+                g["materia_nombre"] = nombre_materia
+        return grupos
+
+
+# --- CATÁLOGO DE MATERIAS ---
+# Pasado este tiempo se vuelve a bajar en segundo plano la próxima vez que se use
+TTL_CATALOGO_SEGUNDOS = int(os.environ.get("HORARIOS_TTL_CATALOGO", 24 * 60 * 60))
+# Si la descarga falló, cuánto esperar antes de intentar otra vez
+REINTENTO_CATALOGO_SEGUNDOS = 60
+
+
+class CatalogoMaterias:
+    """
+    Nombres de las materias ({clave: nombre}) sin bloquear el arranque: al crearse lee la copia del
+    disco (si hay ruta) y baja la nueva en un hilo. Si la descarga falla se sigue usando la del disco.
+    """
+
+    def __init__(self, descargar, ruta=None, ttl=TTL_CATALOGO_SEGUNDOS, reloj=time.monotonic):
+        self._descargar = descargar
+        self.ruta = ruta
+        self.ttl = ttl
+        self._reloj = reloj
+        self.error = None
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._t_descarga = None
+        self._t_intento = None
+        self._nombres = self._leer_disco() if ruta else {}
+        self._actualizar_en_segundo_plano()
+
+    def _leer_disco(self):
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                nombres = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(nombres, dict):
+            return {}
+        return {str(clave): str(nombre) for clave, nombre in nombres.items()}
+
+    def _guardar_disco(self, nombres):
+        try:
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(nombres, f, ensure_ascii=False)
+            os.replace(temporal, self.ruta)
+        except OSError:
+            pass
+
+    def _actualizar_en_segundo_plano(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._t_intento = self._reloj()
+            self._hilo = threading.Thread(target=self._actualizar, name="catalogo-materias", daemon=True)
+            self._hilo.start()
+
+    def _actualizar(self):
+        try:
+            nombres = self._descargar()
+        except requests.exceptions.Timeout:
+            self.error = "El servidor de la UNAM tardó demasiado en responder al cargar el catálogo."
+            return
+        except Exception as e:
+            self.error = f"No se pudo cargar el catálogo de materias: {e}"
+            return
+        if not nombres:
+            self.error = "El servidor de la UNAM no regresó el catálogo de materias."
+            return
+
+        with self._lock:
+            self._nombres = nombres
+            self._t_descarga = self._reloj()
+            self.error = None
+        if self.ruta:
+            self._guardar_disco(nombres)
+
+    def _revisar_vigencia(self):
+        ahora = self._reloj()
+        if self._t_descarga is not None:
+            vencido = ahora - self._t_descarga >= self.ttl
+        else:
+            vencido = ahora - self._t_intento >= REINTENTO_CATALOGO_SEGUNDOS
+        if vencido:
+            self._actualizar_en_segundo_plano()
+
+    def _esperar(self, segundos):
+        hilo = self._hilo
+        if hilo is not None and segundos:
+            hilo.join(segundos)
+
+    def cargando(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def nombres(self, esperar=0):
+        """Copia del catálogo. Si está vacío y se está bajando, espera hasta esperar segundos."""
+        self._revisar_vigencia()
+        if not self._nombres:
+            self._esperar(esperar)
+        return dict(self._nombres)
+
+    def nombre(self, clave, esperar=0):
+        """Nombre de la clave o None. Si no está y el catálogo se está bajando, espera hasta esperar segundos."""
+        self._revisar_vigencia()
+        nombre = self._nombres.get(clave)
+        if nombre is None and self.cargando():
+            self._esperar(esperar)
+            nombre = self._nombres.get(clave)
+        return nombre
+
+
+# --- REFRESCAR CUPOS ---
+# Refrescar Cupos promete vacantes en vivo: no sirve ni una entrada de hace segundos
+TTL_VACANTES_REFRESCO = 0
+
+
+def claves_para_refrescar(materias_db):
+    """[(índice, clave)] de las materias del SSA (no los bloqueos personales)."""
+    pendientes = []
+    for i, materia in enumerate(materias_db):
+        if materia.get("es_bloqueo", False):
+            continue
+        clave_raw = str(materia.get("materia", "")).split(" - ")[0].strip()
+        if not clave_raw.isdigit():
+            continue
+        pendientes.append((i, clave_raw))
+    return pendientes
+
+
+def aplicar_vacantes(materias_db, pendientes, descargas, desactivar_llenos=False):
+    """
+    Pasa a materias_db las vacantes recién bajadas (descargas: [(resultado, error)] en el orden de
+    pendientes) y regresa qué cambió. Con desactivar_llenos apaga los grupos que se acaban de llenar.
+    """
+    diff = {"actualizados": 0, "cambiados": [], "llenos": [], "desaparecidos": [], "errores": [], "desactivados": []}
+
+    for (i, clave_raw), (datos_nuevos_lista, error) in zip(pendientes, descargas):
+        materia = materias_db[i]
+        if error:
+            diff["errores"].append(f"{clave_raw}: {error}")
+            continue
+        if not datos_nuevos_lista:
+            diff["errores"].append(f"{clave_raw}: No encontrada")
+            continue
+
+        nuevos_por_gpo = {g_nuevo.get("gpo"): g_nuevo for g_nuevo in datos_nuevos_lista[0]["grupos"]}
+
+        for j, g_viejo in enumerate(materia["grupos"]):
+            if g_viejo.get("gpo") == "N/A":
+                continue
+
+            g_nuevo = nuevos_por_gpo.get(g_viejo.get("gpo"))
+            if g_nuevo is None:
+                diff["desaparecidos"].append((materia["materia"], g_viejo.get("gpo")))
+                continue
+
+            antes = g_viejo.get("vacantes", 0)
+            despues = g_nuevo.get("vacantes", antes)
+            g_viejo["vacantes"] = despues
+            diff["actualizados"] += 1
+
+            if despues != antes:
+                diff["cambiados"].append((materia["materia"], g_viejo.get("gpo"), antes, despues))
+                if antes > 0 and despues <= 0:
+                    diff["llenos"].append((materia["materia"], g_viejo.get("gpo")))
+                    if desactivar_llenos:
+                        g_viejo["activo"] = False
+                        diff["desactivados"].append((i, j))
+
+    return diff
@@ -0,0 +1,138 @@
+"""
+Normalización y comparación de nombres de profesores.
+
+Los nombres vienen de tres lados que no coinciden letra por letra: la página del SSA
+("M.I. JOSÉ SALINAS"), el Excel que pega el alumno ("SALINAS TELESFORO JOSE") y la API
+de IngenieriaTracker. Se comparan por tokens normalizados, aceptando iniciales ("J.")
+y abreviaturas comunes ("MA.", "FCO.").
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+PREFIJOS_TITULO = (
+    "M. EN I.", "M EN I.", "M.I.", "MI.", "M I.",
+    "DR.", "DRA.", "MTRO.", "MTRA.", "LIC.", "ING.", "ISC.",
+    "M.C.", "M C.", "M.A.", "M A.", "PROF.", "ARQ."
+)
+
+RE_ESPACIOS = re.compile(r"\s+")
+
+# Abreviaturas de nombres de pila que se ven en las listas de la facultad
+ABREVIATURAS = {
+    "MA": "MARIA",
+    "FCO": "FRANCISCO",
+    "GPE": "GUADALUPE",
+    "FDO": "FERNANDO",
+    "FEDCO": "FEDERICO",
+    "ALEJ": "ALEJANDRO",
+}
+
+
+@lru_cache(maxsize=8192)
+def limpiar_nombre_profesor(nombre):
+    if not nombre:
+        return ""
+    n = nombre.replace("(PRESENCIAL)", "").replace("\n", " ").strip()
+    n = RE_ESPACIOS.sub(" ", n)
+    upper_n = n.upper()
+    for p in PREFIJOS_TITULO:
+        if upper_n.startswith(p):
+            n = n[len(p):].strip()
+            break
+    n = n.replace(".", " ")
+    n = unicodedata.normalize("NFD", n)
+    n = "".join(ch for ch in n if unicodedata.category(ch) != "Mn")
+    n = RE_ESPACIOS.sub(" ", n).strip()
+    return n
+
+
+@lru_cache(maxsize=8192)
+def tokens_nombre(nombre):
+    """Tokens en mayúsculas del nombre limpio, con las abreviaturas conocidas ya expandidas."""
+    tokens = []
+    for token in limpiar_nombre_profesor(nombre).upper().split(" "):
+        if token:
+            tokens.append(ABREVIATURAS.get(token, token))
+    return tuple(tokens)
+
+
+def puntaje_coincidencia(tokens_a, tokens_b):
+    """
+    None si los nombres no pueden ser la misma persona. Si pueden, (completos, iniciales, -sobrantes):
+    todos los tokens del nombre más corto deben aparecer en el otro (en cualquier orden), ya sea
+    completos o como inicial ("J" con "JOSE"), y al menos uno completo. Más alto = mejor.
+    """
+    corto, largo = sorted((tokens_a, tokens_b), key=len)
+    if not corto:
+        return None
+
+    restantes = list(largo)
+    pendientes = []
+    completos = 0
+    for token in corto:
+        if len(token) > 1 and token in restantes:
+            restantes.remove(token)
+            completos += 1
+        else:
+            pendientes.append(token)
+    if completos == 0:
+        return None
+
+    iniciales = 0
+    for token in pendientes:
+        # Primero contra iniciales del otro lado, para no gastar un token completo
+        pos = next((k for k, r in enumerate(restantes) if len(r) == 1 and r == token[0]), None)
+        if pos is None and len(token) == 1:
+            pos = next((k for k, r in enumerate(restantes) if r[0] == token), None)
+        if pos is None:
+            return None
+        restantes.pop(pos)
+        iniciales += 1
+
+    return (completos, iniciales, -len(restantes))
+
+
+class IndiceNombres:
+    """
+    Índice invertido token -> posiciones de una lista de nombres.
+    buscar(nombre) solo compara contra los nombres que comparten algún token completo,
+    así que buscar muchos nombres cuesta casi lo mismo que recorrerlos una vez.
+    """
+
+    def __init__(self, nombres):
+        self.nombres = list(nombres)
+        self._tokens = [tokens_nombre(n) for n in self.nombres]
+        self._exactos = {}
+        self._indice = defaultdict(list)
+        for pos, tokens in enumerate(self._tokens):
+            self._exactos.setdefault(tokens, pos)
+            for token in set(tokens):
+                if len(token) > 1:
+                    self._indice[token].append(pos)
+
+    def buscar(self, nombre):
+        """Posición del nombre que mejor coincide (el primero en caso de empate), o None."""
+        tokens = tokens_nombre(nombre)
+        if not tokens:
+            return None
+        if tokens in self._exactos:
+            return self._exactos[tokens]
+
+        candidatos = set()
+        for token in tokens:
+            candidatos.update(self._indice.get(token, ()))
+
+        mejor = None
+        mejor_puntaje = None
+        for pos in sorted(candidatos):
+            puntaje = puntaje_coincidencia(tokens, self._tokens[pos])
+            if puntaje is not None and (mejor_puntaje is None or puntaje > mejor_puntaje):
+                mejor, mejor_puntaje = pos, puntaje
+        return mejor
+
+
+def mejor_coincidencia(nombre, candidatos):
+    """Posición en candidatos del nombre que mejor coincide con nombre, o None."""
+    return IndiceNombres(candidatos).buscar(nombre)
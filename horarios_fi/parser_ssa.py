@@ -0,0 +1,204 @@
+"""
+Extracción de las filas de las tablas de una página de asignatura del SSA.
+
+filas_tablas(html) regresa, por cada <tr> de cada <table>, la lista de textos de sus <td>,
+igual que hacía la app con BeautifulSoup:
+
+    [[c.get_text(strip=True) for c in fila.find_all('td')]
+     for tabla in soup.find_all('table') for fila in tabla.find_all('tr')]
+
+El camino rápido es un html.parser.HTMLParser que va armando las filas mientras lee
+(sin construir el árbol). Si la página trae algo que BeautifulSoup interpretaría distinto
+(tablas anidadas, celdas sin cerrar, entidades mal formadas...), se usa BeautifulSoup.
+"""
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Referencias de carácter: html.unescape y BeautifulSoup solo coinciden en las bien formadas
+RE_REFERENCIA = re.compile(r"&(?:#([0-9]+);|#[xX]([0-9A-Fa-f]+);|([A-Za-z][A-Za-z0-9]*;))?")
+
+# Dentro de estas etiquetas BeautifulSoup guarda el texto con otro tipo y get_text() lo ignora
+ETIQUETAS_TEXTO_ESPECIAL = frozenset(("script", "style", "template", "rt", "rp"))
+
+# Etiquetas vacías de HTML: nunca quedan abiertas
+ETIQUETAS_VACIAS = frozenset((
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image",
+    "img", "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source",
+    "spacer", "track", "wbr",
+))
+
+
+class EstructuraIrregular(Exception):
+    """La página no es una tabla simple; el resultado podría no coincidir con BeautifulSoup."""
+
+
+class ParserFilasSSA(HTMLParser):
+    """
+    Junta las celdas <td> de las filas <tr> que están dentro de un <table>.
+    Sigue las mismas reglas que BeautifulSoup con html.parser:
+      - una etiqueta de cierre cierra todo lo abierto hasta la última etiqueta con ese nombre
+        (y se ignora si no hay ninguna abierta);
+      - las etiquetas vacías (<br>) no quedan abiertas y su cierre explícito se ignora;
+      - cada trozo de texto (entre dos etiquetas o comentarios) se recorta por separado
+        y los trozos de una celda se pegan sin separador.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.filas = []
+        self._abiertas = []
+        self._vacias_sin_cierre = []
+        self._en_tabla = False
+        self._fila = None
+        self._celda = None
+        self._trozo = []
+
+    def _cerrar_trozo(self):
+        if self._trozo:
+            texto = "".join(self._trozo).strip()
+            self._trozo = []
+            if texto and self._celda is not None:
+                self._celda.append(texto)
+
+    def _cerrar_celda(self):
+        if self._celda is not None:
+            self._fila.append("".join(self._celda))
+            self._celda = None
+
+    def _cerrar_fila(self):
+        self._cerrar_celda()
+        if self._fila is not None:
+            self.filas.append(self._fila)
+            self._fila = None
+
+    def _cerrar(self, tag):
+        if not self._en_tabla:
+            return
+        if tag == "td":
+            self._cerrar_celda()
+        elif tag == "tr":
+            self._cerrar_fila()
+        elif tag == "table":
+            self._cerrar_fila()
+            self._en_tabla = False
+
+    def handle_starttag(self, tag, attrs):
+        self._abrir(tag)
+        if tag in ETIQUETAS_VACIAS:
+            # Un </br> posterior no cierra nada ni corta el texto
+            self._vacias_sin_cierre.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._abrir(tag)
+        self._cerrar_hasta(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._vacias_sin_cierre:
+            self._vacias_sin_cierre.remove(tag)
+            return
+        self._cerrar_hasta(tag)
+
+    def _abrir(self, tag):
+        self._cerrar_trozo()
+        if tag in ETIQUETAS_VACIAS:
+            return
+        self._abiertas.append(tag)
+        if tag == "table":
+            if self._en_tabla:
+                raise EstructuraIrregular("tabla anidada")
+            self._en_tabla = True
+        elif not self._en_tabla:
+            return
+        elif tag == "tr":
+            if self._fila is not None:
+                raise EstructuraIrregular("fila dentro de otra fila")
+            self._fila = []
+        elif tag == "td":
+            if self._fila is None or self._celda is not None:
+                raise EstructuraIrregular("celda fuera de fila o dentro de otra celda")
+            self._celda = []
+        elif tag in ETIQUETAS_TEXTO_ESPECIAL and self._celda is not None:
+            raise EstructuraIrregular(f"<{tag}> dentro de una celda")
+
+    def _cerrar_hasta(self, tag):
+        self._cerrar_trozo()
+        if tag not in self._abiertas:
+            return
+        while True:
+            cerrada = self._abiertas.pop()
+            self._cerrar(cerrada)
+            if cerrada == tag:
+                break
+
+    def handle_data(self, data):
+        if self._celda is not None:
+            self._trozo.append(data)
+
+    def handle_comment(self, data):
+        self._cerrar_trozo()
+
+    def handle_decl(self, decl):
+        self._cerrar_trozo()
+
+    def handle_pi(self, data):
+        self._cerrar_trozo()
+
+    def unknown_decl(self, data):
+        raise EstructuraIrregular("declaración desconocida")
+
+    def close(self):
+        super().close()
+        self._cerrar_trozo()
+        while self._abiertas:
+            self._cerrar(self._abiertas.pop())
+
+
+def _referencias_seguras(html):
+    """True si todas las "&" son entidades conocidas o caracteres imprimibles fuera de 128-159."""
+    for m in RE_REFERENCIA.finditer(html):
+        decimal, hexadecimal, nombre = m.groups()
+        if nombre is not None:
+            if nombre not in html5:
+                return False
+        elif decimal is not None or hexadecimal is not None:
+            codigo = int(decimal) if decimal is not None else int(hexadecimal, 16)
+            if not (32 <= codigo < 128 or 160 <= codigo < 0xD800 or 0xE000 <= codigo < 0xFFFE):
+                return False
+        else:
+            return False
+    return True
+
+
+def filas_tablas_rapido(html):
+    """Filas con el parser en streaming, o None si la página necesita a BeautifulSoup."""
+    if "&" in html and not _referencias_seguras(html):
+        return None
+    parser = ParserFilasSSA()
+    try:
+        parser.feed(html)
+        parser.close()
+    except EstructuraIrregular:
+        return None
+    return parser.filas
+
+
+def filas_tablas_bs4(html):
+    # BeautifulSoup solo se carga si alguna página lo necesita (o si se pide el backend "bs4")
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    return [
+        [c.get_text(strip=True) for c in fila.find_all('td')]
+        for tabla in soup.find_all('table')
+        for fila in tabla.find_all('tr')
+    ]
+
+
+def filas_tablas(html, backend="rapido"):
+    """backend: "rapido" (HTMLParser, con BeautifulSoup de respaldo) o "bs4"."""
+    if backend != "bs4":
+        filas = filas_tablas_rapido(html)
+        if filas is not None:
+            return filas
+    return filas_tablas_bs4(html)
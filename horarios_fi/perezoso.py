@@ -0,0 +1,43 @@
+"""
+Importación diferida de módulos pesados.
+
+    pd = ModuloPerezoso("pandas")
+
+no importa nada todavía: pandas se carga la primera vez que se pide un atributo
+(pd.DataFrame). Así la app dibuja el título sin pagar pandas, numpy ni requests,
+que solo hacen falta al generar horarios o al bajar materias.
+"""
+import importlib
+import threading
+
+
+class ModuloPerezoso:
+    """
+    Representante de un módulo que se importa en el primer acceso a un atributo.
+    Se puede usar desde varios hilos; cada atributo leído se guarda en el representante,
+    así que los accesos siguientes cuestan lo mismo que en el módulo real.
+    """
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    self._modulo = importlib.import_module(self._nombre)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        # Solo llega aquí lo que no está en el representante (todo menos _nombre, _modulo, _lock)
+        if atributo.startswith("__") and atributo.endswith("__"):
+            raise AttributeError(atributo)
+        valor = getattr(self._cargar(), atributo)
+        setattr(self, atributo, valor)
+        return valor
+
+    def __repr__(self):
+        estado = "cargado" if self._modulo is not None else "sin cargar"
+        return f"<módulo perezoso {self._nombre!r} ({estado})>"
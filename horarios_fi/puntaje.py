@@ -0,0 +1,484 @@
+"""
+Validez y score de una combinación de grupos (una materia -> un grupo).
+
+- hay_traslape / es_horario_valido / precalcular_conflictos: traslapes entre grupos.
+- calcular_score y calcular_penalizacion_por_dia: el score de una combinación suelta.
+- construir_tabla_features / features_lote / puntuar_lote / penalizacion_lote: el mismo score
+  calculado con numpy para lotes de combinaciones.
+"""
+from horarios_fi.horario import BLOQUES_POR_DIA, DIA_LLENO, DIAS_SEMANA, MINUTOS_POR_BLOQUE
+from horarios_fi.perezoso import ModuloPerezoso
+
+# numpy se carga con el primer lote que se puntúa, no al importar la app
+np = ModuloPerezoso("numpy")
+
+
+def conteos_por_dia(g):
+    """
+    Lo que aporta un grupo a calcular_penalizacion_por_dia, por día:
+    (bloques de 30 min, suma de minutos de inicio, número de inicios).
+    """
+    bloques = [0] * len(DIAS_SEMANA)
+    suma_inicios = [0] * len(DIAS_SEMANA)
+    n_inicios = [0] * len(DIAS_SEMANA)
+
+    if g.get("gpo") == "N/A" or not g.get("intervalos"):
+        return bloques, suma_inicios, n_inicios
+
+    # Con máscara, los bloques de cada día son un popcount
+    mascara = g.get("mascara")
+    if mascara is not None:
+        for d in range(len(DIAS_SEMANA)):
+            bloques[d] = ((mascara >> (d * BLOQUES_POR_DIA)) & DIA_LLENO).bit_count()
+        for s in g["intervalos"]:
+            d = DIAS_SEMANA.index(s["dia"])
+            suma_inicios[d] += int(s["inicio"])
+            n_inicios[d] += 1
+        return bloques, suma_inicios, n_inicios
+
+    for s in g["intervalos"]:
+        dia = s.get("dia")
+        if dia not in DIAS_SEMANA:
+            continue
+        d = DIAS_SEMANA.index(dia)
+
+        inicio = int(s.get("inicio", 0))
+        fin = int(s.get("fin", 0))
+
+        duracion = max(0, fin - inicio)
+        # bloques de 30 min
+        bloques_s = int(duracion // 30)
+        bloques[d] += bloques_s
+
+        # guardamos el inicio para evaluar temprano/tarde
+        if bloques_s > 0:
+            suma_inicios[d] += inicio
+            n_inicios[d] += 1
+
+    return bloques, suma_inicios, n_inicios
+
+
+def calcular_penalizacion_por_dia(opcion, config_dias, w_dias=35):
+    """
+    Penaliza/bonifica una opción de horario según configuración avanzada por día.
+    Retorna un número (negativo = peor, positivo = mejor).
+    """
+    if not config_dias or w_dias <= 0:
+        return 0.0
+
+    # Contar bloques de 30 min por día y, para ver si fue temprano/tarde, los minutos de inicio
+    bloques_por_dia = [0] * len(DIAS_SEMANA)
+    suma_inicios = [0] * len(DIAS_SEMANA)
+    n_inicios = [0] * len(DIAS_SEMANA)
+
+    for m_g in opcion.get("materias", []):
+        bloques_g, suma_g, n_g = conteos_por_dia(m_g)
+        for d in range(len(DIAS_SEMANA)):
+            bloques_por_dia[d] += bloques_g[d]
+            suma_inicios[d] += suma_g[d]
+            n_inicios[d] += n_g[d]
+
+    return penalizacion_desde_conteos(bloques_por_dia, suma_inicios, n_inicios, config_dias, w_dias)
+
+
+def penalizacion_desde_conteos(bloques_por_dia, suma_inicios, n_inicios, config_dias, w_dias=35):
+    """calcular_penalizacion_por_dia a partir de los conteos por día ya sumados."""
+    if not config_dias or w_dias <= 0:
+        return 0.0
+
+    score = 0.0
+
+    for d, dia in enumerate(DIAS_SEMANA):
+        usados = bloques_por_dia[d]
+        cfg = config_dias.get(dia, {})
+        evitar = cfg.get("evitar", False)
+        max_bloques = int(cfg.get("max_bloques", 20))
+        modo = cfg.get("modo", "Normal")
+        pref = cfg.get("preferencia", "Mixto")
+
+        # 1) Evitar día: penalización fuerte si hay cualquier clase
+        if evitar and usados > 0:
+            score -= 3.0 * usados  # castigo fuerte por cada bloque
+            continue
+
+        # 2) Max bloques deseados: penaliza exceso
+        if usados > max_bloques:
+            score -= 0.6 * (usados - max_bloques)
+
+        # 3) Modo prioridad: premia tener carga en ese día (si no lo evitaste)
+        if modo == "Prioridad":
+            score += 0.15 * usados
+
+        # 4) Preferencia temprano/tarde (usando hora promedio)
+        if pref in ["Temprano", "Tarde"] and n_inicios[d]:
+            prom_inicio = suma_inicios[d] / n_inicios[d]
+
+            # temprano = antes de 12:00 (720 min)
+            if pref == "Temprano":
+                if prom_inicio <= 720:
+                    score += 1.0
+                else:
+                    score -= 1.0
+
+            # tarde = después de 12:00
+            if pref == "Tarde":
+                if prom_inicio >= 720:
+                    score += 1.0
+                else:
+                    score -= 1.0
+
+        # Libre: intenta que esté vacío
+        if pref == "Libre" and usados > 0:
+            score -= 1.2 * usados
+
+    # Escalado por peso global
+    score = score * (w_dias / 35.0)
+    return score
+
+
+def cota_penalizacion_por_dia(bloques_min, bloques_max, config_dias, w_dias=35):
+    """
+    Cota superior de calcular_penalizacion_por_dia cuando los bloques de cada día
+    pueden terminar en cualquier valor entre bloques_min[d] y bloques_max[d].
+    """
+    if not config_dias or w_dias <= 0:
+        return 0.0
+
+    score = 0.0
+    for d, dia in enumerate(DIAS_SEMANA):
+        cfg = config_dias.get(dia, {})
+        evitar = cfg.get("evitar", False)
+        max_bloques = int(cfg.get("max_bloques", 20))
+        modo = cfg.get("modo", "Normal")
+        pref = cfg.get("preferencia", "Mixto")
+        lo, hi = bloques_min[d], bloques_max[d]
+
+        if evitar:
+            score += 0.0 if lo == 0 else -3.0 * lo
+            continue
+
+        # Sin "evitar" el score del día es cóncavo en los bloques: el máximo está en un extremo o en max_bloques
+        mejor = None
+        for usados in (lo, hi, min(max(max_bloques, lo), hi)):
+            valor = -0.6 * max(0, usados - max_bloques)
+            if modo == "Prioridad":
+                valor += 0.15 * usados
+            if pref == "Libre":
+                valor -= 1.2 * usados
+            mejor = valor if mejor is None else max(mejor, valor)
+        score += mejor
+
+        if pref in ["Temprano", "Tarde"]:
+            score += 1.0
+
+    return score * (w_dias / 35.0)
+
+
+# --- LÓGICA DE VALIDACIÓN Y SCORE ---
+def hay_traslape(g1, g2):
+    m1, m2 = g1.get('mascara'), g2.get('mascara')
+    if m1 is not None and m2 is not None:
+        return m1 & m2 != 0
+
+    for s1 in g1['intervalos']:
+        for s2 in g2['intervalos']:
+            if s1['dia'] == s2['dia']:
+                if s1['inicio'] < s2['fin'] and s1['fin'] > s2['inicio']:
+                    return True
+    return False
+
+
+def es_horario_valido(combinacion):
+    for i in range(len(combinacion)):
+        for j in range(i + 1, len(combinacion)):
+            if hay_traslape(combinacion[i], combinacion[j]):
+                return False
+    return True
+
+
+def grupo_no_inscribir(nombre_materia):
+    """
+    Opción "N/A" de una materia opcional: no tiene horario, no choca con nada y no cuenta
+    para el promedio ni para la carga. Va al final de los grupos de la materia para que,
+    con el mismo score, gane inscribirla.
+    """
+    return {
+        "gpo": "N/A",
+        "profesor": "",
+        "profesor_raw": "",
+        "modalidad": None,
+        "salon": "SIN",
+        "horario": "",
+        "dias": "",
+        "intervalos": [],
+        "mascara": 0,
+        "calificacion": 0,
+        "materia_nombre": nombre_materia,
+        "vacantes": 0,
+        "activo": True,
+    }
+
+
+# --- MATRIZ DE CONFLICTOS ENTRE GRUPOS ---
+def precalcular_conflictos(grupos_input):
+    """
+    Se corre una vez por generación. Da un id entero a cada grupo activo (en el orden
+    de grupos_input) y guarda por grupo un bitset (int) con los ids de los grupos de
+    otras materias con los que se traslapa: bit i prendido = choca con el grupo i.
+    Retorna (ids por materia, lista de bitsets indexada por id).
+    """
+    ids = []
+    n_grupos = 0
+    for grupos in grupos_input:
+        ids.append(list(range(n_grupos, n_grupos + len(grupos))))
+        n_grupos += len(grupos)
+
+    conflictos = [0] * n_grupos
+    for a in range(len(grupos_input)):
+        for b in range(a + 1, len(grupos_input)):
+            for id_a, g_a in zip(ids[a], grupos_input[a]):
+                for id_b, g_b in zip(ids[b], grupos_input[b]):
+                    if hay_traslape(g_a, g_b):
+                        conflictos[id_a] |= 1 << id_b
+                        conflictos[id_b] |= 1 << id_a
+
+    return ids, conflictos
+
+
+def es_combinacion_valida(ids_combinacion, conflictos):
+    """Igual que es_horario_valido, pero con ids de precalcular_conflictos (sirve para parciales)."""
+    bloqueados = 0
+    for i in ids_combinacion:
+        if bloqueados >> i & 1:
+            return False
+        bloqueados |= conflictos[i]
+    return True
+
+
+def calcular_score(combinacion, pesos):
+    grupos_reales = [g for g in combinacion if g['gpo'] != "N/A"]
+    if not grupos_reales: return -1000
+
+    score = 0
+
+    # Con las máscaras, huecos y extremos salen de la ocupación combinada (si no hay traslapes)
+    mascaras = [g.get('mascara') for g in grupos_reales]
+    ocupacion = None
+    if None not in mascaras:
+        ocupacion = 0
+        for mk in mascaras:
+            ocupacion |= mk
+        if ocupacion.bit_count() != sum(mk.bit_count() for mk in mascaras):
+            ocupacion = None
+
+    if ocupacion is not None:
+        huecos = 0
+        primer_inicio = None
+        ultima_salida = None
+        for d in range(len(DIAS_SEMANA)):
+            bloques_dia = (ocupacion >> (d * BLOQUES_POR_DIA)) & DIA_LLENO
+            if not bloques_dia:
+                continue
+            primero = (bloques_dia & -bloques_dia).bit_length() - 1
+            ultimo = bloques_dia.bit_length()
+            huecos += ((ultimo - primero - bloques_dia.bit_count()) * MINUTOS_POR_BLOQUE) / 60
+            inicio_dia = primero * MINUTOS_POR_BLOQUE
+            fin_dia = ultimo * MINUTOS_POR_BLOQUE
+            primer_inicio = inicio_dia if primer_inicio is None else min(primer_inicio, inicio_dia)
+            ultima_salida = fin_dia if ultima_salida is None else max(ultima_salida, fin_dia)
+    else:
+        huecos = 0
+        for dia in ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab"]:
+            clases = sorted([s for g in grupos_reales for s in g['intervalos'] if s['dia'] == dia], key=lambda x: x['inicio'])
+            for i in range(len(clases)-1):
+                huecos += (clases[i+1]['inicio'] - clases[i]['fin']) / 60
+
+        start_times = [s['inicio'] for g in grupos_reales for s in g['intervalos']]
+        end_times = [s['fin'] for g in grupos_reales for s in g['intervalos']]
+        primer_inicio = min(start_times) if start_times else None
+        ultima_salida = max(end_times) if end_times else None
+
+    score -= huecos * pesos['huecos']
+
+    promedio_p = sum(g['calificacion'] for g in grupos_reales) / len(grupos_reales)
+    score += promedio_p * pesos['profes']
+
+    if primer_inicio is not None and ultima_salida is not None:
+        if pesos['tipo_turno'] == "Mañana (Temprano)":
+            score += ((1440 - ultima_salida) / 60) * pesos['peso_turno']
+        elif pesos['tipo_turno'] == "Tarde / Noche":
+            score += (primer_inicio / 60) * pesos['peso_turno']
+        else:
+            pass
+
+    score += len(grupos_reales) * pesos['carga']
+
+    return score
+
+
+# --- SCORE VECTORIZADO POR LOTES ---
+# Centinelas para días sin clase en las tablas por grupo
+SIN_INICIO = 10 ** 6
+SIN_FIN = -1
+
+
+def construir_tabla_features(grupos_input):
+    """
+    Tablas por grupo (por id de precalcular_conflictos) para puntuar lotes con NumPy.
+    "exacta": todos los grupos tienen máscara, así que puntuar_lote da lo mismo que calcular_score.
+    """
+    planos = [g for grupos in grupos_input for g in grupos]
+    n_dias = len(DIAS_SEMANA)
+
+    calif = np.zeros(len(planos), dtype=np.float64)
+    real = np.zeros(len(planos), dtype=bool)
+    inicio = np.full((len(planos), n_dias), SIN_INICIO, dtype=np.int64)
+    fin = np.full((len(planos), n_dias), SIN_FIN, dtype=np.int64)
+    dur = np.zeros((len(planos), n_dias), dtype=np.int64)
+    bloques = np.zeros((len(planos), n_dias), dtype=np.int64)
+    suma_inicios = np.zeros((len(planos), n_dias), dtype=np.int64)
+    n_inicios = np.zeros((len(planos), n_dias), dtype=np.int64)
+    exacta = True
+
+    for i, g in enumerate(planos):
+        bloques[i], suma_inicios[i], n_inicios[i] = conteos_por_dia(g)
+        if g['gpo'] == "N/A":
+            continue
+        real[i] = True
+        calif[i] = g['calificacion']
+        if g.get('intervalos') and g.get('mascara') is None:
+            exacta = False
+        for s in g.get('intervalos', []):
+            if s['dia'] not in DIAS_SEMANA:
+                continue
+            d = DIAS_SEMANA.index(s['dia'])
+            inicio[i, d] = min(inicio[i, d], s['inicio'])
+            fin[i, d] = max(fin[i, d], s['fin'])
+            dur[i, d] += s['fin'] - s['inicio']
+
+    return {
+        "calif": calif, "real": real, "inicio": inicio, "fin": fin, "dur": dur,
+        "bloques": bloques, "suma_inicios": suma_inicios, "n_inicios": n_inicios,
+        "exacta": exacta,
+    }
+
+
+def features_lote(ids_lote, tabla, por_dia=True):
+    """Lo que necesita el score de cada fila (combinación de ids) de un lote, ya reducido."""
+    ids_lote = np.asarray(ids_lote, dtype=np.int64)
+    n_filas, n_materias = ids_lote.shape if ids_lote.ndim == 2 else (len(ids_lote), 0)
+
+    # Columna por columna (materia por materia), sin armar arreglos filas x materias x días.
+    # Mínimos, máximos y sumas de enteros no dependen del orden; la suma de calificaciones
+    # va en el mismo orden que sum() sobre los grupos reales
+    inicio_dia = np.full((n_filas, len(DIAS_SEMANA)), SIN_INICIO, dtype=np.int64)
+    fin_dia = np.full((n_filas, len(DIAS_SEMANA)), SIN_FIN, dtype=np.int64)
+    dur_dia = np.zeros((n_filas, len(DIAS_SEMANA)), dtype=np.int64)
+    suma_calif = np.zeros(n_filas, dtype=np.float64)
+    n_reales = np.zeros(n_filas, dtype=np.int64)
+    if por_dia:
+        bloques = np.zeros((n_filas, len(DIAS_SEMANA)), dtype=np.int64)
+        suma_inicios = np.zeros((n_filas, len(DIAS_SEMANA)), dtype=np.int64)
+        n_inicios = np.zeros((n_filas, len(DIAS_SEMANA)), dtype=np.int64)
+
+    for c in range(n_materias):
+        col = ids_lote[:, c]
+        real = tabla["real"][col]
+        np.minimum(inicio_dia, tabla["inicio"][col], out=inicio_dia)
+        np.maximum(fin_dia, tabla["fin"][col], out=fin_dia)
+        dur_dia += tabla["dur"][col]
+        suma_calif = suma_calif + np.where(real, tabla["calif"][col], 0.0)
+        n_reales += real
+        if por_dia:
+            bloques += tabla["bloques"][col]
+            suma_inicios += tabla["suma_inicios"][col]
+            n_inicios += tabla["n_inicios"][col]
+
+    # Sin traslapes, los huecos de un día son (última salida - primer inicio - minutos de clase)
+    con_clase = fin_dia != SIN_FIN
+    huecos = np.where(con_clase, fin_dia - inicio_dia - dur_dia, 0).sum(axis=1) / 60
+
+    # Tipos chicos para guardar muchas combinaciones; los valores no cambian
+    feat = {
+        "huecos": huecos,
+        "suma_calif": suma_calif,
+        "n_reales": n_reales.astype(np.int16),
+        "hay_clases": con_clase.any(axis=1),
+        "primer_inicio": inicio_dia.min(axis=1).astype(np.int32),
+        "ultima_salida": fin_dia.max(axis=1).astype(np.int32),
+    }
+    if por_dia:
+        feat["bloques"] = bloques.astype(np.int16)
+        feat["suma_inicios"] = suma_inicios.astype(np.int32)
+        feat["n_inicios"] = n_inicios.astype(np.int16)
+    return feat
+
+
+def puntuar_features(feat, pesos):
+    """Score de calcular_score a partir de features_lote; mismo orden de operaciones, mismo redondeo."""
+    n_reales = feat["n_reales"]
+
+    score = 0.0 - feat["huecos"] * pesos['huecos']
+
+    promedio_p = feat["suma_calif"] / np.maximum(n_reales, 1)
+    score = score + promedio_p * pesos['profes']
+
+    hay_clases = feat["hay_clases"]
+    if pesos['tipo_turno'] == "Mañana (Temprano)":
+        score = np.where(hay_clases, score + ((1440 - feat["ultima_salida"]) / 60) * pesos['peso_turno'], score)
+    elif pesos['tipo_turno'] == "Tarde / Noche":
+        score = np.where(hay_clases, score + (feat["primer_inicio"] / 60) * pesos['peso_turno'], score)
+
+    score = score + n_reales * pesos['carga']
+
+    return np.where(n_reales > 0, score, -1000.0)
+
+
+def penalizacion_features(feat, config_dias, w_dias=35):
+    """calcular_penalizacion_por_dia a partir de los conteos por día de features_lote."""
+    bloques = feat["bloques"]
+    suma_inicios = feat["suma_inicios"]
+    n_inicios = feat["n_inicios"]
+    score = np.zeros(len(bloques), dtype=np.float64)
+    if not config_dias or w_dias <= 0:
+        return score
+
+    for d, dia in enumerate(DIAS_SEMANA):
+        usados = bloques[:, d].astype(np.int64)
+        cfg = config_dias.get(dia, {})
+        evitar = cfg.get("evitar", False)
+        max_bloques = int(cfg.get("max_bloques", 20))
+        modo = cfg.get("modo", "Normal")
+        pref = cfg.get("preferencia", "Mixto")
+
+        nuevo = np.where(usados > max_bloques, score - 0.6 * (usados - max_bloques), score)
+        if modo == "Prioridad":
+            nuevo = nuevo + 0.15 * usados
+        if pref in ["Temprano", "Tarde"]:
+            prom_inicio = suma_inicios[:, d] / np.maximum(n_inicios[:, d], 1)
+            a_tiempo = prom_inicio <= 720 if pref == "Temprano" else prom_inicio >= 720
+            nuevo = np.where(n_inicios[:, d] > 0, np.where(a_tiempo, nuevo + 1.0, nuevo - 1.0), nuevo)
+        if pref == "Libre":
+            nuevo = np.where(usados > 0, nuevo - 1.2 * usados, nuevo)
+
+        score = np.where(usados > 0, score - 3.0 * usados, nuevo) if evitar else nuevo
+
+    return score * (w_dias / 35.0)
+
+
+def puntuar_lote(ids_lote, tabla, pesos):
+    """calcular_score de cada fila de ids_lote (sin traslapes); igual bit a bit si tabla["exacta"]."""
+    return puntuar_features(features_lote(ids_lote, tabla, por_dia=False), pesos)
+
+
+def penalizacion_lote(ids_lote, tabla, config_dias, w_dias=35):
+    """calcular_penalizacion_por_dia para un lote completo; mismo orden de operaciones, mismo resultado."""
+    if not config_dias or w_dias <= 0:
+        return np.zeros(len(ids_lote), dtype=np.float64)
+    ids_lote = np.asarray(ids_lote, dtype=np.int64)
+    feat = {
+        "bloques": tabla["bloques"][ids_lote].sum(axis=1),
+        "suma_inicios": tabla["suma_inicios"][ids_lote].sum(axis=1),
+        "n_inicios": tabla["n_inicios"][ids_lote].sum(axis=1),
+    }
+    return penalizacion_features(feat, config_dias, w_dias)
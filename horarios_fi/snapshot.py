@@ -0,0 +1,161 @@
+"""
+Snapshot local de toda la programación del semestre (pensado para el día de inscripciones).
+
+    python -m horarios_fi.snapshot horarios.sqlite --hilos 8
+
+baja el catálogo y la página de cada clave (a lo más --hilos descargas a la vez) y guarda
+los grupos ya parseados en un solo archivo SQLite (un renglón comprimido por clave).
+La app lo usa si HORARIOS_SNAPSHOT apunta al archivo: profesores, horarios y salones salen
+de aquí y solo las vacantes se piden en vivo (al agregar una materia y al refrescar cupos).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+from horarios_fi.cliente_http import ClienteHTTP
+from horarios_fi.ssa import descargar_catalogo, descargar_grupos
+
+# Se sube si cambia la forma de los grupos guardados; la app ignora snapshots de otro formato
+FORMATO_SNAPSHOT = 1
+
+ESQUEMA = """
+CREATE TABLE meta (llave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+CREATE TABLE catalogo (clave TEXT PRIMARY KEY, nombre TEXT NOT NULL);
+CREATE TABLE materias (clave TEXT PRIMARY KEY, grupos BLOB NOT NULL);
+"""
+
+
+def _comprimir(grupos):
+    return zlib.compress(json.dumps(grupos, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _descomprimir(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def crear_snapshot(ruta, cliente=None, hilos=8, backend="rapido", claves=None, progreso=None):
+    """
+    Baja todas las claves del catálogo (o solo claves) y escribe el snapshot en ruta.
+    El archivo se arma aparte y se reemplaza al final, así que una app que lo esté leyendo
+    nunca ve uno a medias. progreso(terminadas, total, clave) se llama al terminar cada clave.
+    Regresa {"materias": guardadas, "sin_pagina": [claves], "errores": {clave: mensaje}}.
+    """
+    cliente = cliente or ClienteHTTP(conexiones=hilos)
+
+    catalogo = descargar_catalogo(cliente)
+    if catalogo is None:
+        raise RuntimeError("No se pudo bajar el catálogo de materias")
+    if claves is None:
+        claves = sorted(catalogo, key=int)
+    else:
+        claves = [str(int(clave)) for clave in claves]
+
+    def bajar(clave):
+        nombre_materia = f"{clave} - {catalogo.get(clave, 'MATERIA DESCONOCIDA')}"
+        return descargar_grupos(cliente, clave, nombre_materia, backend=backend)
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    resumen = {"materias": 0, "sin_pagina": [], "errores": {}}
+    con = sqlite3.connect(temporal)
+    try:
+        con.executescript(ESQUEMA)
+        con.executemany("INSERT INTO catalogo VALUES (?, ?)", sorted(catalogo.items()))
+
+        with ThreadPoolExecutor(max_workers=max(1, hilos)) as ejecutor:
+            futuros = {ejecutor.submit(bajar, clave): clave for clave in claves}
+            for terminadas, futuro in enumerate(as_completed(futuros), start=1):
+                clave = futuros[futuro]
+                try:
+                    grupos = futuro.result()
+                except Exception as e:
+                    resumen["errores"][clave] = str(e)
+                else:
+                    if grupos is None:
+                        resumen["sin_pagina"].append(clave)
+                    else:
+                        con.execute("INSERT INTO materias VALUES (?, ?)", (clave, _comprimir(grupos)))
+                        resumen["materias"] += 1
+                if progreso is not None:
+                    progreso(terminadas, len(claves), clave)
+
+        con.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("formato", str(FORMATO_SNAPSHOT)),
+            ("creado", datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            ("materias", str(resumen["materias"])),
+        ])
+        con.commit()
+    finally:
+        con.close()
+
+    os.replace(temporal, ruta)
+    return resumen
+
+
+class Snapshot:
+    """
+    Lectura de un snapshot (solo lectura, se comparte entre hilos).
+    grupos(clave) regresa una lista nueva en cada llamada, o None si la clave no está.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        uri = Path(ruta).resolve().as_uri() + "?mode=ro"
+        self._con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        meta = dict(self._con.execute("SELECT llave, valor FROM meta"))
+        if meta.get("formato") != str(FORMATO_SNAPSHOT):
+            self._con.close()
+            raise ValueError(f"Formato de snapshot no soportado: {meta.get('formato')}")
+        self.creado = meta.get("creado")
+
+    def catalogo(self):
+        with self._lock:
+            return dict(self._con.execute("SELECT clave, nombre FROM catalogo"))
+
+    def grupos(self, clave):
+        with self._lock:
+            fila = self._con.execute("SELECT grupos FROM materias WHERE clave = ?", (str(clave),)).fetchone()
+        if fila is None:
+            return None
+        return _descomprimir(fila[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baja toda la programación del SSA a un snapshot local.")
+    parser.add_argument("ruta", help="archivo SQLite de salida")
+    parser.add_argument("--hilos", type=int, default=8, help="descargas simultáneas (default 8)")
+    parser.add_argument("--claves", help="solo estas claves, separadas por comas")
+    parser.add_argument("--parser", default="rapido", choices=["rapido", "bs4"], help="parser de las páginas")
+    args = parser.parse_args(argv)
+
+    claves = None
+    if args.claves:
+        claves = [c.strip() for c in args.claves.split(",") if c.strip()]
+
+    def progreso(terminadas, total, clave):
+        if terminadas % 50 == 0 or terminadas == total:
+            print(f"{terminadas}/{total}", file=sys.stderr)
+
+    resumen = crear_snapshot(args.ruta, hilos=args.hilos, backend=args.parser, claves=claves, progreso=progreso)
+
+    print(f"Materias guardadas: {resumen['materias']}")
+    if resumen["sin_pagina"]:
+        print(f"Sin página ({len(resumen['sin_pagina'])}): {', '.join(sorted(resumen['sin_pagina'], key=int))}")
+    for clave, error in sorted(resumen["errores"].items()):
+        print(f"Error en {clave}: {error}", file=sys.stderr)
+    return 1 if resumen["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
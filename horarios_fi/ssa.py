@@ -0,0 +1,100 @@
+"""
+Descarga y lectura de la programación de horarios publicada por el SSA de la facultad:
+el catálogo (listaAsignatura.js) y la página de grupos de cada asignatura.
+"""
+import re
+
+from horarios_fi.horario import construir_mascara, extraer_intervalos
+from horarios_fi.parser_ssa import filas_tablas
+
+URL_BASE_SSA = "https://www.ssa.ingenieria.unam.mx/cj/tmp/programacion_horarios"
+
+RE_ASIGNATURA = re.compile(r"asignatura\['(\d+)'\]\s*=\s*'([^']+)';")
+RE_MODALIDAD = re.compile(r"\(([^)]+)\)")
+RE_PARENTESIS = re.compile(r"\([^)]*\)")
+RE_TITULO_PROFESOR = re.compile(
+    r"^(ING\.|DR\.|DRA\.|M\.I\.|M\. EN I\.|MC\.|MTRO\.|MTRA\.|LIC\.|ARQ\.)\s+",
+    flags=re.IGNORECASE
+)
+
+
+def catalogo_desde_js(texto):
+    """{clave: nombre} a partir del contenido de listaAsignatura.js."""
+    return {clave: nombre for clave, nombre in RE_ASIGNATURA.findall(texto)}
+
+
+def grupos_desde_html(html, nombre_materia, backend="rapido"):
+    """Lista de grupos (dicts) de la página de una asignatura."""
+    grupos = []
+
+    for datos in filas_tablas(html, backend=backend):
+        if len(datos) < 7: continue
+        if datos[0] == "Clave": continue
+
+        gpo = datos[1]
+        # --- PROFESOR Y MODALIDAD---
+        profesor_raw = datos[2].replace("\n", " ").strip()
+
+        modalidad = None
+        match_modalidad = RE_MODALIDAD.search(profesor_raw)
+        if match_modalidad:
+            modalidad = match_modalidad.group(1).strip().upper()
+        profesor_limpio = RE_PARENTESIS.sub("", profesor_raw).strip()
+        profesor_limpio = RE_TITULO_PROFESOR.sub("", profesor_limpio).strip()
+
+        profesor = profesor_limpio
+
+        horario = datos[4]
+        dias_str = datos[5]
+
+        salon = datos[6] if len(datos) >= 8 else "SIN"
+        salon = salon.strip() if salon else "SIN"
+
+        try:
+            vacantes = int(datos[-1])
+        except:
+            vacantes = 0
+
+
+        intervalos = extraer_intervalos(horario, dias_str.split(','))
+
+        grupos.append({
+            "gpo": gpo,
+            "profesor": profesor,
+            "profesor_raw": profesor_raw,
+            "modalidad": modalidad,
+            "salon": salon,
+            "horario": horario,
+            "dias": dias_str,
+            "intervalos": intervalos,
+            "mascara": construir_mascara(intervalos),
+            "calificacion": 10,
+            "materia_nombre": nombre_materia,
+            "vacantes": vacantes,
+            "activo": vacantes > 0,
+            "api_consultado": False,
+            "sugerencia_api": None,
+            "api_num_resenas": None,
+            "api_nombre_match": None
+        })
+
+    return grupos
+
+
+def descargar_catalogo(cliente, timeout=5):
+    """Catálogo {clave: nombre}, o None si el servidor no respondió 200. Los errores de red se propagan."""
+    response = cliente.get(f"{URL_BASE_SSA}/listaAsignatura.js", timeout=timeout)
+    if response.status_code != 200:
+        return None
+    return catalogo_desde_js(response.text)
+
+
+def descargar_grupos(cliente, clave_int, nombre_materia, backend="rapido", timeout=5):
+    """
+    Baja y parsea la página de la asignatura. Regresa la lista de grupos,
+    None si el servidor no respondió 200. Los errores de red se propagan.
+    """
+    response = cliente.get(f"{URL_BASE_SSA}/{clave_int}.html", timeout=timeout)
+    if response.status_code != 200:
+        return None
+    return grupos_desde_html(response.text, nombre_materia, backend=backend)
@@ -0,0 +1,126 @@
+"""
+Cuánto tarda en importarse la app (o un módulo), medido con python -X importtime.
+
+    python -m horarios_fi.tiempo_importacion                 # los imports de scheduler.py
+    python -m horarios_fi.tiempo_importacion pandas numpy    # módulos sueltos
+    python -m horarios_fi.tiempo_importacion --max-ms 600    # sale con 1 si se pasa
+
+Cada medición corre en un proceso nuevo (sin nada cargado, como un worker recién levantado)
+y se reporta la mediana de --repeticiones corridas, los módulos más lentos y cuáles de los
+módulos pesados (MODULOS_PESADOS) quedaron cargados. Para la app solo se ejecutan los
+import de nivel superior de scheduler.py: es lo que se paga antes de dibujar el título.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RUTA_APP = Path(__file__).resolve().parent.parent / "scheduler.py"
+
+# Los que no deberían cargarse al arrancar (ver horarios_fi.perezoso)
+MODULOS_PESADOS = ("pandas", "numpy", "requests", "bs4", "matplotlib", "PIL")
+
+MARCA_MODULOS = "__modulos_cargados__"
+
+
+def codigo_imports_app(ruta=RUTA_APP):
+    """Los import / from ... import de nivel superior de scheduler.py, como un solo programa."""
+    arbol = ast.parse(Path(ruta).read_text(encoding="utf-8"))
+    imports = [nodo for nodo in arbol.body if isinstance(nodo, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(nodo) for nodo in imports)
+
+
+def _leer_importtime(stderr):
+    """[(acumulado_us, profundidad, modulo)] de la salida de -X importtime."""
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "[us]" in linea:
+            continue
+        partes = linea[len("import time:"):].split("|")
+        if len(partes) != 3:
+            continue
+        try:
+            acumulado = int(partes[1])
+        except ValueError:
+            continue
+        modulo = partes[2]
+        profundidad = (len(modulo) - len(modulo.lstrip(" ")) - 1) // 2
+        filas.append((acumulado, profundidad, modulo.strip()))
+    return filas
+
+
+def medir(codigo, cwd=None):
+    """
+    Una corrida en un proceso nuevo. Regresa (total_ms, [(ms, modulo)] de nivel superior,
+    [módulos pesados cargados]).
+    """
+    programa = (
+        f"{codigo}\n"
+        "import sys as _sys\n"
+        f"print({MARCA_MODULOS!r}, __import__('json').dumps("
+        f"[m for m in {MODULOS_PESADOS!r} if m in _sys.modules]))\n"
+    )
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", programa],
+        capture_output=True, text=True, cwd=cwd, env=entorno
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "falló el import")
+
+    cargados = []
+    for linea in proceso.stdout.splitlines():
+        if linea.startswith(MARCA_MODULOS):
+            cargados = json.loads(linea[len(MARCA_MODULOS):])
+
+    filas = _leer_importtime(proceso.stderr)
+    nivel_superior = [(acumulado / 1000, modulo) for acumulado, profundidad, modulo in filas if profundidad == 0]
+    total = sum(ms for ms, _ in nivel_superior)
+    return total, nivel_superior, cargados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app con python -X importtime.")
+    parser.add_argument("modulos", nargs="*", help="módulos a medir (default: los imports de scheduler.py)")
+    parser.add_argument("--repeticiones", type=int, default=5, help="corridas; se reporta la mediana (default 5)")
+    parser.add_argument("--top", type=int, default=10, help="cuántos módulos lentos mostrar (default 10)")
+    parser.add_argument("--max-ms", type=float, help="sale con 1 si la mediana pasa de este tiempo")
+    args = parser.parse_args(argv)
+
+    if args.modulos:
+        nombre = ", ".join(args.modulos)
+        codigo = "\n".join(f"import {m}" for m in args.modulos)
+    else:
+        nombre = RUTA_APP.name
+        codigo = codigo_imports_app()
+
+    totales = []
+    por_modulo = {}
+    cargados = []
+    for _ in range(max(1, args.repeticiones)):
+        total, nivel_superior, cargados = medir(codigo, cwd=RUTA_APP.parent)
+        totales.append(total)
+        for ms, modulo in nivel_superior:
+            por_modulo.setdefault(modulo, []).append(ms)
+
+    mediana = statistics.median(totales)
+    print(f"Importaciones de {nombre}: {mediana:.1f} ms (mediana de {len(totales)}; "
+          f"mín {min(totales):.1f}, máx {max(totales):.1f})")
+    print(f"Módulos pesados cargados: {', '.join(cargados) if cargados else 'ninguno'}")
+    print("Más lentos (acumulado, mediana):")
+    lentos = sorted(((statistics.median(v), m) for m, v in por_modulo.items()), reverse=True)
+    for ms, modulo in lentos[:args.top]:
+        print(f"  {ms:8.1f} ms  {modulo}")
+
+    if args.max_ms is not None and mediana > args.max_ms:
+        print(f"Se pasó del límite de {args.max_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
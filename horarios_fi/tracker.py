@@ -0,0 +1,88 @@
+"""
+Caché de las consultas a IngenieriaTracker, compartido por todas las sesiones de la app
+(y, si se quiere, guardado en disco).
+"""
+import json
+import os
+import threading
+import time
+
+# Cuánto duran las calificaciones de IngenieriaTracker (y los "No encontrado") en el caché del proceso
+TTL_PROFESOR_SEGUNDOS = int(os.environ.get("HORARIOS_TTL_PROFESOR", 7 * 24 * 60 * 60))
+TTL_PROFESOR_NO_ENCONTRADO_SEGUNDOS = int(os.environ.get("HORARIOS_TTL_PROFESOR_NO_ENCONTRADO", 24 * 60 * 60))
+
+
+class CacheProfesores:
+    """
+    Resultados por nombre limpio. Los "No encontrado" duran ttl_no_encontrado (caché negativo).
+    Con ruta se leen de un JSON al crearse y se escriben con guardar(). Un lock por nombre.
+    """
+
+    def __init__(self, ttl=TTL_PROFESOR_SEGUNDOS, ttl_no_encontrado=TTL_PROFESOR_NO_ENCONTRADO_SEGUNDOS, ruta=None,
+                 reloj=time.time):
+        self.ttl = ttl
+        self.ttl_no_encontrado = ttl_no_encontrado
+        self.ruta = ruta
+        # De reloj de pared (time.time): las entradas guardadas en disco sobreviven reinicios
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._locks_nombre = {}
+        self._entradas = {}
+        self._pendientes_de_guardar = False
+        if ruta:
+            self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                entradas = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(entradas, dict):
+            self._entradas = {
+                nombre: entrada for nombre, entrada in entradas.items()
+                if isinstance(entrada, dict) and "resultado" in entrada and "t_consulta" in entrada
+            }
+
+    def guardar(self):
+        """Escribe las entradas al archivo (si hay ruta y algo nuevo). Reemplazo atómico para no dejarlo a medias."""
+        if not self.ruta:
+            return
+        with self._lock:
+            if not self._pendientes_de_guardar:
+                return
+            entradas = dict(self._entradas)
+            self._pendientes_de_guardar = False
+        try:
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(entradas, f, ensure_ascii=False)
+            os.replace(temporal, self.ruta)
+        except OSError:
+            pass
+
+    def _lock_de(self, nombre):
+        with self._lock:
+            return self._locks_nombre.setdefault(nombre, threading.Lock())
+
+    def _vigente(self, nombre):
+        entrada = self._entradas.get(nombre)
+        if entrada is None:
+            return None
+        ttl = self.ttl if entrada["resultado"].get("promedio") is not None else self.ttl_no_encontrado
+        if self._reloj() - entrada["t_consulta"] < ttl:
+            return entrada
+        return None
+
+    def obtener(self, nombre_limpio, consultar):
+        """Resultado del profesor; consultar(nombre_limpio) solo se llama si no hay entrada vigente."""
+        entrada = self._vigente(nombre_limpio)
+        if entrada is None:
+            with self._lock_de(nombre_limpio):
+                entrada = self._vigente(nombre_limpio)
+                if entrada is None:
+                    entrada = {"resultado": consultar(nombre_limpio), "t_consulta": self._reloj()}
+                    with self._lock:
+                        self._entradas[nombre_limpio] = entrada
+                        self._pendientes_de_guardar = True
+        return dict(entrada["resultado"])
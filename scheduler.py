@@ -1,16 +1,36 @@
 import streamlit as st
-import pandas as pd
 import re
-import itertools
-import requests
-from bs4 import BeautifulSoup
 import gc
-import heapq
-from datetime import datetime, timedelta, timezone
-import io
-import matplotlib.pyplot as plt
+import os
+import functools
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import urllib.parse
-import unicodedata
+
+from horarios_fi.busqueda import (
+    LIMITE_BUSQUEDA_SEGUNDOS, MIN_COMBINACIONES_HEURISTICA, MIN_COMBINACIONES_PARALELO, iterar_mejores_horarios
+)
+from horarios_fi.cliente_http import ClienteHTTP
+from horarios_fi.espacio import EspacioCombinaciones, firma_grupos
+from horarios_fi.horario import construir_mascara, extraer_intervalos
+from horarios_fi.ics import generar_ics_desde_opcion
+from horarios_fi.imagen import (
+    clave_combinacion, construir_cuadricula, cuadricula_a_png, cuadricula_a_svg, dataframe_a_png
+)
+from horarios_fi.materias import (
+    TTL_VACANTES_REFRESCO, CacheMaterias, CatalogoMaterias, aplicar_vacantes, claves_para_refrescar
+)
+from horarios_fi.nombres import IndiceNombres, limpiar_nombre_profesor, mejor_coincidencia
+from horarios_fi.perezoso import ModuloPerezoso
+from horarios_fi.puntaje import grupo_no_inscribir
+from horarios_fi.snapshot import Snapshot
+from horarios_fi.ssa import descargar_catalogo, descargar_grupos
+from horarios_fi.tracker import CacheProfesores
+
+# Se cargan hasta que se usan (al dibujar resultados o bajar materias), no antes del título.
+# numpy, matplotlib y BeautifulSoup se cargan dentro de horarios_fi cuando hacen falta.
+pd = ModuloPerezoso("pandas")
+requests = ModuloPerezoso("requests")
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(page_title="Generador de Horarios", layout="wide")
@@ -21,44 +41,32 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# --- FUNCIONES AUXILIARES---
-def hora_a_minutos(hora_str):
-    try:
-        h, m = map(int, hora_str.split(':'))
-        return h * 60 + m
-    except:
-        return 0
-
-def extraer_intervalos(horario_str, dias_lista):
+# --- CLIENTE HTTP COMPARTIDO ---
+# Descargas simultáneas máximas al servidor de la facultad (por acción de un usuario)
+MAX_DESCARGAS_SIMULTANEAS = 4
+
+@st.cache_resource
+def cliente_http():
+    """Un solo cliente (pool de conexiones, reintentos, GET condicional) para todo el proceso."""
+    return ClienteHTTP(conexiones=MAX_DESCARGAS_SIMULTANEAS * 4)
+
+# --- SNAPSHOT LOCAL DEL SEMESTRE (OPCIONAL) ---
+# Archivo generado con: python -m horarios_fi.snapshot horarios.sqlite
+RUTA_SNAPSHOT = os.environ.get("HORARIOS_SNAPSHOT") or None
+# Al agregar una materia del snapshot, cuánto se esperan sus vacantes en vivo antes de quedarse con las de la copia
+TIMEOUT_VACANTES_SNAPSHOT = 2
+
+@st.cache_resource
+def snapshot_materias():
+    """El snapshot de HORARIOS_SNAPSHOT si existe y es válido; si no, None (todo se baja del SSA)."""
+    if not RUTA_SNAPSHOT or not os.path.exists(RUTA_SNAPSHOT):
+        return None
     try:
-        inicio_str, fin_str = horario_str.split(' a ')
-        inicio_min = hora_a_minutos(inicio_str)
-        fin_min = hora_a_minutos(fin_str)
-        return [{'dia': d.strip(), 'inicio': inicio_min, 'fin': fin_min} for d in dias_lista]
-    except:
-        return []
-
-def limpiar_nombre_profesor(nombre):
-    if not nombre:
-        return ""
-    n = nombre.replace("(PRESENCIAL)", "").replace("\n", " ").strip()
-    n = re.sub(r"\s+", " ", n)
-    prefijos = [
-        "M. EN I.", "M EN I.", "M.I.", "MI.", "M I.",
-        "DR.", "DRA.", "MTRO.", "MTRA.", "LIC.", "ING.", "ISC.",
-        "M.C.", "M C.", "M.A.", "M A.", "PROF.", "ARQ."
-    ]
-    upper_n = n.upper()
-    for p in prefijos:
-        if upper_n.startswith(p):
-            n = n[len(p):].strip()
-            break
-    n = n.replace(".", " ")
-    n = unicodedata.normalize("NFD", n)
-    n = "".join(ch for ch in n if unicodedata.category(ch) != "Mn")
-    n = re.sub(r"\s+", " ", n).strip()
-    return n
+        return Snapshot(RUTA_SNAPSHOT)
+    except Exception:
+        return None
 
+# --- FUNCIONES AUXILIARES---
 def link_profesor_ingenieriatracker(nombre_profesor):
     """
     Genera el link directo al perfil del profesor en IngenieriaTracker.
@@ -75,61 +83,142 @@ def link_profesor_ingenieriatracker(nombre_profesor):
 
     return f"https://www.ingenieriatracker.com/#/profesores/{slug}"
 
-def consultar_ingenieria_tracker(nombre_profesor):
+SIN_RESULTADO_TRACKER = {"promedio": None, "num_resenas": None, "nombre_api": None}
+
+# Archivo JSON opcional para que el caché sobreviva reinicios del servidor
+RUTA_CACHE_PROFESORES = os.environ.get("HORARIOS_CACHE_PROFESORES") or None
+
+def _consultar_tracker_api(nombre_limpio, cliente):
     """
-    Retorna dict con:
-      - promedio (float) o None
-      - num_resenas (int) o None
-      - nombre_api (str) o None
+    Una consulta a la API de IngenieriaTracker (sin Streamlit, se puede correr en hilos).
+    Regresa {"promedio", "num_resenas", "nombre_api"}; si el profesor no existe, con todo en None.
+    Los errores de red o del servidor se dejan pasar para que no se guarden como "No encontrado".
     """
-    nombre_limpio = limpiar_nombre_profesor(nombre_profesor)
-    if not nombre_limpio:
-        return {"promedio": None, "num_resenas": None, "nombre_api": None}
-
     nombre_url = urllib.parse.quote(nombre_limpio)
     url = f"https://api.ingenieriatracker.com/searchProfesor?name={nombre_url}"
 
-    try:
-        response = requests.get(url, timeout=3)
-        if response.status_code == 200:
-            datos = response.json()
-            if datos and len(datos) > 0:
-                primero = datos[0]
-                return {
-                    "promedio": primero.get("promedio", None),
-                    "num_resenas": primero.get("num_resenas", None),
-                    "nombre_api": primero.get("nombre", None),
-                }
-        return {"promedio": None, "num_resenas": None, "nombre_api": None}
-    except:
-        return {"promedio": None, "num_resenas": None, "nombre_api": None}
+    response = cliente.get(url, timeout=3)
+    if response.status_code == 404:
+        return dict(SIN_RESULTADO_TRACKER)
+    if response.status_code != 200:
+        raise requests.exceptions.HTTPError(f"IngenieriaTracker respondió {response.status_code}")
+
+    datos = response.json()
+    if datos and len(datos) > 0:
+        # La API regresa varios parecidos; se prefiere el que de verdad coincide (iniciales, abreviaturas)
+        pos = mejor_coincidencia(nombre_limpio, [d.get("nombre") or "" for d in datos])
+        primero = datos[pos if pos is not None else 0]
+        return {
+            "promedio": primero.get("promedio", None),
+            "num_resenas": primero.get("num_resenas", None),
+            "nombre_api": primero.get("nombre", None),
+        }
+    return dict(SIN_RESULTADO_TRACKER)
 
-def refrescar_vacantes():
-    n_actualizados = 0
-    with st.spinner("Actualizando cupos en tiempo real..."):
-        for materia in st.session_state.materias_db:
-            if materia.get("es_bloqueo", False):
+@st.cache_resource
+def cache_profesores():
+    return CacheProfesores(ruta=RUTA_CACHE_PROFESORES)
+
+def consultar_varios_profesores(nombres_profesor):
+    """
+    Busca varios profesores en IngenieriaTracker en una sola acción: quita repetidos
+    (por nombre limpio) y consulta los que no estén en caché a la vez.
+    Regresa {nombre_limpio: resultado}; si una consulta falla, ese profesor queda sin resultado
+    (y no se guarda en caché, para reintentarlo la próxima vez).
+    """
+    nombres = []
+    for nombre in nombres_profesor:
+        nombre_limpio = limpiar_nombre_profesor(nombre)
+        if nombre_limpio and nombre_limpio not in nombres:
+            nombres.append(nombre_limpio)
+    if not nombres:
+        return {}
+
+    cliente = cliente_http()
+    cache = cache_profesores()
+
+    def consultar(nombre_limpio):
+        try:
+            return cache.obtener(nombre_limpio, lambda nombre: _consultar_tracker_api(nombre, cliente))
+        except Exception:
+            return dict(SIN_RESULTADO_TRACKER)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_DESCARGAS_SIMULTANEAS, len(nombres))) as ejecutor:
+        resultados = dict(zip(nombres, ejecutor.map(consultar, nombres)))
+
+    cache.guardar()
+    return resultados
+
+def aplicar_sugerencias_profesores(indices_materias):
+    """
+    Consulta (en un solo lote) los profesores de las materias indicadas y guarda en cada grupo
+    su sugerencia de calificación. Regresa (grupos encontrados, grupos no encontrados).
+    """
+    grupos_a_consultar = []
+    for i in indices_materias:
+        for g in st.session_state.materias_db[i]['grupos']:
+            if g.get("gpo") == "N/A":
                 continue
-            clave_raw = str(materia.get("materia", "")).split(" - ")[0].strip()
-            if not clave_raw.isdigit():
+            if g.get("profesor") == "Tú":
                 continue
+            grupos_a_consultar.append(g)
 
-            datos_nuevos_lista = obtener_datos_unam(clave_raw, materia.get("obligatoria", False))
+    with st.spinner("Consultando promedios de profesores..."):
+        resultados = consultar_varios_profesores([g.get("profesor", "") for g in grupos_a_consultar])
 
-            if datos_nuevos_lista:
-                datos_nuevos = datos_nuevos_lista[0]
+    encontrados = 0
+    no_encontrados = 0
+    for g in grupos_a_consultar:
+        resultado = resultados.get(limpiar_nombre_profesor(g.get("profesor", "")), SIN_RESULTADO_TRACKER)
+        g['api_consultado'] = True
 
-                for g_viejo in materia["grupos"]:
-                    if g_viejo.get("gpo") == "N/A":
-                        continue
+        promedio = resultado.get("promedio", None)
 
-                    for g_nuevo in datos_nuevos["grupos"]:
-                        if g_nuevo.get("gpo") == g_viejo.get("gpo"):
-                            g_viejo["vacantes"] = g_nuevo.get("vacantes", g_viejo.get("vacantes", 0))
-                            n_actualizados += 1
-                            break
+        if promedio is not None:
+            g['sugerencia_api'] = promedio
+            g['api_num_resenas'] = resultado.get("num_resenas", None)
+            g['api_nombre_match'] = resultado.get("nombre_api", None)
+            encontrados += 1
+        else:
+            g['sugerencia_api'] = None
+            g['api_num_resenas'] = None
+            g['api_nombre_match'] = None
+            no_encontrados += 1
+
+    return encontrados, no_encontrados
 
-    st.success(f"Se actualizaron {n_actualizados} grupos.")
+def refrescar_vacantes(desactivar_llenos=False):
+    """
+    Actualiza las vacantes de todas las materias en vivo y regresa el diff de aplicar_vacantes.
+    Se debe llamar antes de dibujar los toggles de los grupos (cambia sus keys tgl_i_j).
+    """
+    pendientes = claves_para_refrescar(st.session_state.materias_db)
+    with st.spinner("Actualizando cupos en tiempo real..."):
+        descargas = obtener_varias_materias(
+            [clave for _, clave in pendientes], False, ttl_vacantes=TTL_VACANTES_REFRESCO, usar_snapshot=False
+        )
+
+    diff = aplicar_vacantes(st.session_state.materias_db, pendientes, descargas, desactivar_llenos)
+    for i, j in diff["desactivados"]:
+        st.session_state[f"tgl_{i}_{j}"] = False
+
+    # Para marcar en la lista solo los grupos que cambiaron
+    st.session_state.ultimo_refresco = {
+        (mat, gpo): (antes, despues) for mat, gpo, antes, despues in diff["cambiados"]
+    }
+
+    st.success(f"Se actualizaron {diff['actualizados']} grupos.")
+    if diff["cambiados"] or diff["desaparecidos"]:
+        with st.expander(f"Cambios en cupos ({len(diff['cambiados'])} grupos)", expanded=False):
+            for mat, gpo, antes, despues in diff["cambiados"]:
+                lleno_txt = " (se llenó)" if (mat, gpo) in diff["llenos"] else ""
+                st.write(f"- {mat} · Gpo {gpo}: {antes} → {despues}{lleno_txt}")
+            for mat, gpo in diff["desaparecidos"]:
+                st.write(f"- {mat} · Gpo {gpo}: ya no aparece en la página")
+    if diff["errores"]:
+        st.warning("No se pudieron refrescar: " + ", ".join(diff["errores"]))
+
+    return diff
 
 def cargar_grupos_actuales(texto_grupos, es_obligatorio=True):
     """
@@ -213,401 +302,245 @@ def cargar_grupos_actuales(texto_grupos, es_obligatorio=True):
         st.warning(" Algunos datos no se pudieron aplicar:")
         for e in errores:
             st.write(f"- {e}")
-def calcular_penalizacion_por_dia(opcion, config_dias, w_dias=35):
-    """
-    Penaliza/bonifica una opción de horario según configuración avanzada por día.
-    Retorna un número (negativo = peor, positivo = mejor).
-    """
-    if not config_dias or w_dias <= 0:
-        return 0.0
-
-    # Contar bloques de 30 min por día
-    bloques_por_dia = {"Lun": 0, "Mar": 0, "Mie": 0, "Jue": 0, "Vie": 0, "Sab": 0}
-
-    # También sacamos hora promedio por día para ver si fue temprano/tarde
-    # guardamos minutos de inicio por bloque
-    inicios_por_dia = {d: [] for d in bloques_por_dia.keys()}
-
-    for m_g in opcion.get("materias", []):
-        if m_g.get("gpo") == "N/A":
-            continue
-        if not m_g.get("intervalos"):
-            continue
-
-        for s in m_g["intervalos"]:
-            dia = s.get("dia")
-            if dia not in bloques_por_dia:
-                continue
-
-            inicio = int(s.get("inicio", 0))
-            fin = int(s.get("fin", 0))
-
-            duracion = max(0, fin - inicio)
-            # bloques de 30 min
-            bloques = int(duracion // 30)
-            bloques_por_dia[dia] += bloques
-
-            # guardamos el inicio para evaluar temprano/tarde
-            if bloques > 0:
-                inicios_por_dia[dia].append(inicio)
-
-    score = 0.0
-
-    for dia, usados in bloques_por_dia.items():
-        cfg = config_dias.get(dia, {})
-        evitar = cfg.get("evitar", False)
-        max_bloques = int(cfg.get("max_bloques", 20))
-        modo = cfg.get("modo", "Normal")
-        pref = cfg.get("preferencia", "Mixto")
-
-        # 1) Evitar día: penalización fuerte si hay cualquier clase
-        if evitar and usados > 0:
-            score -= 3.0 * usados  # castigo fuerte por cada bloque
-            continue
-
-        # 2) Max bloques deseados: penaliza exceso
-        if usados > max_bloques:
-            score -= 0.6 * (usados - max_bloques)
-
-        # 3) Modo prioridad: premia tener carga en ese día (si no lo evitaste)
-        if modo == "Prioridad":
-            score += 0.15 * usados
-
-        # 4) Preferencia temprano/tarde (usando hora promedio)
-        if pref in ["Temprano", "Tarde"] and inicios_por_dia[dia]:
-            prom_inicio = sum(inicios_por_dia[dia]) / len(inicios_por_dia[dia])
-
-            # temprano = antes de 12:00 (720 min)
-            if pref == "Temprano":
-                if prom_inicio <= 720:
-                    score += 1.0
-                else:
-                    score -= 1.0
-
-            # tarde = después de 12:00
-            if pref == "Tarde":
-                if prom_inicio >= 720:
-                    score += 1.0
-                else:
-                    score -= 1.0
-
-        # Libre: intenta que esté vacío
-        if pref == "Libre" and usados > 0:
-            score -= 1.2 * usados
-
-    # Escalado por peso global
-    score = score * (w_dias / 35.0)
-    return score
-
-
 # --- CARGA DE CATÁLOGO DE MATERIAS ---
-@st.cache_data
-def cargar_nombres_materias():
-    url = "https://www.ssa.ingenieria.unam.mx/cj/tmp/programacion_horarios/listaAsignatura.js"
-    try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            patron = r"asignatura\['(\d+)'\]\s*=\s*'([^']+)';"
-            coincidencias = re.findall(patron, response.text)
-
-            diccionario_nombres = {clave: nombre for clave, nombre in coincidencias}
-            return diccionario_nombres
-        else:
-            return {}
-    except requests.exceptions.Timeout:
-        st.error("El servidor de la UNAM tardó demasiado en responder al cargar el catálogo.")
-        return {}
-    except Exception as e:
-        st.error(f"No se pudo cargar el catálogo de materias: {e}")
-        return {}
-
-CATALOGO_MATERIAS = cargar_nombres_materias()
+# Última copia buena del catálogo: se usa mientras baja el nuevo o si el SSA no responde
+RUTA_CATALOGO = os.environ.get("HORARIOS_CATALOGO") or os.path.join(tempfile.gettempdir(), "horarios_fi_catalogo.json")
+# Cuánto puede esperar una búsqueda a que termine de bajar el catálogo (antes era el timeout de la descarga)
+ESPERA_CATALOGO_SEGUNDOS = 5
+
+@st.cache_resource
+def catalogo_materias():
+    snapshot = snapshot_materias()
+    if snapshot is not None:
+        return CatalogoMaterias(snapshot.catalogo)
+    cliente = cliente_http()
+    return CatalogoMaterias(lambda: descargar_catalogo(cliente), ruta=RUTA_CATALOGO)
 
 # --- LÓGICA DEL PARSER ---
-def obtener_datos_unam(clave_materia, es_obligatoria):
+# Parser de las páginas del SSA: "rapido" (HTMLParser en streaming) o "bs4" (BeautifulSoup, el de antes)
+PARSER_HTML = os.environ.get("HORARIOS_PARSER_HTML", "rapido")
+
+def descargar_grupos_materia(clave_int, nombre_materia, cliente=None, timeout=5):
+    """
+    Baja y parsea la página de la asignatura. Regresa la lista de grupos,
+    None si el servidor no respondió 200. Los errores de red se propagan.
+    """
+    return descargar_grupos(cliente or cliente_http(), clave_int, nombre_materia, backend=PARSER_HTML, timeout=timeout)
+
+# --- CACHE DE MATERIAS (COMPARTIDO ENTRE SESIONES) ---
+@st.cache_resource
+def cache_materias():
+    return CacheMaterias()
+
+def _vacantes_en_vivo(grupos, vivos):
+    """Pasa a grupos (del snapshot) las vacantes de vivos (recién bajados del SSA) y recalcula activo."""
+    por_gpo = {g_vivo.get("gpo"): g_vivo for g_vivo in vivos}
+    for g in grupos:
+        g_vivo = por_gpo.get(g.get("gpo"))
+        if g_vivo is not None:
+            g["vacantes"] = g_vivo.get("vacantes", g.get("vacantes", 0))
+            g["activo"] = g["vacantes"] > 0
+
+def _obtener_materia(clave_materia, es_obligatoria, ttl_vacantes=None, cliente=None, usar_snapshot=True):
+    """
+    obtener_datos_unam sin llamadas a Streamlit (se puede correr en hilos).
+    Regresa (resultado, mensaje de error o None).
+    Si hay snapshot y trae la clave, los datos fijos salen de ahí y solo las vacantes (y activo)
+    se piden al SSA, esperando a lo más TIMEOUT_VACANTES_SNAPSHOT; si no responden a tiempo
+    se quedan las del snapshot. Con usar_snapshot=False siempre se va al SSA (para refrescar cupos).
+    """
     clave_materia = str(clave_materia)
     try:
         clave_int = str(int(clave_materia))
     except:
-        return []
+        return [], None
 
 
-    nombre_limpio = CATALOGO_MATERIAS.get(clave_int, "MATERIA DESCONOCIDA")
+    nombre_limpio = catalogo_materias().nombre(clave_int, esperar=ESPERA_CATALOGO_SEGUNDOS) or "MATERIA DESCONOCIDA"
     nombre_materia = f"{clave_int} - {nombre_limpio}"
 
-    url = f"https://www.ssa.ingenieria.unam.mx/cj/tmp/programacion_horarios/{clave_int}.html"
-
     try:
-        response = requests.get(url, timeout=5)
-        if response.status_code != 200: return None
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        tablas = soup.find_all('table')
-        if not tablas: return []
+        snapshot = snapshot_materias() if usar_snapshot else None
+        grupos = snapshot.grupos(clave_int) if snapshot is not None else None
+        if grupos is not None:
+            try:
+                vivos = cache_materias().obtener(
+                    clave_int,
+                    lambda clave: descargar_grupos_materia(
+                        clave, nombre_materia, cliente=cliente, timeout=TIMEOUT_VACANTES_SNAPSHOT
+                    ),
+                    ttl_vacantes=ttl_vacantes, nombre_materia=nombre_materia
+                )
+            except Exception:
+                vivos = None
+            if vivos:
+                _vacantes_en_vivo(grupos, vivos)
+        else:
+            grupos = cache_materias().obtener(
+                clave_int,
+                lambda clave: descargar_grupos_materia(clave, nombre_materia, cliente=cliente),
+                ttl_vacantes=ttl_vacantes, nombre_materia=nombre_materia
+            )
+        if grupos is None: return None, None
+        if not grupos: return [], None
 
         datos_materia = {
             "materia": nombre_materia,
             "obligatoria": es_obligatoria,
-            "grupos": []
+            "grupos": grupos
         }
-
-        for tabla in tablas:
-            filas = tabla.find_all('tr')
-            for fila in filas:
-                celdas = fila.find_all('td')
-                datos = [c.get_text(strip=True) for c in celdas]
-
-                if len(datos) < 7: continue
-                if datos[0] == "Clave": continue
-
-                gpo = datos[1]
-                # --- PROFESOR Y MODALIDAD---
-                profesor_raw = datos[2].replace("\n", " ").strip()
-
-                modalidad = None
-                match_modalidad = re.search(r"\(([^)]+)\)", profesor_raw)
-                if match_modalidad:
-                    modalidad = match_modalidad.group(1).strip().upper()
-                profesor_limpio = re.sub(r"\([^)]*\)", "", profesor_raw).strip()
-                profesor_limpio = re.sub(
-                    r"^(ING\.|DR\.|DRA\.|M\.I\.|M\. EN I\.|MC\.|MTRO\.|MTRA\.|LIC\.|ARQ\.)\s+",
-                    "",
-                    profesor_limpio,
-                    flags=re.IGNORECASE
-                ).strip()
-
-                profesor = profesor_limpio
-
-                horario = datos[4]
-                dias_str = datos[5]
-
-                salon = datos[6] if len(datos) >= 8 else "SIN"
-                salon = salon.strip() if salon else "SIN"
-
-                try:
-                    vacantes = int(datos[-1])
-                except:
-                    vacantes = 0
-
-
-                intervalos = extraer_intervalos(horario, dias_str.split(','))
-
-                datos_materia["grupos"].append({
-                    "gpo": gpo,
-                    "profesor": profesor,
-                    "profesor_raw": profesor_raw,
-                    "modalidad": modalidad,
-                    "salon": salon,
-                    "horario": horario,
-                    "dias": dias_str,
-                    "intervalos": intervalos,
-                    "calificacion": 10,
-                    "materia_nombre": nombre_materia,
-                    "vacantes": vacantes,
-                    "activo": vacantes > 0,
-                    "api_consultado": False,
-                    "sugerencia_api": None,
-                    "api_num_resenas": None,
-                    "api_nombre_match": None
-                })
-
-        if not datos_materia["grupos"]: return []
-        return [datos_materia]
+        return [datos_materia], None
 
     except requests.exceptions.Timeout:
-        st.error(f"Tiempo de espera agotado al buscar la clave {clave_int}. Intenta de nuevo.")
-        return []
+        return [], f"Tiempo de espera agotado al buscar la clave {clave_int}. Intenta de nuevo."
     except Exception as e:
-        st.error(f"Error técnico: {e}")
-        return []
-
-# --- LÓGICA DE VALIDACIÓN Y SCORE ---
-def hay_traslape(g1, g2):
-    for s1 in g1['intervalos']:
-        for s2 in g2['intervalos']:
-            if s1['dia'] == s2['dia']:
-                if s1['inicio'] < s2['fin'] and s1['fin'] > s2['inicio']:
-                    return True
-    return False
-
-def es_horario_valido(combinacion):
-    for i in range(len(combinacion)):
-        for j in range(i + 1, len(combinacion)):
-            if hay_traslape(combinacion[i], combinacion[j]):
-                return False
-    return True
-
-def calcular_score(combinacion, pesos):
-    grupos_reales = [g for g in combinacion if g['gpo'] != "N/A"]
-    if not grupos_reales: return -1000
-
-    score = 0
-
-    huecos = 0
-    for dia in ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab"]:
-        clases = sorted([s for g in grupos_reales for s in g['intervalos'] if s['dia'] == dia], key=lambda x: x['inicio'])
-        for i in range(len(clases)-1):
-            huecos += (clases[i+1]['inicio'] - clases[i]['fin']) / 60
-    score -= huecos * pesos['huecos']
-
-    promedio_p = sum(g['calificacion'] for g in grupos_reales) / len(grupos_reales)
-    score += promedio_p * pesos['profes']
-
-    start_times = [s['inicio'] for g in grupos_reales for s in g['intervalos']]
-    end_times = [s['fin'] for g in grupos_reales for s in g['intervalos']]
-
-    if start_times and end_times:
-        primer_inicio = min(start_times)
-        ultima_salida = max(end_times)
-
-        if pesos['tipo_turno'] == "Mañana (Temprano)":
-            score += ((1440 - ultima_salida) / 60) * pesos['peso_turno']
-        elif pesos['tipo_turno'] == "Tarde / Noche":
-            score += (primer_inicio / 60) * pesos['peso_turno']
-        else:
-            pass
-
-    score += len(grupos_reales) * pesos['carga']
+        return [], f"Error técnico: {e}"
 
-    return score
+def obtener_datos_unam(clave_materia, es_obligatoria, ttl_vacantes=None):
+    resultado, error = _obtener_materia(clave_materia, es_obligatoria, ttl_vacantes, cliente=cliente_http())
+    if error:
+        st.error(error)
+    return resultado
 
-# EXPORTACIÓN A CALENDARIO (.ics)
-def _proxima_fecha_para_dia(dia_str):
+def obtener_varias_materias(claves, es_obligatoria, ttl_vacantes=None, callback_progreso=None, usar_snapshot=True):
     """
-    Regresa una fecha (datetime.date) para el próximo día de la semana indicado.
-    No importa el semestre real: solo sirve como plantilla para el calendario.
+    Descarga varias claves a la vez (a lo más MAX_DESCARGAS_SIMULTANEAS) con el cliente compartido.
+    Regresa [(resultado, error)] en el mismo orden que claves.
     """
-    mapa = {"Lun": 0, "Mar": 1, "Mie": 2, "Jue": 3, "Vie": 4, "Sab": 5}
-    if dia_str not in mapa:
-        return datetime.today().date()
-
-    hoy = datetime.today().date()
-    delta = (mapa[dia_str] - hoy.weekday()) % 7
-    if delta == 0:
-        delta = 7 
-    return hoy + timedelta(days=delta)
+    if not claves:
+        return []
 
-def generar_ics_desde_opcion(materias_combinadas, nombre_calendario="Horario FI UNAM"):
+    cliente = cliente_http()
+    resultados = [None] * len(claves)
+    with ThreadPoolExecutor(max_workers=min(MAX_DESCARGAS_SIMULTANEAS, len(claves))) as ejecutor:
+        futuros = {
+            ejecutor.submit(_obtener_materia, clave, es_obligatoria, ttl_vacantes, cliente, usar_snapshot): pos
+            for pos, clave in enumerate(claves)
+        }
+        for terminadas, futuro in enumerate(as_completed(futuros), start=1):
+            resultados[futuros[futuro]] = futuro.result()
+            if callback_progreso is not None:
+                callback_progreso(terminadas / len(claves))
+
+    return resultados
+
+# --- TOP-K PARA LA INTERFAZ ---
+# Qué se le dice al usuario cuando hace falta volver a Generar, según lo que cambió
+AVISOS_REGENERAR = {
+    "grupos": "Cambiaron tus grupos activos. Presiona **Generar combinaciones optimizadas** para actualizar los horarios.",
+    "calificaciones": (
+        "Cambiaron las calificaciones de tus profesores. Con tantas combinaciones los horarios no se "
+        "reordenan solos: presiona **Generar combinaciones optimizadas** para actualizarlos."
+    ),
+    "pesos": (
+        "Cambiaron tus prioridades (pesos o configuración por día). Con tantas combinaciones los horarios "
+        "no se reordenan solos: presiona **Generar combinaciones optimizadas** para actualizarlos."
+    ),
+}
+
+def calcular_top_horarios(grupos_input, pesos, top_k=10, config_dias=None, w_dias=35, generar=False,
+                          callback_progreso=None, callback_parcial=None, limite_segundos=None):
     """
-    Convierte una combinación (lista de grupos) en texto ICS.
+    Top-k de la sesión. Regresa (top, detenida): detenida es None si el top es exacto o
+    {"motivo", "progreso", "cota"}; si hay que presionar Generar, (None, llave de AVISOS_REGENERAR).
     """
-    ics = []
-    ics.append("BEGIN:VCALENDAR")
-    ics.append("VERSION:2.0")
-    ics.append("PRODID:-//FI UNAM Scheduler//Streamlit//ES")
-    ics.append("CALSCALE:GREGORIAN")
-    ics.append(f"X-WR-CALNAME:{nombre_calendario}")
-    for g in materias_combinadas:
-        if g.get("gpo") == "N/A":
-            continue
-
-        materia_nombre = g.get("materia_nombre", "Materia")
-        profesor = g.get("profesor", "")
-        modalidad = g.get("modalidad", "")
-        salon = g.get("salon", "SIN")
-        horario = g.get("horario", "")
-        dias = g.get("dias", "")
-        vacantes = g.get("vacantes", "")
-
-        if salon and str(salon).strip().upper() != "SIN":
-            summary = f"{materia_nombre} | GPO {g.get('gpo','')} | {salon}"
-        else:
-            summary = f"{materia_nombre} | GPO {g.get('gpo','')}"
-
-        desc = f"Profesor: {profesor}"
-
-        if modalidad:
-            desc += f" ({modalidad})"
-
-        if salon and str(salon).strip().upper() != "SIN":
-            desc += f"\\nSalón: {salon}"
+    firma = firma_grupos(grupos_input)
+    califs = tuple(g['calificacion'] for grupos in grupos_input for g in grupos)
+
+    # Si las combinaciones válidas caben en memoria, solo se vuelven a puntuar en cada rerun
+    espacio = st.session_state.get("espacio_combinaciones")
+    if espacio is None or espacio["firma"] != firma:
+        combinaciones = espacio["combinaciones"] if espacio is not None else None
+        if combinaciones is None or not combinaciones.actualizar(grupos_input):
+            if not generar:
+                # El espacio ya no corresponde a los grupos (o quedó a medias): que no ocupe memoria
+                st.session_state.espacio_combinaciones = None
+                return None, "grupos"
+            combinaciones = EspacioCombinaciones.construir(grupos_input)
+        espacio = {"firma": firma, "combinaciones": combinaciones}
+        st.session_state.espacio_combinaciones = espacio
+
+    if espacio["combinaciones"] is not None:
+        espacio["combinaciones"].sincronizar_califs(grupos_input)
+        return espacio["combinaciones"].mejores(pesos, top_k, config_dias, w_dias, grupos_input=grupos_input), None
+
+    # Demasiadas combinaciones para guardarlas: branch and bound, solo al presionar Generar
+    parametros = (califs, repr(pesos), repr(config_dias), w_dias, top_k)
+    ultimo = st.session_state.get("ultimo_top_horarios")
+    if not generar:
+        if ultimo is None or ultimo["firma"] != firma:
+            return None, "grupos"
+        if ultimo["parametros"] == parametros:
+            return ultimo["top"], ultimo["detenida"]
+        return None, "calificaciones" if ultimo["parametros"][0] != califs else "pesos"
+
+    total_comb = 1
+    for grupos in grupos_input:
+        total_comb *= len(grupos)
+
+    top_heap = []
+    detenida = None
+    # Búsquedas grandes se reparten entre los núcleos disponibles
+    for parcial in iterar_mejores_horarios(
+        grupos_input,
+        pesos,
+        top_k=top_k,
+        config_dias=config_dias,
+        w_dias=w_dias,
+        limite_segundos=limite_segundos,
+        paralelo=total_comb >= MIN_COMBINACIONES_PARALELO,
+        heuristica=total_comb >= MIN_COMBINACIONES_HEURISTICA
+    ):
+        top_heap = parcial["top"]
+        if parcial["terminada"]:
+            stats = parcial["stats"]
+            detenida = None if stats["completa"] else {
+                "motivo": stats["detenida"], "progreso": parcial["progreso"], "cota": stats.get("cota_superior")
+            }
         else:
-            desc += f"\\nSalón: SIN / En línea"
-
-        desc += f"\\nHorario: {dias} {horario}"
-        desc += f"\\nVacantes: {vacantes}"
-
-        for s in g.get("intervalos", []):
-            dia = s.get("dia")
-            fecha = _proxima_fecha_para_dia(dia)
-
-            inicio_min = s.get("inicio", 0)
-            fin_min = s.get("fin", 0)
-
-            dtstart = datetime.combine(fecha, datetime.min.time()) + timedelta(minutes=inicio_min)
-            dtend = datetime.combine(fecha, datetime.min.time()) + timedelta(minutes=fin_min)
-
-            # Formato ICS: YYYYMMDDTHHMMSS
-            dtstart_str = dtstart.strftime("%Y%m%dT%H%M%S")
-            dtend_str = dtend.strftime("%Y%m%dT%H%M%S")
-
-            uid = f"{materia_nombre}-{g.get('gpo','')}-{dia}-{dtstart_str}@fiunam"
-
-            ics.append("BEGIN:VEVENT")
-            ics.append(f"UID:{uid}")
-            ics.append(f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
-            ics.append(f"DTSTART:{dtstart_str}")
-            ics.append(f"DTEND:{dtend_str}")
-            ics.append(f"SUMMARY:{summary}")
-            ics.append(f"DESCRIPTION:{desc}")
-            ics.append("END:VEVENT")
-
-    ics.append("END:VCALENDAR")
-    return "\n".join(ics)
-
-# EXPORTACIÓN COMO IMAGEN (PNG)
-
-def dataframe_a_png(df_text, df_color=None):
-    """
-    Exporta un DataFrame a PNG. Si df_color viene, aplica background-color por celda.
-    df_color debe contener strings tipo: "background-color: #FFCDD2; color: #000000;"
-    """
-    fig, ax = plt.subplots(figsize=(12, 18))
-    ax.axis("off")
-
-    tabla = ax.table(
-        cellText=df_text.values,
-        rowLabels=df_text.index,
-        colLabels=df_text.columns,
-        cellLoc="center",
-        loc="center"
-    )
+            # Si el script se interrumpe aquí, en el siguiente rerun se muestra esto como resultado
+            detenida = {"motivo": "cancelada", "progreso": parcial["progreso"], "cota": None}
+        st.session_state.ultimo_top_horarios = {
+            "firma": firma, "parametros": parametros, "top": top_heap, "detenida": detenida
+        }
+        if callback_progreso is not None:
+            callback_progreso(parcial["progreso"] if detenida is not None else 1.0)
+        if callback_parcial is not None and not parcial["terminada"]:
+            callback_parcial(top_heap)
+
+    return top_heap, detenida
+
+# --- CUADRÍCULA DEL HORARIO ---
+# Los resultados se vuelven a dibujar en cada rerun (p. ej. al mover un peso): solo clave decide el caché
+@st.cache_data(max_entries=64, show_spinner=False)
+def cuadricula_horario(clave, _materias, mostrar_sin_cupo):
+    """(df_text, df_color) de construir_cuadricula, cacheado por clave_combinacion."""
+    return construir_cuadricula(_materias, mostrar_sin_cupo)
+
+# EXPORTACIÓN COMO IMAGEN (PNG / SVG)
+# "nativo": SVG directo y PNG con Pillow (horarios_fi.imagen); "matplotlib": la tabla de ax.table de antes
+BACKEND_IMAGEN = os.environ.get("HORARIOS_IMAGEN", "nativo")
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def png_horario(clave, _df_text, _df_color):
+    """PNG de una cuadrícula, cacheado por clave_combinacion. Se llama solo al presionar la descarga."""
+    if BACKEND_IMAGEN != "matplotlib":
+        try:
+            return cuadricula_a_png(_df_text, _df_color)
+        except ImportError:
+            pass
+    return dataframe_a_png(_df_text, _df_color)
 
-    tabla.auto_set_font_size(False)
-    tabla.set_fontsize(8)
-    tabla.scale(1, 1.4)
-
-    # Colorear celdas si viene df_color
-    if df_color is not None:
-        for r in range(df_text.shape[0]):
-            for c in range(df_text.shape[1]):
-                estilo = df_color.iat[r, c]
-                if isinstance(estilo, str) and "background-color" in estilo:
-                    try:
-                        bg = estilo.split("background-color:")[1].split(";")[0].strip()
-                        tabla[(r+1, c)].set_facecolor(bg)  # +1 por header row
-                    except:
-                        pass
-
-                # borde rojo si está marcado en estilo
-                if isinstance(estilo, str) and "border:" in estilo and "ff4d4d" in estilo.lower():
-                    tabla[(r+1, c)].set_linewidth(2)
-
-    # Guardar a bytes
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", dpi=200, bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
-    return buf.getvalue()
+@st.cache_data(max_entries=64, show_spinner=False)
+def svg_horario(clave, _df_text, _df_color):
+    """SVG de una cuadrícula (bytes), cacheado por clave_combinacion."""
+    return cuadricula_a_svg(_df_text, _df_color).encode("utf-8")
 
 # --- INTERFAZ DE USUARIO ---
 st.title("Generador de Horarios FI")
 
 if 'materias_db' not in st.session_state:
     st.session_state.materias_db = []
-if "api_cache_profes" not in st.session_state:
-    st.session_state.api_cache_profes = {}
 
 # --- GUÍA DE USO DETALLADA ---
 with st.expander("Instrucciones de uso (Actualizado)", expanded=False):
@@ -660,6 +593,13 @@ with col_in:
     st.subheader("1. Carga de Materias")
     
     st.caption("Inicia aquí ingresando tus claves y presiona **Agregar Materias**.")
+    if snapshot_materias() is not None:
+        st.caption(
+            f"Horarios tomados de la copia local del {snapshot_materias().creado}; las vacantes se piden "
+            "en vivo al agregar. Usa **🔄 Refrescar Cupos** para actualizarlas después."
+        )
+    elif catalogo_materias().error and not catalogo_materias().nombres():
+        st.caption(f"⚠️ {catalogo_materias().error} Las materias se agregarán sin nombre.")
     
     clave_input = st.text_input(
         "## Claves:",
@@ -677,23 +617,26 @@ with col_in:
 
             barra = st.progress(0)
 
-            for i, clave_raw in enumerate(lista_claves):
+            claves_validas = [str(int(c)) for c in lista_claves if c.isdigit()]
+            descargas = iter(obtener_varias_materias(claves_validas, True, callback_progreso=barra.progress))
+
+            for clave_raw in lista_claves:
                 if clave_raw.isdigit():
                     clave_limpia = str(int(clave_raw))
 
-                    nuevas = obtener_datos_unam(clave_limpia, True)
+                    nuevas, error = next(descargas)
 
                     if nuevas:
                         nombre = nuevas[0]['materia']
                         st.session_state.materias_db.extend(nuevas)
                         agregadas.append(nombre)
+                    elif error:
+                        errores.append(f"Clave {clave_limpia}: {error}")
                     else:
                         errores.append(f"Clave {clave_limpia}: No encontrada")
                 else:
                     errores.append(f"'{clave_raw}' no es una clave válida")
 
-                barra.progress((i + 1) / len(lista_claves))
-
             barra.empty()
 
             if agregadas:
@@ -731,6 +674,7 @@ with col_in:
                         "horario": str_horario,
                         "dias": ", ".join(act_dias),
                         "intervalos": intervalos_manual,
+                        "mascara": construir_mascara(intervalos_manual),
                         "calificacion": 10,
                         "materia_nombre": act_nombre,
                         "vacantes": 999,
@@ -928,18 +872,18 @@ with col_in:
                 if not califs_dict:
                     st.error("No se detectó el formato correcto (Tabulaciones de Excel).")
                 else:
+                    nombres_pegados = list(califs_dict)
+                    indice = IndiceNombres(nombres_pegados)
+                    coincidencias = {}
+
                     for i, materia in enumerate(st.session_state.materias_db):
                         for j, grupo in enumerate(materia['grupos']):
                             profe_actual = grupo['profesor']
-                            nueva_calif = None
+                            if profe_actual not in coincidencias:
+                                coincidencias[profe_actual] = indice.buscar(profe_actual)
 
-                            if profe_actual in califs_dict:
-                                nueva_calif = califs_dict[profe_actual]
-                            else:
-                                for k_profe, v_calif in califs_dict.items():
-                                    if k_profe in profe_actual or profe_actual in k_profe:
-                                        nueva_calif = v_calif
-                                        break
+                            pos = coincidencias[profe_actual]
+                            nueva_calif = califs_dict[nombres_pegados[pos]] if pos is not None else None
 
                             if nueva_calif is not None:
                                 st.session_state.materias_db[i]['grupos'][j]['calificacion'] = nueva_calif
@@ -969,16 +913,27 @@ with col_list:
 
     c_header_1.subheader("2. Materias Registradas")
 
-    if c_header_2.button("🔄 Refrescar Cupos", use_container_width=True):
-        refrescar_vacantes()
-        st.rerun()
+    if c_header_2.button("🔄 Refrescar Cupos", width="stretch"):
+        # Se refresca antes de dibujar la lista, así que no hace falta st.rerun()
+        refrescar_vacantes(desactivar_llenos=st.session_state.get("desactivar_llenos", False))
 
     label_expand = "📁 Plegar todo" if st.session_state.expand_materias else "📂 Expandir todo"
-    if c_header_3.button(label_expand, use_container_width=True):
+    if c_header_3.button(label_expand, width="stretch"):
         st.session_state.expand_materias = not st.session_state.expand_materias
         st.rerun()
 
 
+    st.toggle(
+        "Al refrescar cupos, desmarcar los grupos que se llenen",
+        key="desactivar_llenos",
+        help="Si un grupo tenía vacantes y al refrescar ya no, se desmarca para que el generador lo ignore."
+    )
+
+    if st.session_state.materias_db and st.button("🔍 Buscar sugerencias de Calificacion para todas las materias", width="stretch"):
+        # Igual que el refresco: se consulta antes de dibujar la lista, así que no hace falta st.rerun()
+        encontrados, no_encontrados = aplicar_sugerencias_profesores(range(len(st.session_state.materias_db)))
+        st.success(f"✅ API: {encontrados} encontrados | ❌ {no_encontrados} no encontrados")
+
     if not st.session_state.materias_db:
         st.info("Tu lista está vacía. Comienza ingresando una clave a la izquierda.")
 
@@ -989,37 +944,7 @@ with col_list:
 
             c_api_1, c_api_2 = st.columns([1, 1])
             if c_api_1.button("🔍 Buscar sugerencias de Calificacion", key=f"api_mat_{i}", width="stretch"):
-                grupos_actualizados = 0
-                no_encontrados = 0
-
-                with st.spinner("Consultando promedios de profesores..."):
-                    for j, g in enumerate(m['grupos']):
-                        if g.get("gpo") == "N/A":
-                            continue
-                        if g.get("profesor") == "Tú":
-                            continue
-
-                        nombre_original = g.get("profesor", "")
-                        nombre_limpio = limpiar_nombre_profesor(nombre_original)
-                        if nombre_limpio in st.session_state.api_cache_profes:
-                            resultado = st.session_state.api_cache_profes[nombre_limpio]
-                        else:
-                            resultado = consultar_ingenieria_tracker(g.get("profesor", ""))
-                            st.session_state.api_cache_profes[nombre_limpio] = resultado
-                        st.session_state.materias_db[i]['grupos'][j]['api_consultado'] = True
-
-                        promedio = resultado.get("promedio", None)
-
-                        if promedio is not None:
-                            st.session_state.materias_db[i]['grupos'][j]['sugerencia_api'] = promedio
-                            st.session_state.materias_db[i]['grupos'][j]['api_num_resenas'] = resultado.get("num_resenas", None)
-                            st.session_state.materias_db[i]['grupos'][j]['api_nombre_match'] = resultado.get("nombre_api", None)
-                            grupos_actualizados += 1
-                        else:
-                            st.session_state.materias_db[i]['grupos'][j]['sugerencia_api'] = None
-                            st.session_state.materias_db[i]['grupos'][j]['api_num_resenas'] = None
-                            st.session_state.materias_db[i]['grupos'][j]['api_nombre_match'] = None
-                            no_encontrados += 1
+                grupos_actualizados, no_encontrados = aplicar_sugerencias_profesores([i])
 
                 c_api_2.success(f"✅ API: {grupos_actualizados} encontrados | ❌ {no_encontrados} no encontrados")
                 st.rerun()
@@ -1037,7 +962,7 @@ with col_list:
 
             st.session_state.materias_db[i]["obligatoria"] = (nuevo_tipo == "Obligatorio")
 
-            if c_mat_right.button("🗑️ Eliminar", key=f"del_mat_{i}", use_container_width=True):
+            if c_mat_right.button("🗑️ Eliminar", key=f"del_mat_{i}", width="stretch"):
                 st.session_state.materias_db.pop(i)
                 st.rerun()
 
@@ -1047,11 +972,15 @@ with col_list:
 
                 c_check, c_info, c_calif = st.columns([0.22, 0.58, 0.20])
 
+                # Si refrescar_vacantes ya dejó el valor en session_state, no se le pasa value
+                # (Streamlit avisa cuando un widget trae las dos cosas)
+                key_tgl = f"tgl_{i}_{j}"
+                kwargs_tgl = {} if key_tgl in st.session_state else {"value": g.get('activo', True)}
                 activo = c_check.toggle(
                     "Incluir",
-                    value=g.get('activo', True),
-                    key=f"tgl_{i}_{j}",
-                    label_visibility="collapsed"
+                    key=key_tgl,
+                    label_visibility="collapsed",
+                    **kwargs_tgl
                 )
 
                 st.session_state.materias_db[i]['grupos'][j]['activo'] = activo
@@ -1088,6 +1017,12 @@ with col_list:
                 color_vac = "green" if vacs > 5 else ("orange" if vacs > 0 else "red")
                 salon = g.get("salon", None)
 
+                # Marca de cambio desde el último refresco de cupos
+                cambio_txt = ""
+                cambio = st.session_state.get("ultimo_refresco", {}).get((m['materia'], g['gpo']))
+                if cambio:
+                    cambio_txt = f" <span style='color:gray; font-size:0.85em;'>(antes {cambio[0]})</span>"
+
                 salon_txt = ""
                 if salon and salon.strip().upper() != "SIN":
                     salon_txt = f" <span style='color:#555;'>(Salón: <strong>{salon}</strong>)</span>"
@@ -1099,7 +1034,7 @@ with col_list:
                 <div style="font-size: 0.9em;">
                     <strong>Gpo {g['gpo']}</strong> - {g['profesor']}{salon_txt}<br>
                     📅 {g['dias']} ({g['horario']})<br>
-                    Vacantes: <strong style='color: {color_vac}'>{vacs}</strong><br>
+                    Vacantes: <strong style='color: {color_vac}'>{vacs}</strong>{cambio_txt}<br>
                     {sug_txt}
                 </div>
                 """
@@ -1150,9 +1085,24 @@ mostrar_sin_cupo = c_vis1.toggle(
     help="Si lo apagas, el horario no mostrará la etiqueta ⚠️SIN CUPO, pero seguirá marcando el borde rojo."
 )
 
-if st.button("Generar combinaciones optimizadas", width="stretch"):
+limite_busqueda = c_vis2.number_input(
+    "⏱️ Tiempo máximo de búsqueda (segundos)",
+    min_value=0,
+    max_value=600,
+    value=LIMITE_BUSQUEDA_SEGUNDOS,
+    step=5,
+    help="Con muchas combinaciones la búsqueda se detiene al llegar a este tiempo y muestra lo mejor que encontró. 0 = sin límite."
+)
+
+generar = st.button("Generar combinaciones optimizadas", width="stretch")
+if generar:
+    # Desde aquí los resultados se quedan en pantalla y se re-ordenan solos al mover pesos
+    st.session_state.mostrar_horarios = True
+
+if st.session_state.get("mostrar_horarios", False):
     if not st.session_state.materias_db:
-        st.error("No puedes generar horarios sin materias. Agrega al menos una.")
+        if generar:
+            st.error("No puedes generar horarios sin materias. Agrega al menos una.")
     else:
         grupos_input = []
 
@@ -1162,6 +1112,9 @@ if st.button("Generar combinaciones optimizadas", width="stretch"):
             grupos_validos = [g for g in m['grupos'] if g.get('activo', True)]
 
             if grupos_validos:
+                if not m.get("obligatoria", True):
+                    # Opcional: también se vale no inscribirla
+                    grupos_validos = grupos_validos + [grupo_no_inscribir(m["materia"])]
                 grupos_input.append(grupos_validos)
             else:
                 # Si no hay grupos activos, se omite la materia
@@ -1176,83 +1129,98 @@ if st.button("Generar combinaciones optimizadas", width="stretch"):
                 + "\n\n💡 Tip: Activa al menos 1 grupo si quieres que se considere en el horario."
             )
 
+        top_heap = None
+
         # Si al final no quedó nada para combinar
         if not grupos_input:
             st.error("No hay grupos activos para generar horarios. Activa al menos un grupo.")
-            st.stop()
+        else:
+            total_comb = 1
+            for g in grupos_input:
+                total_comb *= len(g)
 
+            if generar and total_comb > 5_000_000:
+                st.warning(
+                    f"⚠️ Se detectaron {total_comb:,} combinaciones posibles. "
+                    "La búsqueda podría tardar: verás los mejores horarios que lleve mientras avanza "
+                    "y puedes detenerla cuando quieras."
+                )
 
-        total_comb = 1
-        for g in grupos_input:
-            total_comb *= len(g)
+            # ==========================================================
+            # TOP-10: re-ordenando el espacio guardado o con branch and bound
+            # ==========================================================
+            TOP_K = 10
+            barra_progreso = st.progress(0) if generar else None
+            zona_detener = st.empty() if generar else None
+            zona_parcial = st.empty() if generar else None
+            boton_detener = [False]
+
+            def mostrar_parcial(top):
+                # Presionar cualquier cosa interrumpe el script y con eso la búsqueda;
+                # el botón solo aparece si la búsqueda no terminó en el primer intervalo
+                if not boton_detener[0]:
+                    boton_detener[0] = True
+                    zona_detener.button("⏹️ Detener búsqueda", key="detener_busqueda", width="stretch")
+                with zona_parcial.container():
+                    st.caption("🔎 Buscando... estos son los mejores horarios encontrados hasta ahora.")
+                    if top:
+                        tabs_parciales = st.tabs([f"Opción {i+1}" for i in range(len(top))])
+                        for tab, (sc, _, comb) in zip(tabs_parciales, top):
+                            with tab:
+                                st.markdown(f"**Score:** {sc:.2f}")
+                                st.dataframe(
+                                    pd.DataFrame([
+                                        {"Materia": g.get("materia_nombre", ""), "Gpo": g.get("gpo", ""),
+                                         "Profesor": g.get("profesor", ""), "Horario": g.get("horario", ""),
+                                         "Días": g.get("dias", "")}
+                                        for g in comb if g.get("gpo") != "N/A"
+                                    ]),
+                                    hide_index=True
+                                )
 
-        if total_comb > 5_000_000:
-            st.warning(
-                f"⚠️ Se detectaron {total_comb:,} combinaciones posibles. "
-                "Esto podría saturar la memoria. Intenta desactivar algunos grupos o reducir materias."
+            top_heap, detenida = calcular_top_horarios(
+                grupos_input,
+                pesos,
+                top_k=TOP_K,
+                config_dias=st.session_state.config_dias,
+                w_dias=w_dias,
+                generar=generar,
+                callback_progreso=barra_progreso.progress if barra_progreso is not None else None,
+                callback_parcial=mostrar_parcial if generar else None,
+                limite_segundos=limite_busqueda or None
             )
-
-        generador_comb = itertools.product(*grupos_input)
-
-        # ==========================================================
-        # TOP-10 incremental (NO guarda todas las combinaciones)
-        # ==========================================================
-        TOP_K = 10
-        top_heap = []
-
-        MAX_COMBINACIONES_A_REVISAR = 1000000
-        barra_progreso = st.progress(0)
-
-        for idx, comb in enumerate(generador_comb):
-            if idx >= MAX_COMBINACIONES_A_REVISAR:
+            if generar:
+                zona_detener.empty()
+                zona_parcial.empty()
+
+            if top_heap is None:
+                # Sin resultado, el segundo valor dice qué cambió desde el último Generar
+                st.info(AVISOS_REGENERAR[detenida])
+            elif detenida is not None:
+                motivo = "Se acabó el tiempo de búsqueda" if detenida["motivo"] == "tiempo" else "Detuviste la búsqueda"
+                cota_txt = ""
+                if detenida.get("cota") is not None and top_heap:
+                    cota_txt = (
+                        f" El mejor encontrado tiene score {top_heap[0][0]:.2f}; "
+                        f"ningún horario puede pasar de {detenida['cota']:.2f}."
+                    )
                 st.warning(
-                    f"Se revisaron las primeras {MAX_COMBINACIONES_A_REVISAR} combinaciones "
-                    "y se detuvo para no saturar."
+                    f"⏱️ {motivo} (se revisó ~{detenida['progreso']:.0%} de las combinaciones). "
+                    "Estos son los mejores horarios encontrados hasta ese momento; puede haber mejores."
+                    + cota_txt
+                    + " Sube el tiempo máximo o desactiva grupos y vuelve a generar."
                 )
-                break
-
-            if es_horario_valido(comb):
-                sc = calcular_score(comb, pesos)
-
-                if len(top_heap) < TOP_K:
-                    heapq.heappush(top_heap, (sc, idx, comb))
-                else:
-                    if sc > top_heap[0][0]:
-                        heapq.heapreplace(top_heap, (sc, idx, comb))
 
-            if idx % 5000 == 0:
-                progreso_val = min(idx / min(total_comb, MAX_COMBINACIONES_A_REVISAR), 1.0)
-                barra_progreso.progress(progreso_val)
-        barra_progreso.progress(1.0)
-        top_heap_sorted = sorted(top_heap, key=lambda x: x[0], reverse=True)
-        posibles = [{"materias": comb, "score": sc} for (sc, _, comb) in top_heap_sorted]
+        posibles = [{"materias": comb, "score": sc} for (sc, _, comb) in top_heap] if top_heap is not None else None
 
         # ==========================================================
         # Mostrar resultados
         # ==========================================================
         if posibles:
-
-            # ✅ APLICAR CONFIG AVANZADA POR DÍA AL SCORE (ANTES DE MOSTRAR)
-            for opcion in posibles:
-                opcion["score"] += calcular_penalizacion_por_dia(
-                    opcion,
-                    st.session_state.config_dias,
-                    w_dias=w_dias
-                )
-
-            # ✅ Reordenar opciones con el score actualizado
-            posibles = sorted(posibles, key=lambda x: x["score"], reverse=True)
-
             st.success("¡Horarios generados con éxito!")
             tabs = st.tabs([f"Opción {i+1}" for i in range(len(posibles))])
 
 
-            colores = [
-                "#FFCDD2", "#C5CAE9", "#B2DFDB", "#FFF9C4", "#E1BEE7",
-                "#FFCCBC", "#D7CCC8", "#F0F4C3", "#B3E5FC", "#DCEDC8",
-                "#F8BBD0", "#CFD8DC"
-            ]
-
             for i, tab in enumerate(tabs):
                 with tab:
                     opcion = posibles[i]
@@ -1275,141 +1243,37 @@ if st.button("Generar combinaciones optimizadas", width="stretch"):
                         data=ics_text.encode("utf-8"),
                         file_name=f"horario_opcion_{i+1}.ics",
                         mime="text/calendar",
-                        use_container_width=True
+                        width="stretch"
                     )
 
-                    btn_png_slot = c_top3.empty()
-                    # Detectar rango real del horario (primera clase -> última clase + 30 min)
-                    inicios = []
-                    fines = []
-
-                    for m_g in opcion["materias"]:
-                        if m_g.get("gpo") == "N/A":
-                            continue
-                        for s in m_g.get("intervalos", []):
-                            inicios.append(s.get("inicio", 0))
-                            fines.append(s.get("fin", 0))
-
-                    # fallback si algo raro pasa
-                    if not inicios or not fines:
-                        min_minuto = 7 * 60
-                        max_minuto = 22 * 60
-                    else:
-                        min_minuto = min(inicios)
-                        max_minuto = max(fines) + 30  # + media hora extra
-
-                        # límites razonables para que no se rompa visualmente
-                        min_minuto = max(min_minuto, 7 * 60)
-                        max_minuto = min(max_minuto, 22 * 60)
-
-                    # Generar labels cada 30 min solo dentro del rango
-                    horas_labels = []
-                    t = (min_minuto // 30) * 30
-                    while t <= max_minuto:
-                        horas_labels.append(f"{t//60:02d}:{'30' if (t%60==30) else '00'}")
-                        t += 30
-
-                    dias_cols = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab"]
-                    df_text = pd.DataFrame("", index=horas_labels, columns=dias_cols)
-                    df_color = pd.DataFrame("", index=horas_labels, columns=dias_cols)
-                    materia_color_map = {}
-                    color_idx = 0
-                    for m_g in opcion['materias']:
-                        if m_g['gpo'] == "N/A":
-                            continue
-                        nombre_mat = m_g['materia_nombre']
-                        if nombre_mat not in materia_color_map:
-                            materia_color_map[nombre_mat] = colores[color_idx % len(colores)]
-                            color_idx += 1
-                        bg_color = materia_color_map[nombre_mat]
-                        if " - " in nombre_mat:
-                            partes = nombre_mat.split(' - ')
-                            clave = partes[0]
-                            nombre_limpio = partes[1]
-                        else:
-                            clave = ""
-                            nombre_limpio = nombre_mat
-                        nombre_limpio = (nombre_limpio[:20] + '..') if len(nombre_limpio) > 20 else nombre_limpio
-                        profesor_corto = m_g['profesor'].split('\n')[0][:18]
-                        salon = m_g.get("salon", "SIN")
-                        salon = salon.strip() if salon else "SIN"
-                        vacs_grupo = m_g.get("vacantes", None)
-                        sin_cupo = False
-                        try:
-                            if vacs_grupo is not None and int(vacs_grupo) <= 0:
-                                sin_cupo = True
-                        except:
-                            sin_cupo = False
-                        tag_cupo = " ⚠️SIN CUPO" if (sin_cupo and mostrar_sin_cupo) else ""
-                        for s in m_g['intervalos']:
-                            h_i = f"{s['inicio']//60:02d}:{'30' if (s['inicio']%60 >= 30) else '00'}"
-                            h_f = f"{s['fin']//60:02d}:{'30' if (s['fin']%60 >= 30) else '00'}"
-                            if h_i in horas_labels and h_f in horas_labels:
-                                start_idx = horas_labels.index(h_i)
-                                end_idx = horas_labels.index(h_f)
-                                duracion_bloques = end_idx - start_idx
-                                for counter, h_idx in enumerate(range(start_idx, end_idx)):
-                                    dia = s['dia']
-                                    if dia in dias_cols:
-                                        if sin_cupo:
-                                            estilo = f"background-color: {bg_color}; color: #000000; border: 2px solid #ff4d4d;"
-                                        else:
-                                            estilo = f"background-color: {bg_color}; color: #000000;"
-                                        df_color.at[horas_labels[h_idx], dia] = estilo
-                                        texto_celda = ""
-
-                                        # Texto compacto para el header del bloque
-                                        header_line = ""
-                                        if salon.upper() != "SIN":
-                                            header_line = f"{salon} G{m_g['gpo']} ({clave}){tag_cupo}"
-                                        else:
-                                            header_line = f"G{m_g['gpo']} ({clave}){tag_cupo}"
-
-                                        # Profesor corto (1 línea)
-                                        profesor_line = f"\"{profesor_corto}\""
-
-                                        if duracion_bloques == 1:
-                                            if counter == 0:
-                                                texto_celda = header_line
-
-                                        elif duracion_bloques == 2:
-                                            if counter == 0:
-                                                texto_celda = header_line
-                                            if counter == 1:
-                                                texto_celda = nombre_limpio
-
-                                        elif duracion_bloques >= 3:
-                                            if counter == 0:
-                                                texto_celda = header_line
-                                            if counter == 1:
-                                                texto_celda = nombre_limpio
-                                            if counter == 2:
-                                                texto_celda = profesor_line
-
-                                        df_text.at[horas_labels[h_idx], dia] = texto_celda
-
+                    clave_opcion = clave_combinacion(opcion["materias"], mostrar_sin_cupo)
+                    df_text, df_color = cuadricula_horario(clave_opcion, opcion["materias"], mostrar_sin_cupo)
 
                     # ============================
                     # BOTÓN PNG COMPACTO (ARRIBA)
                     # ============================
-                    try:
-                        png_bytes = dataframe_a_png(df_text, df_color)
-                        btn_png_slot.download_button(
-                            label="Descargar imagen (.png)",
-                            data=png_bytes,
-                            file_name=f"horario_opcion_{i+1}.png",
-                            mime="image/png",
-                            use_container_width=True
-                        )
-                    except:
-                        btn_png_slot.button("Descargar imagen (.png)", disabled=True, use_container_width=True)
-                    
+                    # La imagen se dibuja hasta que se presiona el botón (y se queda en caché)
+                    c_top3.download_button(
+                        label="Descargar imagen (.png)",
+                        data=functools.partial(png_horario, clave_opcion, df_text, df_color),
+                        file_name=f"horario_opcion_{i+1}.png",
+                        mime="image/png",
+                        width="stretch"
+                    )
+                    c_top3.download_button(
+                        label="Descargar imagen (.svg)",
+                        data=functools.partial(svg_horario, clave_opcion, df_text, df_color),
+                        file_name=f"horario_opcion_{i+1}.svg",
+                        mime="image/svg+xml",
+                        width="stretch"
+                    )
+
                     alto_tabla = max(520, min(1200, 120 + len(df_text) * 34))
 
                     st.dataframe(
                         df_text.style.apply(lambda x: df_color, axis=None),
                         height=alto_tabla,
-                        use_container_width=True
+                        width="stretch"
                     )
 
 
@@ -1422,9 +1286,11 @@ if st.button("Generar combinaciones optimizadas", width="stretch"):
                     st.markdown("### 📋 Resumen del horario ")
 
                     lista_resumen = []
+                    no_inscritas = []
                     for g in opcion["materias"]:
-                        # Ignoramos si no aplica (N/A)
+                        # Ignoramos si no aplica (N/A), pero se avisa abajo
                         if g.get("gpo") == "N/A":
+                            no_inscritas.append(g.get("materia_nombre", ""))
                             continue
 
                         materia_nombre = g.get("materia_nombre", "")
@@ -1458,20 +1324,20 @@ if st.button("Generar combinaciones optimizadas", width="stretch"):
                     # Mostramos la tabla (usamos st.dataframe para que sea interactiva)
                     st.dataframe(
                         df_resumen, 
-                        width=None,   # Ajuste automático
-                        use_container_width=True, # Ocupar todo el ancho
+                        width="stretch", # Ocupar todo el ancho
                         hide_index=True, # Ocultar el índice numérico (0,1,2...) para que se vea mejor
                         height=420
                     )
+                    if no_inscritas:
+                        st.caption("➖ Opcionales que esta opción deja sin inscribir: " + ", ".join(no_inscritas))
 
-        else:
+        elif posibles is not None:
             st.warning(
                 "No se encontraron combinaciones válidas. "
                 "Intenta relajar tus restricciones (ej. permitir huecos o más turnos)."
             )
         del posibles
         del top_heap
-        del top_heap_sorted
         gc.collect()
 
 # --- PIE DE PÁGINA ---
@@ -0,0 +1,94 @@
+"""
+Materias, pesos y configuración por día al azar para comparar la búsqueda y el score contra el
+cálculo directo (itertools.product + calcular_score).
+"""
+import heapq
+import itertools
+
+from horarios_fi.horario import DIAS_SEMANA, construir_mascara
+from horarios_fi.puntaje import calcular_penalizacion_por_dia, calcular_score, es_horario_valido, grupo_no_inscribir
+
+TIPOS_TURNO = ("Mañana (Temprano)", "Tarde / Noche", "Indistinto")
+
+
+def _grupo(rng, nombre_materia, gpo, medias_horas):
+    intervalos = []
+    for dia in rng.sample(DIAS_SEMANA, rng.randint(1, 3)):
+        if medias_horas:
+            inicio = rng.randrange(7 * 60, 20 * 60, 30)
+            fin = inicio + rng.choice((60, 90, 120))
+        else:
+            # Horas que no caen en bloques de 30 min: sin máscara, por intervalos
+            inicio = rng.randrange(7 * 60, 20 * 60, 5)
+            fin = inicio + rng.choice((50, 75, 100, 120))
+        intervalos.append({"dia": dia, "inicio": inicio, "fin": fin})
+    return {
+        "gpo": str(gpo),
+        "profesor": f"PROFESOR {gpo}",
+        "calificacion": rng.choice((0, 5, 6, 7.5, 8, 9, 10)),
+        "materia_nombre": nombre_materia,
+        "intervalos": intervalos,
+        "mascara": construir_mascara(intervalos),
+        "vacantes": 10,
+        "activo": True,
+    }
+
+
+def grupos_al_azar(rng, n_materias=None, max_grupos=6, fraccion_irregular=None, fraccion_opcional=0.3):
+    """
+    grupos_input como el de la app: algunas materias opcionales (con N/A al final) y, en un
+    tercio de los casos, grupos con horas fuera de bloques de 30 min.
+    """
+    if fraccion_irregular is None:
+        fraccion_irregular = rng.choice((0.0, 0.0, 0.2))
+    grupos_input = []
+    for k in range(n_materias or rng.randint(1, 5)):
+        nombre = f"{1000 + k} - MATERIA {k}"
+        grupos = [
+            _grupo(rng, nombre, gpo, rng.random() >= fraccion_irregular)
+            for gpo in range(1, rng.randint(1, max_grupos) + 1)
+        ]
+        if rng.random() < fraccion_opcional:
+            grupos.append(grupo_no_inscribir(nombre))
+        grupos_input.append(grupos)
+    return grupos_input
+
+
+def pesos_al_azar(rng, negativos=False):
+    minimo = -20 if negativos else 0
+    return {
+        "huecos": rng.randint(minimo, 100),
+        "profes": rng.randint(minimo, 100),
+        "tipo_turno": rng.choice(TIPOS_TURNO),
+        "peso_turno": rng.randint(minimo, 100),
+        "carga": rng.randint(minimo, 100),
+    }
+
+
+def config_dias_al_azar(rng):
+    """None (sin configuración) o una configuración distinta de la default en algunos días."""
+    if rng.random() < 0.2:
+        return None
+    return {
+        dia: {
+            "modo": rng.choice(("Normal", "Prioridad")),
+            "preferencia": rng.choice(("Mixto", "Temprano", "Tarde", "Libre")),
+            "max_bloques": rng.choice((2, 4, 6, 10, 20)),
+            "evitar": rng.random() < 0.15,
+        }
+        for dia in DIAS_SEMANA
+    }
+
+
+def top_directo(grupos_input, pesos, top_k=10, config_dias=None, w_dias=35):
+    """El ciclo de antes del branch and bound: [(score, idx, combinación)] con el idx de itertools.product."""
+    top_heap = []
+    for idx, comb in enumerate(itertools.product(*grupos_input)):
+        if not es_horario_valido(comb):
+            continue
+        sc = calcular_score(comb, pesos) + calcular_penalizacion_por_dia({"materias": comb}, config_dias, w_dias=w_dias)
+        if len(top_heap) < top_k:
+            heapq.heappush(top_heap, (sc, idx, comb))
+        elif sc > top_heap[0][0]:
+            heapq.heapreplace(top_heap, (sc, idx, comb))
+    return sorted(top_heap, key=lambda x: (-x[0], x[1]))
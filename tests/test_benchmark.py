@@ -0,0 +1,79 @@
+"""
+El benchmark (horarios_fi.benchmark) con cargas chicas: que corra y que las variantes exactas
+reporten el mismo top.
+"""
+import json
+
+import pytest
+
+from horarios_fi import benchmark, busqueda
+
+EXACTAS = ("referencia", "bnb", "espacio", "paralelo")
+
+
+@pytest.mark.parametrize("densa", [False, True], ids=["dispersa", "densa"])
+@pytest.mark.parametrize("actividades", [False, True], ids=["sin-actividades", "actividades"])
+def test_variantes_exactas_reportan_el_mismo_top(monkeypatch, densa, actividades):
+    # Como con HORARIOS_PROCESOS=3, para que paralelo sí reparta aunque la máquina tenga un núcleo
+    monkeypatch.setattr(busqueda, "MAX_PROCESOS_BUSQUEDA", 3)
+    materias = benchmark.materias_sinteticas(4, 5, densa, actividades)
+
+    renglones = benchmark.medir_carga(
+        "chica", materias, EXACTAS + ("heuristica",), repeticiones=1, limite_heuristica=0.05, memoria=False
+    )
+
+    por_variante = {r["variante"]: r for r in renglones}
+    assert set(por_variante) == set(EXACTAS + ("heuristica",))
+    for variante in EXACTAS:
+        assert por_variante[variante]["completa"], variante
+        assert por_variante[variante]["igual"], variante
+    assert len({por_variante[v]["mejor_score"] for v in EXACTAS}) == 1
+    assert por_variante["referencia"]["combinaciones"] == 5 ** 4
+
+
+def test_referencia_solo_hasta_max_referencia():
+    renglones = benchmark.medir_carga(
+        "chica", benchmark.materias_sinteticas(3, 4), ("referencia", "bnb"), repeticiones=1,
+        max_referencia=10, memoria=False
+    )
+    assert [r["variante"] for r in renglones] == ["bnb"]
+    assert renglones[0]["igual"]
+
+
+def test_memoria_pico():
+    renglones = benchmark.medir_carga(
+        "chica", benchmark.materias_sinteticas(3, 4), ("bnb",), repeticiones=1, memoria=True
+    )
+    assert renglones[0]["memoria"] >= 0
+
+
+def test_main_guarda_y_compara(tmp_path, capsys):
+    fixture = tmp_path / "chica.json"
+    benchmark.exportar_fixture(fixture, benchmark.materias_sinteticas(4, 4, densa=True, actividades=True))
+    guardado = tmp_path / "base.json"
+    argumentos = ["--sin-sinteticas", "--fixture", str(fixture), "--variantes", "referencia,bnb,espacio",
+                  "--repeticiones", "1", "--sin-memoria"]
+
+    assert benchmark.main(argumentos + ["--guardar", str(guardado)]) == 0
+
+    renglones = json.loads(guardado.read_text(encoding="utf-8"))
+    assert {r["carga"] for r in renglones} == {"chica"}
+    assert [r["variante"] for r in renglones] == ["referencia", "bnb", "espacio"]
+    assert all(r["igual"] and r["completa"] for r in renglones)
+    assert "chica" in capsys.readouterr().out
+
+    # Contra sí misma (tiempos de ruido, por debajo de MIN_SEGUNDOS_COMPARABLES) no hay regresiones
+    assert benchmark.main(argumentos + ["--comparar", str(guardado), "--tolerancia", "1000"]) == 0
+
+
+def test_comparar_reporta_top_distinto_y_tiempos_peores():
+    base = [{"carga": "c", "variante": "bnb", "tiempo": 1.0}, {"carga": "c", "variante": "espacio", "tiempo": 1.0}]
+    renglones = [
+        {"carga": "c", "variante": "bnb", "tiempo": 1.1, "igual": True, "completa": True},
+        {"carga": "c", "variante": "espacio", "tiempo": 2.0, "igual": False, "completa": True},
+    ]
+
+    assert benchmark.comparar(renglones, base, tolerancia=0.25) == [
+        "c / espacio: el top no coincide con el exacto",
+        "c / espacio: 1.000 s -> 2.000 s (+100%)",
+    ]
@@ -0,0 +1,92 @@
+"""
+El branch and bound (secuencial y en procesos) contra revisar todas las combinaciones
+con itertools.product + calcular_score + calcular_penalizacion_por_dia.
+"""
+import random
+
+import pytest
+
+from horarios_fi import busqueda
+from horarios_fi.busqueda import buscar_mejores_horarios, buscar_mejores_horarios_paralelo
+
+from azar import config_dias_al_azar, grupos_al_azar, pesos_al_azar, top_directo
+
+
+def assert_mismo_top(obtenido, esperado):
+    assert [idx for _, idx, _ in obtenido] == [idx for _, idx, _ in esperado]
+    assert [sc for sc, _, _ in obtenido] == pytest.approx([sc for sc, _, _ in esperado])
+    assert [comb for _, _, comb in obtenido] == [comb for _, _, comb in esperado]
+
+
+@pytest.fixture(params=[1, 16, busqueda.TAMANO_LOTE], ids=lambda n: f"lote{n}")
+def tamano_lote(request, monkeypatch):
+    # Con el lote de la app, en espacios chicos el heap no se llena antes del final y la cota
+    # nunca poda; con lotes chicos sí
+    monkeypatch.setattr(busqueda, "TAMANO_LOTE", request.param)
+
+
+@pytest.mark.parametrize("semilla", range(100))
+def test_mismo_top_que_la_busqueda_directa(tamano_lote, semilla):
+    rng = random.Random(semilla)
+    grupos_input = grupos_al_azar(rng)
+    pesos = pesos_al_azar(rng)
+    config_dias = config_dias_al_azar(rng)
+    w_dias = rng.choice((0, 10, 35, 80))
+    top_k = rng.choice((1, 3, 10))
+
+    mejores, stats = buscar_mejores_horarios(grupos_input, pesos, top_k=top_k, config_dias=config_dias, w_dias=w_dias)
+
+    assert stats["completa"]
+    assert_mismo_top(mejores, top_directo(grupos_input, pesos, top_k, config_dias, w_dias))
+
+
+def test_lotes_chicos_si_podan_por_cota(monkeypatch):
+    monkeypatch.setattr(busqueda, "TAMANO_LOTE", 1)
+    rng = random.Random("poda")
+    grupos_input = grupos_al_azar(rng, n_materias=5, max_grupos=6, fraccion_irregular=0.0)
+    pesos = pesos_al_azar(rng)
+
+    _, stats = buscar_mejores_horarios(grupos_input, pesos, top_k=3)
+
+    assert stats["podas_cota"] > 0
+
+
+@pytest.mark.parametrize("semilla", range(30))
+def test_pesos_negativos_sin_cota(tamano_lote, semilla):
+    rng = random.Random(f"negativos-{semilla}")
+    grupos_input = grupos_al_azar(rng)
+    pesos = pesos_al_azar(rng, negativos=True)
+    config_dias = config_dias_al_azar(rng)
+
+    mejores, _ = buscar_mejores_horarios(grupos_input, pesos, top_k=10, config_dias=config_dias)
+
+    assert_mismo_top(mejores, top_directo(grupos_input, pesos, 10, config_dias))
+
+
+def test_todas_opcionales_y_sin_grupos_reales():
+    rng = random.Random("opcionales")
+    grupos_input = grupos_al_azar(rng, n_materias=4, fraccion_opcional=1.0)
+    pesos = pesos_al_azar(rng)
+
+    mejores, _ = buscar_mejores_horarios(grupos_input, pesos, top_k=50)
+
+    # Con k grande entra también la de no inscribir nada (score -1000)
+    assert_mismo_top(mejores, top_directo(grupos_input, pesos, 50))
+
+
+@pytest.mark.parametrize("semilla", range(8))
+def test_paralelo_mismo_top(monkeypatch, semilla):
+    # Como con HORARIOS_PROCESOS=3, aunque la máquina tenga un solo núcleo
+    monkeypatch.setattr(busqueda, "MAX_PROCESOS_BUSQUEDA", 3)
+    rng = random.Random(f"paralelo-{semilla}")
+    grupos_input = grupos_al_azar(rng, n_materias=rng.randint(2, 5))
+    pesos = pesos_al_azar(rng)
+    config_dias = config_dias_al_azar(rng)
+
+    mejores, stats = buscar_mejores_horarios_paralelo(
+        grupos_input, pesos, top_k=10, config_dias=config_dias, n_procesos=3
+    )
+
+    assert busqueda._pool is not None
+    assert stats["completa"]
+    assert_mismo_top(mejores, top_directo(grupos_input, pesos, 10, config_dias))
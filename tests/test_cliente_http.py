@@ -0,0 +1,132 @@
+"""
+ClienteHTTP contra un servidor HTTP local (http.server en un hilo).
+"""
+import http.server
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from horarios_fi.cliente_http import ClienteHTTP
+
+
+class ServidorStub(http.server.BaseHTTPRequestHandler):
+    """
+    Responde según la ruta:
+    - /fallas/<estado>/<n>: las primeras n peticiones regresan <estado>, luego 200.
+    - /siempre/<estado>: siempre <estado>.
+    - /lento/<segundos>: tarda eso antes de responder 200.
+    - /etag: 200 con ETag; 304 si el cliente manda If-None-Match con ese ETag.
+    """
+    protocol_version = "HTTP/1.1"
+    peticiones = []
+    fallas = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, estado, cuerpo=b"", headers=None):
+        self.send_response(estado)
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        self.peticiones.append((self.path, dict(self.headers)))
+        partes = self.path.strip("/").split("/")
+
+        if partes[0] == "fallas":
+            estado, n = int(partes[1]), int(partes[2])
+            if self.fallas.get(self.path, 0) < n:
+                self.fallas[self.path] = self.fallas.get(self.path, 0) + 1
+                return self._responder(estado)
+            return self._responder(200, b"por fin")
+        if partes[0] == "siempre":
+            return self._responder(int(partes[1]))
+        if partes[0] == "lento":
+            time.sleep(float(partes[1]))
+            return self._responder(200, b"tarde")
+        if partes[0] == "etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._responder(304)
+            return self._responder(200, "versión 1".encode("utf-8"), {"ETag": '"v1"'})
+        return self._responder(404)
+
+
+@pytest.fixture
+def servidor():
+    ServidorStub.peticiones = []
+    ServidorStub.fallas = {}
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ServidorStub)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def cliente():
+    # Esperas cortas para que las pruebas no tarden
+    return ClienteHTTP(reintentos=2, espera_base=0.01, espera_max=0.02)
+
+
+@pytest.mark.parametrize("estado", [503, 429])
+def test_reintenta_estados_reintentables(servidor, cliente, estado):
+    respuesta = cliente.get(f"{servidor}/fallas/{estado}/2")
+    assert respuesta.status_code == 200
+    assert respuesta.text == "por fin"
+    assert len(ServidorStub.peticiones) == 3
+
+
+def test_no_reintenta_404(servidor, cliente):
+    respuesta = cliente.get(f"{servidor}/no-existe")
+    assert respuesta.status_code == 404
+    assert len(ServidorStub.peticiones) == 1
+
+
+def test_regresa_el_ultimo_estado_al_acabarse_los_reintentos(servidor, cliente):
+    respuesta = cliente.get(f"{servidor}/siempre/503")
+    assert respuesta.status_code == 503
+    assert len(ServidorStub.peticiones) == cliente.reintentos + 1
+
+
+def test_304_sirve_el_cuerpo_guardado(servidor, cliente):
+    primera = cliente.get(f"{servidor}/etag")
+    assert primera.status_code == 200
+    assert not primera.desde_cache
+
+    segunda = cliente.get(f"{servidor}/etag")
+    assert segunda.status_code == 200
+    assert segunda.desde_cache
+    assert segunda.text == "versión 1"
+    assert ServidorStub.peticiones[1][1].get("If-None-Match") == '"v1"'
+
+
+def test_sin_condicional_no_manda_validadores(servidor, cliente):
+    cliente.get(f"{servidor}/etag")
+    respuesta = cliente.get(f"{servidor}/etag", condicional=False)
+    assert not respuesta.desde_cache
+    assert "If-None-Match" not in ServidorStub.peticiones[1][1]
+
+
+def test_lanza_error_de_conexion_al_acabarse_los_reintentos(cliente):
+    # Un puerto sin nadie escuchando: se niega la conexión en cada intento
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cliente.get(f"http://127.0.0.1:{puerto}/x", timeout=2)
+
+
+def test_timeout_respeta_el_limite_total(servidor, cliente):
+    inicio = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        cliente.get(f"{servidor}/lento/2", timeout=0.6, limite_total=1.0)
+    # Sin el límite total serían 3 intentos de 0.6 s
+    assert time.monotonic() - inicio < 1.6
+    assert len(ServidorStub.peticiones) <= 2
@@ -0,0 +1,238 @@
+"""
+EspacioCombinaciones al prender y apagar grupos (actualizar) contra construirlo de nuevo,
+y la búsqueda directa cuando el espacio no cabe en memoria.
+"""
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from horarios_fi.busqueda import buscar_mejores_horarios
+from horarios_fi.espacio import EspacioCombinaciones
+from horarios_fi.puntaje import grupo_no_inscribir
+
+from azar import config_dias_al_azar, grupos_al_azar, pesos_al_azar, top_directo
+
+
+def materias_al_azar(rng, n_materias=None, max_grupos=6):
+    """materias_db como la de la app: todos los grupos (con activo) y si la materia es obligatoria."""
+    materias = []
+    for grupos in grupos_al_azar(rng, n_materias, max_grupos, fraccion_irregular=0.0, fraccion_opcional=0.0):
+        materias.append({
+            "materia": grupos[0]["materia_nombre"],
+            "obligatoria": rng.random() >= 0.3,
+            "grupos": grupos,
+        })
+    return materias
+
+
+def grupos_activos(materias):
+    """El grupos_input que arma la app: solo grupos activos, N/A al final de las opcionales."""
+    grupos_input = []
+    for m in materias:
+        grupos = [g for g in m["grupos"] if g.get("activo", True)]
+        if grupos:
+            if not m["obligatoria"]:
+                grupos = grupos + [grupo_no_inscribir(m["materia"])]
+            grupos_input.append(grupos)
+    return grupos_input
+
+
+def prender_o_apagar(rng, materias, n_cambios):
+    """Cambia activo en n_cambios grupos al azar sin dejar ninguna materia sin grupos (no cambian las materias)."""
+    for _ in range(n_cambios):
+        m = rng.choice(materias)
+        g = rng.choice(m["grupos"])
+        if g["activo"] and sum(otro["activo"] for otro in m["grupos"]) == 1:
+            continue
+        g["activo"] = not g["activo"]
+
+
+def assert_igual_a_construirlo_de_nuevo(espacio, grupos_input, rng):
+    nuevo = EspacioCombinaciones.construir(grupos_input)
+    assert nuevo is not None
+    assert np.array_equal(espacio.ids, nuevo.ids)
+    assert espacio.feat.keys() == nuevo.feat.keys()
+    for llave in nuevo.feat:
+        assert np.array_equal(espacio.feat[llave], nuevo.feat[llave]), llave
+    assert espacio.califs == nuevo.califs
+    assert espacio.firma == nuevo.firma
+
+    pesos = pesos_al_azar(rng)
+    config_dias = config_dias_al_azar(rng)
+    top_k = rng.choice((1, 5, 20))
+    mejores = espacio.mejores(pesos, top_k, config_dias, grupos_input=grupos_input)
+    assert mejores == nuevo.mejores(pesos, top_k, config_dias, grupos_input=grupos_input)
+    # Y las dos igual que revisar todo con itertools.product (la posición es entre las válidas, no el idx)
+    directo = top_directo(grupos_input, pesos, top_k, config_dias)
+    assert [comb for _, _, comb in mejores] == [list(comb) for _, _, comb in directo]
+    assert [sc for sc, _, _ in mejores] == pytest.approx([sc for sc, _, _ in directo])
+
+
+@pytest.mark.parametrize("semilla", range(40))
+def test_prender_y_apagar_grupos_da_lo_mismo_que_construir(semilla):
+    rng = random.Random(f"toggle-{semilla}")
+    materias = materias_al_azar(rng)
+    for m in materias:
+        for g in m["grupos"]:
+            g["activo"] = rng.random() < 0.7
+        m["grupos"][0]["activo"] = True
+    espacio = EspacioCombinaciones.construir(grupos_activos(materias))
+
+    for _ in range(8):
+        prender_o_apagar(rng, materias, rng.randint(1, 3))
+        grupos_input = grupos_activos(materias)
+
+        assert espacio.actualizar(grupos_input)
+        assert_igual_a_construirlo_de_nuevo(espacio, grupos_input, rng)
+
+
+@pytest.mark.parametrize("semilla", range(10))
+def test_cambiar_calificaciones_despues_de_actualizar(semilla):
+    # Como en la app: actualizar y luego sincronizar_califs en el mismo rerun
+    rng = random.Random(f"califs-{semilla}")
+    materias = materias_al_azar(rng, n_materias=3)
+    espacio = EspacioCombinaciones.construir(grupos_activos(materias))
+
+    for _ in range(5):
+        prender_o_apagar(rng, materias, 1)
+        g = rng.choice(rng.choice(materias)["grupos"])
+        g["calificacion"] = rng.choice((0, 6, 8.5, 10))
+        grupos_input = grupos_activos(materias)
+
+        assert espacio.actualizar(grupos_input)
+        espacio.sincronizar_califs(grupos_input)
+        assert_igual_a_construirlo_de_nuevo(espacio, grupos_input, rng)
+
+
+@pytest.mark.parametrize("semilla", range(15))
+@pytest.mark.parametrize("cambio", ["solo-apagar", "solo-prender", "los-dos"])
+def test_filtrar_y_extender(semilla, cambio):
+    rng = random.Random(f"{cambio}-{semilla}")
+    materias = materias_al_azar(rng, n_materias=rng.randint(2, 4))
+    todos = grupos_activos(materias)
+    if cambio == "solo-prender":
+        # Empieza con pocos grupos y se prenden los demás
+        for m in materias:
+            for g in m["grupos"][1:]:
+                g["activo"] = rng.random() < 0.3
+    antes = grupos_activos(materias)
+    espacio = EspacioCombinaciones.construir(antes)
+
+    for m in materias:
+        for g in m["grupos"][1:]:
+            if cambio == "solo-apagar":
+                g["activo"] = rng.random() < 0.5
+            elif cambio == "solo-prender":
+                g["activo"] = True
+            else:
+                g["activo"] = not g["activo"] if rng.random() < 0.5 else g["activo"]
+    despues = grupos_activos(materias)
+
+    assert espacio.actualizar(despues)
+    assert_igual_a_construirlo_de_nuevo(espacio, despues, rng)
+    if cambio == "solo-apagar":
+        assert len(espacio) <= len(EspacioCombinaciones.construir(antes))
+    if cambio == "solo-prender":
+        assert despues == todos
+
+
+def test_volver_opcional_una_materia_agrega_no_inscribir():
+    rng = random.Random("opcional")
+    materias = materias_al_azar(rng, n_materias=3)
+    for m in materias:
+        m["obligatoria"] = True
+    espacio = EspacioCombinaciones.construir(grupos_activos(materias))
+
+    materias[1]["obligatoria"] = False
+    grupos_input = grupos_activos(materias)
+    assert espacio.actualizar(grupos_input)
+    assert_igual_a_construirlo_de_nuevo(espacio, grupos_input, rng)
+
+    materias[1]["obligatoria"] = True
+    grupos_input = grupos_activos(materias)
+    assert espacio.actualizar(grupos_input)
+    assert_igual_a_construirlo_de_nuevo(espacio, grupos_input, rng)
+
+
+@pytest.mark.parametrize("cambio", ["materia-nueva", "materia-quitada", "materia-sin-grupos", "otro-orden"])
+def test_si_cambian_las_materias_hay_que_construirlo_de_nuevo(cambio):
+    rng = random.Random(cambio)
+    materias = materias_al_azar(rng, n_materias=3, max_grupos=4)
+    for m in materias:
+        m["obligatoria"] = True
+        for g in m["grupos"]:
+            g["activo"] = True
+    espacio = EspacioCombinaciones.construir(grupos_activos(materias))
+
+    if cambio == "materia-nueva":
+        materias.append(materias_al_azar(random.Random("otra"), n_materias=1)[0])
+        materias[-1]["materia"] = materias[-1]["grupos"][0]["materia_nombre"] = "9999 - OTRA"
+        for g in materias[-1]["grupos"]:
+            g["materia_nombre"] = "9999 - OTRA"
+    elif cambio == "materia-quitada":
+        materias.pop(1)
+    elif cambio == "materia-sin-grupos":
+        for g in materias[1]["grupos"]:
+            g["activo"] = False
+    else:
+        materias[0], materias[1] = materias[1], materias[0]
+    grupos_input = grupos_activos(materias)
+
+    assert not espacio.actualizar(grupos_input)
+
+
+def test_grupo_nuevo_sin_mascara_hay_que_construirlo_de_nuevo():
+    rng = random.Random("sin-mascara")
+    materias = materias_al_azar(rng, n_materias=2, max_grupos=3)
+    nuevo = copy.deepcopy(materias[0]["grupos"][0])
+    nuevo["gpo"] = "99"
+    nuevo["intervalos"] = [{"dia": "Lunes", "inicio": 7 * 60 + 5, "fin": 8 * 60 + 40}]
+    nuevo["mascara"] = None
+    nuevo["activo"] = False
+    materias[0]["grupos"].append(nuevo)
+    espacio = EspacioCombinaciones.construir(grupos_activos(materias))
+
+    nuevo["activo"] = True
+    assert not espacio.actualizar(grupos_activos(materias))
+
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_si_no_cabe_se_usa_el_branch_and_bound(semilla):
+    # El camino de calcular_top_horarios con un límite chico en lugar de MAX_COMBINACIONES_EN_MEMORIA
+    rng = random.Random(f"limite-{semilla}")
+    materias = materias_al_azar(rng, n_materias=4, max_grupos=6)
+    for m in materias:
+        for g in m["grupos"][1:]:
+            g["activo"] = False
+    espacio = EspacioCombinaciones.construir(grupos_activos(materias))
+
+    for m in materias:
+        for g in m["grupos"]:
+            g["activo"] = True
+    grupos_input = grupos_activos(materias)
+    total = len(EspacioCombinaciones.construir(grupos_input))
+    limite = total // 2
+    pesos = pesos_al_azar(rng)
+    config_dias = config_dias_al_azar(rng)
+
+    # actualizar avisa que no cabe y construir tampoco arma uno: queda el branch and bound
+    assert not espacio.actualizar(grupos_input, limite=limite)
+    assert EspacioCombinaciones.construir(grupos_input, limite=limite) is None
+    esperado = top_directo(grupos_input, pesos, 10, config_dias)
+    mejores, stats = buscar_mejores_horarios(grupos_input, pesos, top_k=10, config_dias=config_dias)
+    assert stats["completa"]
+    assert [(idx, comb) for _, idx, comb in mejores] == [(idx, comb) for _, idx, comb in esperado]
+    assert [sc for sc, _, _ in mejores] == pytest.approx([sc for sc, _, _ in esperado])
+
+
+def test_construir_con_mas_combinaciones_que_el_limite():
+    rng = random.Random("no-cabe")
+    grupos_input = grupos_activos(materias_al_azar(rng, n_materias=4, max_grupos=6))
+    total = len(EspacioCombinaciones.construir(grupos_input))
+
+    assert EspacioCombinaciones.construir(grupos_input, limite=total - 1) is None
+    # Las parciales (primeras materias) también cuentan contra el límite: con el producto siempre cabe
+    producto = int(np.prod([len(grupos) for grupos in grupos_input]))
+    assert len(EspacioCombinaciones.construir(grupos_input, limite=producto)) == total
@@ -0,0 +1,425 @@
+"""
+CacheMaterias con un reloj falso y descargas falsas, Refrescar Cupos con un cliente HTTP
+falso que sirve la página de tests/fixtures/ssa (sin red) y CatalogoMaterias con su archivo en disco.
+"""
+import json
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+from horarios_fi.cliente_http import RespuestaHTTP
+from horarios_fi.materias import (
+    REINTENTO_CATALOGO_SEGUNDOS, TTL_VACANTES_REFRESCO, CacheMaterias, CatalogoMaterias, aplicar_vacantes,
+    claves_para_refrescar
+)
+from horarios_fi.ssa import descargar_grupos
+
+PAGINA_1120 = (Path(__file__).parent / "fixtures" / "ssa" / "1120.html").read_text(encoding="utf-8")
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class Descargas:
+    """descargar(clave) que regresa lo que diga respuestas[clave] (o lanza si es una excepción)."""
+
+    def __init__(self, **respuestas):
+        self.respuestas = respuestas
+        self.llamadas = []
+
+    def __call__(self, clave):
+        self.llamadas.append(clave)
+        respuesta = self.respuestas[clave]
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+
+def grupos(vacantes):
+    return [{"gpo": "1", "vacantes": vacantes, "materia_nombre": "1120 - MATERIA DESCONOCIDA"}]
+
+
+@pytest.fixture
+def reloj():
+    return Reloj()
+
+
+@pytest.fixture
+def cache(reloj):
+    return CacheMaterias(ttl_estatico=600, ttl_vacantes=60, reloj=reloj)
+
+
+def test_sirve_del_cache_hasta_que_vencen_las_vacantes(cache, reloj):
+    descargar = Descargas(c1120=grupos(5))
+    assert cache.obtener("c1120", descargar) == grupos(5)
+
+    reloj.ahora += 59
+    descargar.respuestas["c1120"] = grupos(4)
+    assert cache.obtener("c1120", descargar) == grupos(5)
+    assert len(descargar.llamadas) == 1
+
+    reloj.ahora += 1
+    assert cache.obtener("c1120", descargar) == grupos(4)
+    assert len(descargar.llamadas) == 2
+
+
+def test_ttl_vacantes_cero_siempre_descarga(cache):
+    descargar = Descargas(c1120=grupos(5))
+    cache.obtener("c1120", descargar)
+    descargar.respuestas["c1120"] = grupos(0)
+
+    assert cache.obtener("c1120", descargar, ttl_vacantes=0) == grupos(0)
+    assert len(descargar.llamadas) == 2
+
+
+@pytest.mark.parametrize("falla", [None, ConnectionError("sin red")], ids=["no-200", "error-de-red"])
+def test_si_falla_sirve_la_entrada_vieja_mientras_no_venza_lo_fijo(cache, reloj, falla):
+    descargar = Descargas(c1120=grupos(5))
+    cache.obtener("c1120", descargar)
+
+    descargar.respuestas["c1120"] = falla
+    reloj.ahora += 599
+    assert cache.obtener("c1120", descargar) == grupos(5)
+
+    reloj.ahora += 1
+    if falla is None:
+        assert cache.obtener("c1120", descargar) is None
+    else:
+        with pytest.raises(ConnectionError):
+            cache.obtener("c1120", descargar)
+    assert len(descargar.llamadas) == 3
+
+
+def test_sin_entrada_vieja_la_falla_pasa_tal_cual(cache):
+    assert cache.obtener("c1120", Descargas(c1120=None)) is None
+    with pytest.raises(TimeoutError):
+        cache.obtener("c1120", Descargas(c1120=TimeoutError()))
+
+
+def test_materia_sin_grupos_no_se_guarda(cache):
+    descargar = Descargas(c1120=[])
+    assert cache.obtener("c1120", descargar) == []
+    assert cache.obtener("c1120", descargar) == []
+    assert len(descargar.llamadas) == 2
+
+
+def test_cada_llamada_regresa_una_copia_con_el_nombre_de_quien_pide(cache):
+    descargar = Descargas(c1120=grupos(5))
+    primera = cache.obtener("c1120", descargar, nombre_materia="1120 - CALCULO")
+    primera[0]["activo"] = False
+
+    segunda = cache.obtener("c1120", descargar)
+    assert "activo" not in segunda[0]
+    assert primera[0]["materia_nombre"] == "1120 - CALCULO"
+    assert segunda[0]["materia_nombre"] == "1120 - MATERIA DESCONOCIDA"
+
+
+def test_la_misma_clave_se_descarga_una_sola_vez_a_la_vez(cache):
+    empezo = threading.Event()
+    seguir = threading.Event()
+    llamadas = []
+
+    def descargar(clave):
+        llamadas.append(clave)
+        empezo.set()
+        assert seguir.wait(5)
+        return grupos(5)
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener("c1120", descargar))) for _ in range(4)]
+    hilos[0].start()
+    assert empezo.wait(5)
+    for hilo in hilos[1:]:
+        hilo.start()
+    seguir.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert llamadas == ["c1120"]
+    assert resultados == [grupos(5)] * 4
+
+
+def test_claves_distintas_no_se_esperan(cache):
+    adentro = threading.Barrier(2, timeout=5)
+
+    def descargar(clave):
+        # Si el lock fuera uno solo para todas las claves, la barrera nunca se completaría
+        adentro.wait()
+        return grupos(5)
+
+    hilos = [threading.Thread(target=cache.obtener, args=(clave, descargar)) for clave in ("c1120", "c1601")]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(5)
+    assert not adentro.broken
+
+
+class ClienteStub:
+    """Lo que usa descargar_grupos de ClienteHTTP: get(url, timeout) con la página que tenga paginas[clave]."""
+
+    def __init__(self, **paginas):
+        self.paginas = paginas
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        clave = url.rsplit("/", 1)[-1].removesuffix(".html")
+        if clave not in self.paginas:
+            return RespuestaHTTP(404, "")
+        return RespuestaHTTP(200, self.paginas[clave])
+
+
+def pagina_con_vacantes(vacantes_por_gpo, quitar=()):
+    """1120.html con otras vacantes (las de la página son 12, 0, 25, 3, 8) y sin los grupos de quitar."""
+    filas = PAGINA_1120.split("<tr>")
+    nuevas = [filas[0]]
+    for fila in filas[1:]:
+        celdas = fila.split("<td>")
+        gpo = celdas[2].split("</td>")[0].strip() if len(celdas) > 8 else None
+        if gpo in quitar:
+            continue
+        if gpo in vacantes_por_gpo:
+            resto = celdas[-1].split("</td>", 1)[1]
+            celdas[-1] = f"{vacantes_por_gpo[gpo]}</td>{resto}"
+        nuevas.append("<td>".join(celdas))
+    return "<tr>".join(nuevas)
+
+
+def obtener_materias(cache, cliente, claves, ttl_vacantes):
+    """[(resultado, error)] como los regresa obtener_varias_materias en la app."""
+    descargas = []
+    for clave in claves:
+        nombre = f"{clave} - MATERIA"
+        try:
+            grupos = cache.obtener(
+                clave, lambda c: descargar_grupos(cliente, c, nombre), ttl_vacantes=ttl_vacantes, nombre_materia=nombre
+            )
+        except Exception as e:
+            descargas.append(([], f"Error técnico: {e}"))
+            continue
+        descargas.append(([{"materia": nombre, "grupos": grupos}] if grupos else grupos, None))
+    return descargas
+
+
+@pytest.mark.parametrize("desactivar_llenos", [False, True])
+def test_refrescar_cupos_regresa_el_diff_con_vacantes_en_vivo(desactivar_llenos):
+    cache = CacheMaterias()
+    cliente = ClienteStub(**{"1120": PAGINA_1120})
+    (resultado, _), = obtener_materias(cache, cliente, ["1120"], ttl_vacantes=None)
+    materias_db = [
+        {"materia": "Comida", "es_bloqueo": True, "grupos": [{"gpo": "Único", "vacantes": 999}]},
+        resultado[0],
+        {"materia": "9999 - YA NO EXISTE", "grupos": [{"gpo": "1", "vacantes": 3}]},
+    ]
+
+    # Al momento: el grupo 1 se llenó, el 3 perdió lugares, el 2 se abrió y el 5 ya no aparece
+    cliente.paginas["1120"] = pagina_con_vacantes({"1": 0, "2": 4, "3": 20}, quitar=("5",))
+    pendientes = claves_para_refrescar(materias_db)
+    assert pendientes == [(1, "1120"), (2, "9999")]
+
+    # Con el TTL normal el caché todavía tendría las vacantes de la primera descarga
+    assert obtener_materias(cache, cliente, ["1120"], ttl_vacantes=None)[0][0][0]["grupos"][0]["vacantes"] == 12
+
+    descargas = obtener_materias(cache, cliente, [clave for _, clave in pendientes], TTL_VACANTES_REFRESCO)
+    diff = aplicar_vacantes(materias_db, pendientes, descargas, desactivar_llenos=desactivar_llenos)
+
+    assert diff == {
+        "actualizados": 4,
+        "cambiados": [("1120 - MATERIA", "1", 12, 0), ("1120 - MATERIA", "2", 0, 4), ("1120 - MATERIA", "3", 25, 20)],
+        "llenos": [("1120 - MATERIA", "1")],
+        "desaparecidos": [("1120 - MATERIA", "5")],
+        "errores": ["9999: No encontrada"],
+        "desactivados": [(1, 0)] if desactivar_llenos else [],
+    }
+    grupos = materias_db[1]["grupos"]
+    assert [g["vacantes"] for g in grupos] == [0, 4, 20, 3, 8]
+    assert grupos[0]["activo"] is not desactivar_llenos
+    assert materias_db[0]["grupos"][0]["vacantes"] == 999
+
+
+def test_refrescar_cupos_reporta_errores_de_red():
+    materias_db = [{"materia": "1120 - MATERIA", "grupos": [{"gpo": "1", "vacantes": 3}]}]
+
+    class SinRed(ClienteStub):
+        def get(self, url, timeout=None):
+            raise ConnectionError("sin red")
+
+    pendientes = claves_para_refrescar(materias_db)
+    descargas = obtener_materias(CacheMaterias(), SinRed(), ["1120"], TTL_VACANTES_REFRESCO)
+    diff = aplicar_vacantes(materias_db, pendientes, descargas)
+
+    assert diff["errores"] == ["1120: Error técnico: sin red"]
+    assert diff["actualizados"] == 0
+    assert materias_db[0]["grupos"][0]["vacantes"] == 3
+
+
+CATALOGO = {"1120": "CALCULO DIFERENCIAL", "1601": "FISICA"}
+
+
+def esperar_descarga(catalogo):
+    catalogo._hilo.join(5)
+    assert not catalogo.cargando()
+
+
+class DescargaPausada:
+    """descargar() del catálogo que no regresa hasta que se llame seguir()."""
+
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.empezo = threading.Event()
+        self._seguir = threading.Event()
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        self.empezo.set()
+        assert self._seguir.wait(5)
+        if isinstance(self.respuesta, Exception):
+            raise self.respuesta
+        return self.respuesta
+
+    def seguir(self):
+        self._seguir.set()
+
+
+@pytest.fixture
+def ruta_catalogo(tmp_path):
+    return tmp_path / "catalogo.json"
+
+
+def test_catalogo_descarga_y_guarda_en_disco(ruta_catalogo):
+    catalogo = CatalogoMaterias(lambda: dict(CATALOGO), ruta=str(ruta_catalogo))
+    esperar_descarga(catalogo)
+
+    assert catalogo.nombres() == CATALOGO
+    assert catalogo.error is None
+    assert json.loads(ruta_catalogo.read_text(encoding="utf-8")) == CATALOGO
+
+
+@pytest.mark.parametrize("falla, error", [
+    (requests.exceptions.Timeout(), "tardó demasiado"),
+    (ConnectionError("sin red"), "sin red"),
+    ({}, "no regresó el catálogo"),
+], ids=["timeout", "error-de-red", "vacio"])
+def test_catalogo_si_falla_la_descarga_usa_el_disco(ruta_catalogo, falla, error):
+    ruta_catalogo.write_text(json.dumps(CATALOGO), encoding="utf-8")
+
+    def descargar():
+        if isinstance(falla, Exception):
+            raise falla
+        return falla
+
+    catalogo = CatalogoMaterias(descargar, ruta=str(ruta_catalogo))
+    esperar_descarga(catalogo)
+
+    assert error in catalogo.error
+    assert catalogo.nombres() == CATALOGO
+    assert catalogo.nombre("1601") == "FISICA"
+    # La copia buena no se pisa
+    assert json.loads(ruta_catalogo.read_text(encoding="utf-8")) == CATALOGO
+
+
+@pytest.mark.parametrize("contenido", ["no es json", "[1, 2]"], ids=["roto", "lista"])
+def test_catalogo_con_archivo_invalido_y_sin_red(ruta_catalogo, contenido):
+    ruta_catalogo.write_text(contenido, encoding="utf-8")
+
+    def descargar():
+        raise ConnectionError("sin red")
+
+    catalogo = CatalogoMaterias(descargar, ruta=str(ruta_catalogo))
+    esperar_descarga(catalogo)
+
+    assert catalogo.nombres() == {}
+    assert catalogo.nombre("1120") is None
+    assert catalogo.error
+
+
+def test_catalogo_mientras_baja_sirve_la_copia_del_disco(ruta_catalogo):
+    ruta_catalogo.write_text(json.dumps({"1120": "CALCULO (VIEJO)"}), encoding="utf-8")
+    descargar = DescargaPausada(dict(CATALOGO))
+    catalogo = CatalogoMaterias(descargar, ruta=str(ruta_catalogo))
+    assert descargar.empezo.wait(5)
+
+    assert catalogo.cargando()
+    assert catalogo.nombres() == {"1120": "CALCULO (VIEJO)"}
+    assert catalogo.nombre("1120") == "CALCULO (VIEJO)"
+    # Sin esperar: la clave que no está en el disco regresa None de inmediato
+    assert catalogo.nombre("1601") is None
+
+    descargar.seguir()
+    esperar_descarga(catalogo)
+    assert catalogo.nombres() == CATALOGO
+    assert descargar.llamadas == 1
+
+
+def test_catalogo_quien_espera_recibe_el_nombre_al_terminar_la_descarga():
+    descargar = DescargaPausada(dict(CATALOGO))
+    catalogo = CatalogoMaterias(descargar)
+    assert descargar.empezo.wait(5)
+
+    threading.Timer(0.05, descargar.seguir).start()
+    assert catalogo.nombre("1601", esperar=5) == "FISICA"
+
+
+def test_catalogo_la_espera_tiene_limite():
+    descargar = DescargaPausada(dict(CATALOGO))
+    catalogo = CatalogoMaterias(descargar)
+    assert descargar.empezo.wait(5)
+
+    assert catalogo.nombres(esperar=0.01) == {}
+    assert catalogo.nombre("1120", esperar=0.01) is None
+    assert catalogo.cargando()
+
+    descargar.seguir()
+    esperar_descarga(catalogo)
+
+
+def test_catalogo_vuelve_a_bajar_al_vencer(reloj):
+    descargas = []
+
+    def descargar():
+        descargas.append(reloj.ahora)
+        return dict(CATALOGO)
+
+    catalogo = CatalogoMaterias(descargar, ttl=100, reloj=reloj)
+    esperar_descarga(catalogo)
+
+    reloj.ahora += 99
+    catalogo.nombres()
+    esperar_descarga(catalogo)
+    assert len(descargas) == 1
+
+    reloj.ahora += 1
+    assert catalogo.nombre("1120") == "CALCULO DIFERENCIAL"
+    esperar_descarga(catalogo)
+    assert len(descargas) == 2
+
+
+def test_catalogo_si_fallo_reintenta_despues_de_un_rato(reloj):
+    respuestas = [ConnectionError("sin red"), dict(CATALOGO)]
+
+    def descargar():
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    catalogo = CatalogoMaterias(descargar, ttl=10_000, reloj=reloj)
+    esperar_descarga(catalogo)
+    assert catalogo.nombres() == {}
+    esperar_descarga(catalogo)
+    assert len(respuestas) == 1
+
+    reloj.ahora += REINTENTO_CATALOGO_SEGUNDOS
+    catalogo.nombres()
+    esperar_descarga(catalogo)
+    assert catalogo.nombres() == CATALOGO
+    assert catalogo.error is None
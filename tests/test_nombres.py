@@ -0,0 +1,127 @@
+"""
+Comparación de nombres de profesores (IndiceNombres, mejor_coincidencia) con nombres como
+vienen del SSA, del Excel del alumno y de IngenieriaTracker.
+"""
+import random
+
+import pytest
+
+from horarios_fi.nombres import IndiceNombres, limpiar_nombre_profesor, mejor_coincidencia, tokens_nombre
+
+
+def coincidencia_por_subcadena(nombre, candidatos):
+    """Lo que hacía la importación de calificaciones antes: igual, o uno contenido en el otro."""
+    if nombre in candidatos:
+        return candidatos.index(nombre)
+    for pos, candidato in enumerate(candidatos):
+        if candidato in nombre or nombre in candidato:
+            return pos
+    return None
+
+
+@pytest.mark.parametrize("nombre, limpio", [
+    ("ING. JOSE SALINAS", "JOSE SALINAS"),
+    ("M.I. JOSÉ SALINAS", "JOSE SALINAS"),
+    ("M. EN I. MARÍA LÓPEZ", "MARIA LOPEZ"),
+    ("DRA. ANA  PÉREZ (PRESENCIAL)", "ANA PEREZ"),
+    ("SALINAS\nTELESFORO  J.", "SALINAS TELESFORO J"),
+    ("", ""),
+    (None, ""),
+])
+def test_limpiar_nombre_profesor(nombre, limpio):
+    assert limpiar_nombre_profesor(nombre) == limpio
+
+
+def test_tokens_expanden_abreviaturas():
+    assert tokens_nombre("MA. GPE. FCO. RUIZ") == ("MARIA", "GUADALUPE", "FRANCISCO", "RUIZ")
+
+
+@pytest.mark.parametrize("nombre, candidatos, esperado", [
+    # Títulos y abreviaturas
+    ("ING. JOSE SALINAS", ["PEDRO RUIZ", "JOSE SALINAS"], 1),
+    ("M.I. JOSE SALINAS TELESFORO", ["SALINAS TELESFORO JOSE"], 0),
+    ("MA. GUADALUPE RUIZ", ["MARIA GUADALUPE RUIZ"], 0),
+    ("FCO. JAVIER LOPEZ", ["FRANCISCO JAVIER LOPEZ"], 0),
+    # Acentos
+    ("JOSÉ ÁNGEL NÚÑEZ", ["JOSE ANGEL NUNEZ"], 0),
+    ("JOSE ANGEL NUNEZ", ["JOSÉ ÁNGEL NÚÑEZ"], 0),
+    # Orden de las palabras (el Excel viene con apellidos primero)
+    ("JOSE SALINAS TELESFORO", ["TELESFORO SALINAS JOSE"], 0),
+    # Nombres parciales e iniciales
+    ("SALINAS TELESFORO", ["JOSE SALINAS TELESFORO"], 0),
+    ("J. SALINAS TELESFORO", ["JOSE SALINAS TELESFORO"], 0),
+    ("JOSE SALINAS TELESFORO", ["J SALINAS T"], 0),
+    ("SALINAS J", ["SALINAS TELESFORO JOSE"], 0),
+])
+def test_coinciden(nombre, candidatos, esperado):
+    assert mejor_coincidencia(nombre, candidatos) == esperado
+
+
+@pytest.mark.parametrize("nombre, candidatos", [
+    # Ningún token completo en común
+    ("JOSE SALINAS", ["PEDRO RUIZ"]),
+    # Solo iniciales: no alcanza
+    ("J S", ["JOSE SALINAS"]),
+    # Un apellido igual pero el otro no: otra persona
+    ("JOSE SALINAS", ["PEDRO SALINAS"]),
+    ("JOSE SALINAS TELESFORO", ["JOSE SALINAS MARTINEZ"]),
+    # La inicial no corresponde
+    ("P. SALINAS", ["JOSE SALINAS"]),
+    ("", ["JOSE SALINAS"]),
+    ("JOSE SALINAS", []),
+    ("JOSE SALINAS", [""]),
+])
+def test_no_coinciden(nombre, candidatos):
+    assert mejor_coincidencia(nombre, candidatos) is None
+
+
+def test_gana_el_que_comparte_mas_tokens_completos():
+    candidatos = ["J SALINAS", "SALINAS", "JOSE SALINAS TELESFORO", "JOSE SALINAS"]
+    assert mejor_coincidencia("JOSE SALINAS", candidatos) == 3
+    assert mejor_coincidencia("JOSE SALINAS TELESFORO", candidatos) == 2
+
+
+def test_empate_gana_el_primero():
+    assert mejor_coincidencia("SALINAS", ["JOSE SALINAS", "PEDRO SALINAS"]) == 0
+
+
+def test_buscar_varias_veces_en_el_mismo_indice():
+    indice = IndiceNombres(["SALINAS TELESFORO JOSE", "RUIZ LOPEZ MARIA", "PEREZ ANA"])
+    assert [indice.buscar(n) for n in ("M.I. JOSE SALINAS", "MA. RUIZ", "DRA. ANA PÉREZ", "PEDRO RUIZ")] == \
+        [0, 1, 2, None]
+
+
+@pytest.mark.parametrize("nombre, candidatos", [
+    ("JOSE SALINAS", ["PEDRO RUIZ", "JOSE SALINAS"]),
+    ("JOSE SALINAS TELESFORO", ["JOSE SALINAS"]),
+    ("JOSE SALINAS", ["JOSE SALINAS TELESFORO"]),
+    ("ANA PEREZ", ["MARIA LOPEZ", "PEDRO RUIZ"]),
+])
+def test_casos_donde_la_subcadena_ya_acertaba(nombre, candidatos):
+    assert mejor_coincidencia(nombre, candidatos) == coincidencia_por_subcadena(nombre, candidatos)
+
+
+NOMBRES = ["JOSE", "MARIA", "ANA", "PEDRO", "LUIS", "CARMEN", "JAVIER", "ROSA"]
+APELLIDOS = ["SALINAS", "LOPEZ", "RUIZ", "PEREZ", "GARCIA", "MARTINEZ", "TELESFORO", "NUNEZ", "HERRERA"]
+
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_misma_persona_con_el_nombre_completo_coincide_como_antes(semilla):
+    # Con el nombre completo igual (salvo título) la subcadena ya encontraba a la persona: se sigue encontrando
+    rng = random.Random(semilla)
+    personas = list({
+        f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}" for _ in range(15)
+    })
+    for pos, persona in enumerate(personas):
+        assert coincidencia_por_subcadena(persona, personas) == pos
+        assert mejor_coincidencia(persona, personas) == pos
+        assert mejor_coincidencia(f"ING. {persona}", personas) == pos
+
+
+def test_casos_donde_la_subcadena_fallaba():
+    # Acento, título y orden distinto: la subcadena no los encontraba
+    assert coincidencia_por_subcadena("M.I. JOSÉ SALINAS", ["SALINAS JOSE"]) is None
+    assert mejor_coincidencia("M.I. JOSÉ SALINAS", ["SALINAS JOSE"]) == 0
+    # Un nombre contenido en otro ("ANA" en "JULIANA") no es la misma persona
+    assert coincidencia_por_subcadena("ANA RUIZ", ["JULIANA RUIZ GARCIA"]) == 0
+    assert mejor_coincidencia("ANA RUIZ", ["JULIANA RUIZ GARCIA"]) is None
@@ -0,0 +1,94 @@
+"""
+Paridad del parser en streaming (backend "rapido") con BeautifulSoup (backend "bs4").
+
+Las páginas de tests/fixtures/ssa siguen el formato de las del SSA (una fila por grupo, con
+Clave, Gpo, Profesor, Tipo, Horario, Días, [Salón] y Vacantes); las irregular_*.html traen
+lo que obliga a usar BeautifulSoup.
+"""
+import random
+from pathlib import Path
+
+import pytest
+
+from horarios_fi.parser_ssa import filas_tablas, filas_tablas_bs4, filas_tablas_rapido
+from horarios_fi.ssa import grupos_desde_html
+
+CARPETA_FIXTURES = Path(__file__).parent / "fixtures" / "ssa"
+PAGINAS = sorted(CARPETA_FIXTURES.glob("*.html"))
+PAGINAS_IRREGULARES = [p for p in PAGINAS if p.name.startswith("irregular_")]
+PAGINAS_REGULARES = [p for p in PAGINAS if p not in PAGINAS_IRREGULARES]
+
+
+def leer(ruta):
+    return ruta.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("ruta", PAGINAS, ids=lambda p: p.stem)
+def test_grupos_iguales_con_ambos_backends(ruta):
+    html = leer(ruta)
+    nombre = f"{ruta.stem} - MATERIA"
+    rapido = grupos_desde_html(html, nombre, backend="rapido")
+    assert rapido
+    assert rapido == grupos_desde_html(html, nombre, backend="bs4")
+
+
+@pytest.mark.parametrize("ruta", PAGINAS_REGULARES, ids=lambda p: p.stem)
+def test_paginas_regulares_no_necesitan_bs4(ruta):
+    html = leer(ruta)
+    filas = filas_tablas_rapido(html)
+    assert filas is not None
+    assert filas == filas_tablas_bs4(html)
+
+
+@pytest.mark.parametrize("ruta", PAGINAS_IRREGULARES, ids=lambda p: p.stem)
+def test_paginas_irregulares_usan_bs4(ruta):
+    html = leer(ruta)
+    assert filas_tablas_rapido(html) is None
+    assert filas_tablas(html, backend="rapido") == filas_tablas_bs4(html)
+
+
+def test_entidades_y_texto_de_celdas():
+    grupos = grupos_desde_html(leer(CARPETA_FIXTURES / "1120.html"), "1120 - CALCULO")
+    por_gpo = {g["gpo"]: g for g in grupos}
+    assert por_gpo["1"]["profesor"] == "JUAN PÉREZ LÓPEZ"
+    assert por_gpo["2"]["modalidad"] == "PRESENCIAL"
+    assert por_gpo["3"]["salon"] == "SIN"
+    assert por_gpo["4"]["profesor"] == "ANA MUÑOZ & ASOCIADOS"
+    assert [g["vacantes"] for g in grupos] == [12, 0, 25, 3, 8]
+
+
+@pytest.mark.parametrize("fragmento_irregular", [
+    "<table><tr><td><table><tr><td>x</td></tr></table></td></tr></table>",
+    "<table><tr><td>a<td>b</tr></table>",
+    "<table><tr><td>a</td><tr><td>b</td></tr></table>",
+    "<table><tr><td>AT&T</td></tr></table>",
+    "<table><tr><td>&foo;</td></tr></table>",
+    "<table><tr><td>&#150;</td></tr></table>",
+    "<table><tr><td>&#12</td></tr></table>",
+    "<table><tr><td><script>x</script></td></tr></table>",
+])
+def test_fragmentos_irregulares_caen_a_bs4(fragmento_irregular):
+    assert filas_tablas_rapido(fragmento_irregular) is None
+    assert filas_tablas(fragmento_irregular) == filas_tablas_bs4(fragmento_irregular)
+
+
+FRAGMENTOS = [
+    "<table>", "</table>", "<tr>", "</tr>", "<td>", "</td>", "<th>", "</th>", "<br>", "<br/>", "</br>",
+    "<b>", "</b>", " x ", "\n", "&amp;", "&nbsp;", "&#233;", "&#x41;", "&eacute;", "AT&T", "&foo;",
+    "<!-- c -->", "<span>y</span>", "\xa0", "<td/>", "<p>", "</p>", "<TD>", "</TR>",
+    "<td colspan=2 class='a'>", "<img src=x>", "<div>", "</div>", "<!DOCTYPE html>", "é", "\t a b \r\n",
+]
+
+
+def test_paridad_con_fragmentos_al_azar():
+    rng = random.Random(0)
+    rapidos = 0
+    for _ in range(3000):
+        html = "".join(rng.choice(FRAGMENTOS) for _ in range(rng.randint(1, 40)))
+        filas = filas_tablas_rapido(html)
+        if filas is None:
+            continue
+        rapidos += 1
+        assert filas == filas_tablas_bs4(html), html
+    # Que el camino rápido sí se haya probado
+    assert rapidos > 300
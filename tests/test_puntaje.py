@@ -0,0 +1,95 @@
+"""
+Score por lotes con NumPy (puntuar_lote, penalizacion_lote) contra calcular_score y
+calcular_penalizacion_por_dia combinación por combinación.
+"""
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from horarios_fi.puntaje import (
+    calcular_penalizacion_por_dia, calcular_score, construir_tabla_features, es_combinacion_valida,
+    features_lote, penalizacion_features, penalizacion_lote, precalcular_conflictos, puntuar_lote
+)
+
+from azar import config_dias_al_azar, grupos_al_azar, pesos_al_azar
+
+
+def combinaciones_validas(grupos_input):
+    """(ids, combinación) de cada combinación sin traslapes, en orden de itertools.product."""
+    ids, conflictos = precalcular_conflictos(grupos_input)
+    planos = [g for grupos in grupos_input for g in grupos]
+    validas = []
+    for fila in itertools.product(*ids):
+        if es_combinacion_valida(fila, conflictos):
+            validas.append((list(fila), [planos[i] for i in fila]))
+    return validas
+
+
+def caso(semilla, fraccion_irregular):
+    rng = random.Random(f"{semilla}-{fraccion_irregular}")
+    grupos_input = grupos_al_azar(rng, fraccion_irregular=fraccion_irregular)
+    validas = combinaciones_validas(grupos_input)
+    return rng, grupos_input, validas
+
+
+@pytest.mark.parametrize("semilla", range(60))
+def test_lote_exacto_igual_bit_a_bit(semilla):
+    rng, grupos_input, validas = caso(semilla, 0.0)
+    tabla = construir_tabla_features(grupos_input)
+    assert tabla["exacta"]
+    if not validas:
+        return
+    ids_lote = np.array([fila for fila, _ in validas])
+
+    for _ in range(3):
+        pesos = pesos_al_azar(rng, negativos=rng.random() < 0.3)
+        config_dias = config_dias_al_azar(rng)
+        w_dias = rng.choice((0, 10, 35, 80))
+
+        assert puntuar_lote(ids_lote, tabla, pesos).tolist() == [calcular_score(comb, pesos) for _, comb in validas]
+        assert penalizacion_lote(ids_lote, tabla, config_dias, w_dias).tolist() == [
+            calcular_penalizacion_por_dia({"materias": comb}, config_dias, w_dias=w_dias) for _, comb in validas
+        ]
+
+
+@pytest.mark.parametrize("semilla", range(60))
+def test_lote_no_exacto_igual_salvo_redondeo(semilla):
+    # Con horas fuera de bloques de 30 min los huecos se suman en otro orden: iguales salvo redondeo
+    rng, grupos_input, validas = caso(semilla, 0.5)
+    tabla = construir_tabla_features(grupos_input)
+    if not validas:
+        return
+    ids_lote = np.array([fila for fila, _ in validas])
+
+    for _ in range(3):
+        pesos = pesos_al_azar(rng, negativos=rng.random() < 0.3)
+        config_dias = config_dias_al_azar(rng)
+        w_dias = rng.choice((0, 10, 35, 80))
+
+        assert puntuar_lote(ids_lote, tabla, pesos).tolist() == pytest.approx(
+            [calcular_score(comb, pesos) for _, comb in validas], rel=1e-12, abs=1e-9
+        )
+        # La penalización por día solo cuenta bloques e inicios enteros: sigue siendo igual
+        assert penalizacion_lote(ids_lote, tabla, config_dias, w_dias).tolist() == [
+            calcular_penalizacion_por_dia({"materias": comb}, config_dias, w_dias=w_dias) for _, comb in validas
+        ]
+
+
+def test_hay_tablas_no_exactas():
+    assert any(not construir_tabla_features(caso(semilla, 0.5)[1])["exacta"] for semilla in range(60))
+
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_features_guardadas_dan_la_misma_penalizacion(semilla):
+    # EspacioCombinaciones guarda features_lote (con tipos chicos) y penaliza desde ahí
+    rng, grupos_input, validas = caso(semilla, 0.0)
+    if not validas:
+        return
+    tabla = construir_tabla_features(grupos_input)
+    ids_lote = np.array([fila for fila, _ in validas])
+    config_dias = config_dias_al_azar(rng)
+
+    assert penalizacion_features(features_lote(ids_lote, tabla), config_dias).tolist() == \
+        penalizacion_lote(ids_lote, tabla, config_dias).tolist()
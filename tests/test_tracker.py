@@ -0,0 +1,178 @@
+"""
+CacheProfesores con un reloj falso y consultas falsas: archivo en disco, caché negativo y vencimiento.
+"""
+import json
+import threading
+
+import pytest
+
+from horarios_fi.tracker import CacheProfesores
+
+ENCONTRADO = {"promedio": 9.1, "num_resenas": 12, "nombre_api": "PEREZ LOPEZ JUAN"}
+NO_ENCONTRADO = {"promedio": None, "num_resenas": None, "nombre_api": None}
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_700_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class Consultas:
+    """consultar(nombre) que regresa lo que diga respuestas[nombre] y cuenta las llamadas."""
+
+    def __init__(self, **respuestas):
+        self.respuestas = respuestas
+        self.llamadas = []
+
+    def __call__(self, nombre):
+        self.llamadas.append(nombre)
+        return self.respuestas[nombre]
+
+
+@pytest.fixture
+def reloj():
+    return Reloj()
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return tmp_path / "profesores.json"
+
+
+def test_encontrados_duran_ttl(reloj):
+    cache = CacheProfesores(ttl=100, ttl_no_encontrado=10, reloj=reloj)
+    consultar = Consultas(perez=ENCONTRADO)
+
+    assert cache.obtener("perez", consultar) == ENCONTRADO
+    reloj.ahora += 99
+    assert cache.obtener("perez", consultar) == ENCONTRADO
+    assert len(consultar.llamadas) == 1
+
+    reloj.ahora += 1
+    cache.obtener("perez", consultar)
+    assert len(consultar.llamadas) == 2
+
+
+def test_no_encontrados_vencen_antes(reloj):
+    cache = CacheProfesores(ttl=100, ttl_no_encontrado=10, reloj=reloj)
+    consultar = Consultas(perez=NO_ENCONTRADO)
+
+    assert cache.obtener("perez", consultar) == NO_ENCONTRADO
+    reloj.ahora += 9
+    cache.obtener("perez", consultar)
+    assert len(consultar.llamadas) == 1
+
+    # Ya lo dieron de alta en el tracker: pasado el ttl negativo se vuelve a preguntar
+    reloj.ahora += 1
+    consultar.respuestas["perez"] = ENCONTRADO
+    assert cache.obtener("perez", consultar) == ENCONTRADO
+    assert len(consultar.llamadas) == 2
+
+
+def test_regresa_una_copia(reloj):
+    cache = CacheProfesores(reloj=reloj)
+    cache.obtener("perez", Consultas(perez=ENCONTRADO))["promedio"] = 0
+
+    assert cache.obtener("perez", Consultas())["promedio"] == 9.1
+
+
+def test_guardar_y_leer_del_disco(ruta, reloj):
+    cache = CacheProfesores(ttl=100, ttl_no_encontrado=10, ruta=str(ruta), reloj=reloj)
+    cache.obtener("perez", Consultas(perez=ENCONTRADO))
+    cache.obtener("lopez", Consultas(lopez=NO_ENCONTRADO))
+    cache.guardar()
+
+    assert json.loads(ruta.read_text(encoding="utf-8")) == {
+        "perez": {"resultado": ENCONTRADO, "t_consulta": reloj.ahora},
+        "lopez": {"resultado": NO_ENCONTRADO, "t_consulta": reloj.ahora},
+    }
+    assert [p.name for p in ruta.parent.iterdir()] == [ruta.name]
+
+    # Otro proceso (o un reinicio) lee el archivo y respeta los tiempos guardados
+    reloj.ahora += 50
+    otro = CacheProfesores(ttl=100, ttl_no_encontrado=10, ruta=str(ruta), reloj=reloj)
+    consultar = Consultas(perez=ENCONTRADO, lopez=NO_ENCONTRADO)
+    assert otro.obtener("perez", consultar) == ENCONTRADO
+    assert otro.obtener("lopez", consultar) == NO_ENCONTRADO
+    assert consultar.llamadas == ["lopez"]
+
+
+def test_guardar_solo_escribe_si_hay_algo_nuevo(ruta, reloj):
+    cache = CacheProfesores(ruta=str(ruta), reloj=reloj)
+    cache.guardar()
+    assert not ruta.exists()
+
+    cache.obtener("perez", Consultas(perez=ENCONTRADO))
+    cache.guardar()
+    ruta.write_text("{}", encoding="utf-8")
+
+    # Servido del caché: nada que escribir
+    cache.obtener("perez", Consultas())
+    cache.guardar()
+    assert ruta.read_text(encoding="utf-8") == "{}"
+
+
+def test_sin_ruta_guardar_no_hace_nada(reloj):
+    cache = CacheProfesores(reloj=reloj)
+    cache.obtener("perez", Consultas(perez=ENCONTRADO))
+    cache.guardar()
+
+
+@pytest.mark.parametrize("contenido", ["", "no es json", "[1, 2]"], ids=["vacio", "roto", "lista"])
+def test_archivo_invalido_empieza_vacio(ruta, reloj, contenido):
+    ruta.write_text(contenido, encoding="utf-8")
+    cache = CacheProfesores(ruta=str(ruta), reloj=reloj)
+
+    consultar = Consultas(perez=ENCONTRADO)
+    cache.obtener("perez", consultar)
+    assert consultar.llamadas == ["perez"]
+
+
+def test_entradas_con_otra_forma_se_ignoran(ruta, reloj):
+    ruta.write_text(json.dumps({
+        "perez": {"resultado": ENCONTRADO, "t_consulta": reloj.ahora},
+        "lopez": {"resultado": ENCONTRADO},
+        "garcia": "9.5",
+    }), encoding="utf-8")
+    cache = CacheProfesores(ruta=str(ruta), reloj=reloj)
+
+    consultar = Consultas(perez=ENCONTRADO, lopez=ENCONTRADO, garcia=ENCONTRADO)
+    for nombre in ("perez", "lopez", "garcia"):
+        cache.obtener(nombre, consultar)
+    assert consultar.llamadas == ["lopez", "garcia"]
+
+
+def test_archivo_que_no_existe(tmp_path, reloj):
+    cache = CacheProfesores(ruta=str(tmp_path / "no" / "existe.json"), reloj=reloj)
+    cache.obtener("perez", Consultas(perez=ENCONTRADO))
+    # El directorio no existe: guardar no truena
+    cache.guardar()
+
+
+def test_el_mismo_profesor_se_consulta_una_sola_vez_a_la_vez(reloj):
+    cache = CacheProfesores(reloj=reloj)
+    empezo = threading.Event()
+    seguir = threading.Event()
+    llamadas = []
+
+    def consultar(nombre):
+        llamadas.append(nombre)
+        empezo.set()
+        assert seguir.wait(5)
+        return ENCONTRADO
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener("perez", consultar))) for _ in range(4)]
+    hilos[0].start()
+    assert empezo.wait(5)
+    for hilo in hilos[1:]:
+        hilo.start()
+    seguir.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert llamadas == ["perez"]
+    assert resultados == [ENCONTRADO] * 4